@@ -0,0 +1,283 @@
+"""Headless JSON prediction API next to the Streamlit UI.
+
+Mobile clients can post one small request per prediction instead of driving
+a whole Streamlit session through the WebView::
+
+    python backend/api.py --host 0.0.0.0 --port 8000
+
+Endpoints (all bodies are JSON):
+
+``POST /predict``
+    Body is the 20-field payload the two forms build, either flat or as
+    ``{"form1": {...}, "form2": {...}}``. Returns the label, the probability
+    of "Infected" and the recommendations for that prediction.
+
+``POST /recommendations``
+    Same body, plus an optional ``prediction_label``. When the label is not
+    given the model is run to obtain it.
+
+``POST /contributions``
+    Same body as ``/predict``; returns the prediction plus each feature's
+    contribution to it (XGBoost TreeSHAP, in log-odds). A JSON list of
+    payloads is scored in one batch; ``?approximate=1`` switches the batch
+    to XGBoost's much faster approximate contributions. Bodies may be up
+    to ``INFLUENZA_API_MAX_BATCH_MB`` (default 32, about 75k payloads);
+    the other routes take 64 KB.
+
+``GET /stats``
+    Served model version, the batch sizes achieved by the micro-batching
+    scheduler, and prediction cache and split memo hit/miss counters.
+
+``GET /metrics``
+    Per-stage latency histograms and counters in OpenMetrics text format
+    (see ``metrics.py``).
+
+``GET /healthz``, ``GET /readyz``
+    Liveness and readiness. The model is loaded and warmed in the
+    background after the port opens; until then ``/readyz`` and the POST
+    routes answer 503 (see ``readiness.py``). New registry versions are
+    then swapped in without a restart (see ``model_manager.py``); ``/stats``
+    reports them under ``model_manager``.
+
+Bodies are checked against ``schema.SCHEMA``: a bad body gets a 400 with
+one ``{"field", "code", "message"}`` entry per problem under ``errors``.
+
+Predictions go through one shared ``service.PredictionService``, the same
+stack the Streamlit UI uses, and are logged to ``--request-log`` (see
+``request_log.py``). ``INFLUENZA_PROFILE`` profiles a sample of requests
+(see ``profiling.py``).
+"""
+import argparse
+import json
+import os
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+import prediction
+from contributions import explanation_to_dict
+from model_manager import ModelManager
+from profiling import PROFILER
+from readiness import Startup, health_response
+from request_log import DEFAULT_DIR as LOG_DIR, RequestLog, set_default_log
+from prediction import PayloadError, get_recommendations, parse_payload, recommendations_to_dicts
+from registry import RegistryError, sha256_file
+from service import PredictionService
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_BATCH_BODY_BYTES = int(float(os.environ.get("INFLUENZA_API_MAX_BATCH_MB", 32)) * 1024 * 1024)
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    server_version = "InfluenzaAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in two writes; with Nagle on, a keep-alive
+    # client waits for its delayed ACK (~40ms) before seeing the body.
+    disable_nagle_algorithm = True
+
+    # ---------- Routes ----------
+    def handle_predict(self, body):
+        service = self.service
+        with metrics.stage("form_parse"):
+            payload = parse_payload(body)
+        result = service.predict(payload)
+        return 200, {
+            "model_version": service.version,
+            "prediction_label": result.label,
+            "infected": result.label == 1,
+            "probability": result.probability,
+            "recommendations": recommendations_to_dicts(result.recommendations),
+        }
+
+    def handle_recommendations(self, body):
+        label = body.get("prediction_label") if isinstance(body, dict) else None
+        if isinstance(body, dict):
+            body = {k: v for k, v in body.items() if k != "prediction_label"}
+        with metrics.stage("form_parse"):
+            payload = parse_payload(body)
+        if label is None:
+            result = self.service.predict(payload)
+            label, recommendations = result.label, result.recommendations
+        elif type(label) is not int or label not in (0, 1):
+            raise PayloadError("prediction_label must be 0 or 1.", invalid=["prediction_label"])
+        else:
+            recommendations = get_recommendations(payload, label)
+        return 200, {
+            "prediction_label": label,
+            "recommendations": recommendations_to_dicts(recommendations),
+        }
+
+    def handle_contributions(self, body):
+        service = self.service
+        if isinstance(body, list):
+            with metrics.stage("form_parse"):
+                payloads = [parse_payload(item) for item in body]
+            query = parse_qs(urlsplit(self.path).query)
+            approximate = query.get("approximate", ["0"])[0] in ("1", "true")
+            explanations = service.explain_batch(payloads, approximate)
+            if explanations is None:
+                return 501, {"error": "Contributions are not available for this model."}
+            return 200, {
+                "model_version": service.version,
+                "approximate": approximate,
+                "results": [explanation_to_dict(e) for e in explanations],
+            }
+        with metrics.stage("form_parse"):
+            payload = parse_payload(body)
+        explanation = service.explain(payload)
+        if explanation is None:
+            return 501, {"error": "Contributions are not available for this model."}
+        result = service.predict(payload)
+        return 200, {
+            "model_version": service.version,
+            "prediction_label": result.label,
+            "probability": result.probability,
+            **explanation_to_dict(explanation),
+        }
+
+    @property
+    def service(self):
+        """The served model right now; hot reloads swap it between requests."""
+        return self.server.startup.current
+
+    routes = {
+        "/predict": handle_predict,
+        "/recommendations": handle_recommendations,
+        "/contributions": handle_contributions,
+    }
+    body_limits = {"/contributions": MAX_BATCH_BODY_BYTES}  # batches; MAX_BODY_BYTES elsewhere
+
+    # ---------- HTTP plumbing ----------
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        route = self.routes.get(path)
+        if route is None:
+            return self.send_json(404, {"error": "Not found."})
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return self.send_json(400, {"error": "Content-Length must be a non-negative integer."})
+        if length > self.body_limits.get(path, MAX_BODY_BYTES):
+            return self.send_json(413, {"error": "Payload too large."})
+        try:
+            body = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            return self.send_json(400, {"error": "Body is not valid JSON."})
+
+        if self.service is None:
+            if self.server.startup.state == "failed":
+                return self.send_json(503, {"error": "Model not found."})
+            return self.send_json(503, {"error": "Model is warming up."})
+        try:
+            with PROFILER.profile("api" + route.__name__[len("handle"):]):
+                status, data = route(self, body)
+        except PayloadError as e:
+            return self.send_json(400, e.to_dict())
+        except Exception as e:
+            metrics.MODEL_ERRORS.inc("api")
+            return self.send_json(500, {"error": f"Prediction Error: {e}"})
+        self.send_json(status, data)
+
+    def do_GET(self):
+        health = health_response(self.path, self.server.startup)
+        if health is not None:
+            return self.send_json(*health)
+        if self.path == "/stats":
+            service, manager = self.service, self.server.startup.manager
+            data = service.stats() if service else {"model_version": None}
+            if manager is not None:
+                data["model_manager"] = manager.stats()
+            return self.send_json(200, data)
+        if self.path == "/metrics":
+            raw = metrics.REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", metrics.CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            return self.wfile.write(raw)
+        self.send_json(405 if self.path in self.routes else 404, {"error": "Use POST."})
+
+    def send_json(self, status, data):
+        raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def make_server(service, host="127.0.0.1", port=8000, startup=None):
+    """HTTP server for ``service``, or for whatever ``startup`` serves.
+
+    With a ``startup`` the server can be started at once and answers 503
+    until ``startup.start()`` has warmed the model.
+    """
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    server.daemon_threads = True
+    if startup is None:
+        startup = Startup(lambda: service, rows=0, manage=None)
+        startup.service()
+    server.startup = startup
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--version", help="registry version to serve (default: the serving one)")
+    parser.add_argument("--model", help="serve this model file (relative to the backend "
+                                        "directory) instead of a registry version")
+    parser.add_argument("--batch-max-size", type=int, default=None,
+                        help="rows per model call (env INFLUENZA_BATCH_MAX_SIZE, default 32)")
+    parser.add_argument("--batch-max-wait-ms", type=float, default=None,
+                        help="max queueing delay (env INFLUENZA_BATCH_MAX_WAIT_MS, default 5)")
+    parser.add_argument("--request-log", default=os.environ.get("INFLUENZA_REQUEST_LOG") or
+                        str(LOG_DIR / "api-requests.jsonl"),
+                        help="JSONL log of every prediction (env INFLUENZA_REQUEST_LOG; 0 = off)")
+    args = parser.parse_args(argv)
+
+    set_default_log(None if args.request_log == "0" else RequestLog.from_env(path=args.request_log))
+    batch_options = {}
+    if args.batch_max_size is not None:
+        batch_options["max_batch_size"] = args.batch_max_size
+    if args.batch_max_wait_ms is not None:
+        batch_options["max_wait_ms"] = args.batch_max_wait_ms
+    manage = None
+    if args.model:
+        def factory():
+            model = prediction.load_model(args.model)
+            if model is None:
+                raise RegistryError(f"{args.model} not found")
+            manifest = {"version": args.model, "sha256": sha256_file(prediction.BASE_DIR / args.model)}
+            return PredictionService.for_model(model, manifest, artifact_path=prediction.BASE_DIR / args.model,
+                                               **batch_options)
+    else:
+        def factory():
+            return PredictionService.from_registry(args.version, **batch_options)
+
+        def manage(service, contributions):
+            return ModelManager.from_env(
+                service, lambda version: PredictionService.from_registry(version, **batch_options),
+                version=args.version, contributions=contributions)
+    startup = Startup.from_env(factory, manage=manage)
+    server = make_server(None, args.host, args.port, startup)
+    startup.start()
+    print(f"Serving predictions on http://{args.host}:{args.port} (warming up)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if startup.manager is not None:
+            startup.manager.close()
+        elif startup.current is not None:
+            startup.current.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Micro-batching scheduler in front of the loaded model.
+
+Every ``predict_proba`` call pays XGBoost's fixed per-call overhead, which
+dominates when it only scores one row. ``MicroBatcher`` collects payloads
+from concurrent Streamlit sessions and API requests for up to
+``max_wait_ms`` (or until ``max_batch_size`` rows are queued), scores the
+stacked rows with a single model call and hands every caller its own row.
+
+Configuration from the environment (see ``MicroBatcher.from_env``):
+
+``INFLUENZA_BATCH_MAX_SIZE``     rows per model call (default 32)
+``INFLUENZA_BATCH_MAX_WAIT_MS``  how long the first row may wait (default 5)
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from prediction import predict_rows
+
+_STOP = object()
+
+
+class BatchStats:
+    """Thread-safe counters on the batch sizes the scheduler achieves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.errors = 0
+        self.max_batch_size = 0
+        self.size_histogram = {}  # upper bucket bound (power of two) -> batches
+        self.queue_wait_seconds = 0.0
+
+    def record(self, size, queue_wait):
+        bucket = 1 << (size - 1).bit_length()
+        with self._lock:
+            self.batches += 1
+            self.requests += size
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.size_histogram[bucket] = self.size_histogram.get(bucket, 0) + 1
+            self.queue_wait_seconds += queue_wait
+
+    def record_error(self, count=1):
+        with self._lock:
+            self.errors += count
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "errors": self.errors,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "batch_size_histogram": dict(sorted(self.size_histogram.items())),
+                "mean_queue_wait_ms": 1000 * self.queue_wait_seconds / self.requests if self.requests else 0.0,
+            }
+
+
+class MicroBatcher:
+    """Merge concurrent predictions into one model call.
+
+    ``submit`` returns a ``concurrent.futures.Future`` resolving to
+    ``(label, probability)``; ``predict`` is the blocking shortcut.
+    ``workers`` scheduler threads can have a batch in flight at once, which
+    only helps when the model scores outside the GIL (``InferencePool``).
+    """
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5.0, predict_fn=predict_rows, workers=1):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.model = model
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self.predict_fn = predict_fn
+        self.stats = BatchStats()
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._close_lock = threading.Lock()  # nothing is queued behind _STOP
+        self._workers = [threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                         for _ in range(int(workers))]
+        for worker in self._workers:
+            worker.start()
+
+    @classmethod
+    def from_env(cls, model, **overrides):
+        options = {
+            "max_batch_size": int(os.environ.get("INFLUENZA_BATCH_MAX_SIZE", 32)),
+            "max_wait_ms": float(os.environ.get("INFLUENZA_BATCH_MAX_WAIT_MS", 5)),
+        }
+        options.update(overrides)
+        return cls(model, **options)
+
+    # ---------- Public API ----------
+    def submit(self, payload):
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put((payload, future, time.perf_counter()))
+        return future
+
+    def predict(self, payload, timeout=None):
+        return self.submit(payload).result(timeout)
+
+    def close(self, timeout=None):
+        """Score what is already queued, then stop the scheduler threads."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join(timeout)
+
+    # ---------- Worker ----------
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._drain()
+                self._queue.put(_STOP)  # for the other scheduler threads
+                return
+            batch = [item for item in self._collect(first) if item[1].set_running_or_notify_cancel()]
+            if batch:
+                self._score(batch)
+
+    def _drain(self):
+        """Fail anything still queued once the scheduler stops."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("MicroBatcher closed before the request was scored"))
+
+    def _score(self, batch):
+        started = time.perf_counter()
+        payloads = [payload for payload, _, _ in batch]
+        try:
+            results = self.predict_fn(self.model, payloads)
+        except Exception:
+            # One bad payload must not fail its neighbours: score row by row.
+            return self._score_individually(batch)
+        self.stats.record(len(batch), sum(started - queued for _, _, queued in batch))
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _score_individually(self, batch):
+        started = time.perf_counter()
+        for payload, future, queued in batch:
+            try:
+                result = self.predict_fn(self.model, [payload])[0]
+            except Exception as e:
+                self.stats.record_error()
+                future.set_exception(e)
+            else:
+                self.stats.record(1, started - queued)
+                future.set_result(result)
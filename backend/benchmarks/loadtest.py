@@ -0,0 +1,273 @@
+"""Load test: N concurrent users through the whole UI flow.
+
+Starts ``streamlit run streamlit_influenza_app.py`` on a free local port
+(or uses ``--url``) and drives it with N websocket clients, each a separate
+session going Home -> FormPage1 -> FormPage2 -> Result -> DetailPage with
+random but plausible answers::
+
+    python backend/benchmarks/loadtest.py --users 1,4,16 --flows 10 [--json load.json]
+
+The clients speak Streamlit's own protocol (``BackMsg``/``ForwardMsg`` over
+``/_stcore/stream``) and reuse ``AppTest``'s element tree to find and set
+widgets. AppTest itself cannot run sessions concurrently: every run swaps
+the process-wide ``Runtime``. Everything runs offline on one machine.
+
+Reports, per user count, completed flows per second, p50/p95/p99 latency of
+each page transition (request sent until the script run finished) and the
+server's peak RSS.
+"""
+import argparse
+import collections
+import datetime
+import json
+import os
+import pathlib
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+APP = BACKEND_DIR / "streamlit_influenza_app.py"
+
+TRANSITIONS = ("home", "form1", "form2", "result", "detail")
+
+
+# ---------- Client ----------
+class StreamlitClient:
+    """One browser tab: a Streamlit session over a websocket.
+
+    Stands in for ``AppTest`` as the runner behind an element tree, so
+    ``tree.button[0].click().run()`` sends the widget states to the server
+    and returns the tree of the finished script run.
+    """
+
+    def __init__(self, url, timeout=60.0):
+        from websockets.sync.client import connect
+
+        self.timeout = timeout
+        self.ws = connect(url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream",
+                          subprotocols=["streamlit"], max_size=None, open_timeout=timeout)
+        self._cleared_form_ids = set()
+
+    @property
+    def _session_state(self):
+        # The server keeps the real session state. The tree only needs it for
+        # option formatting (every option in this app is a plain string) and
+        # for widgets the flow never set, which it must not send.
+        from streamlit.runtime.state.common import TESTING_KEY
+
+        return {TESTING_KEY: collections.defaultdict(lambda: str)}
+
+    def _run(self, widget_states=None, timeout=None):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from streamlit.testing.v1.element_tree import parse_tree_from_messages
+
+        back = BackMsg()
+        back.rerun_script.query_string = ""
+        if widget_states is not None:
+            back.rerun_script.widget_states.CopyFrom(widget_states)
+        self.ws.send(back.SerializeToString())
+
+        messages = []
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(self.ws.recv(timeout or self.timeout))
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":  # sent at the start of every script run
+                messages = []
+            elif kind == "script_finished":
+                if msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+            else:
+                messages.append(msg)
+        tree = parse_tree_from_messages(messages)
+        tree._runner = self
+        return tree
+
+    def run(self):
+        return self._run()
+
+    def close(self):
+        self.ws.close()
+
+
+# ---------- Simulated user ----------
+def random_patient(rng):
+    """FormPage1 text inputs (in widget order) and FormPage2 answers.
+
+    The Yes/No questions are answered at random in ``run_flow``.
+    """
+    vitals = (
+        rng.gauss(165, 10),           # height
+        rng.gauss(62, 12),            # weight
+        rng.gauss(37.6, 0.9),         # temperature
+        rng.gauss(88, 14),            # pulse
+        min(rng.gauss(97, 2), 100),   # oxygen saturation
+        rng.gauss(19, 4),             # respiratory rate
+        rng.gauss(118, 15),           # systolic blood pressure
+    )
+    answers = {
+        "date": datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randrange(365)),
+        "season": rng.choice(("1", "2", "3", "4")),
+        "symptom_days": rng.randrange(0, 14),
+    }
+    return [f"{v:.1f}" for v in vitals], answers
+
+
+def run_flow(client, rng):
+    """One full flow from a fresh Home page; returns seconds per transition."""
+    vitals, answers = random_patient(rng)
+    timings = {}
+    page = None
+
+    def step(name, action):
+        nonlocal page
+        started = time.perf_counter()
+        page = action()
+        timings[name] = time.perf_counter() - started
+        if page.exception:
+            raise RuntimeError(f"{name}: {page.exception[0].value}")
+
+    step("home", client.run)
+    step("form1", lambda: page.button[0].click().run())
+    for box, value in zip(page.text_input, vitals):
+        box.set_value(value)
+    step("form2", lambda: page.button[0].click().run())
+    page.date_input[0].set_value(answers["date"])
+    page.selectbox[0].set_value(answers["season"])
+    for radio in page.radio:
+        radio.set_value(rng.choice(("No", "Yes")))
+    page.number_input[0].set_value(answers["symptom_days"])
+    step("result", lambda: page.button[0].click().run())
+    if not any("result-badge" in m.value for m in page.markdown):
+        raise RuntimeError(f"result: no prediction rendered {[e.value for e in page.error]}")
+    step("detail", lambda: page.button(key="btn_detail").click().run())
+    page.button(key="btn_home").click().run()
+    return timings
+
+
+def user(url, flows, seed, results, lock):
+    rng = random.Random(seed)
+    client = StreamlitClient(url)
+    try:
+        for _ in range(flows):
+            timings = run_flow(client, rng)
+            with lock:
+                results.append(timings)
+    finally:
+        client.close()
+
+
+# ---------- Server ----------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(timeout=60.0):
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(APP), "--server.headless", "true",
+         "--server.port", str(port), "--server.address", "127.0.0.1",
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return server, url
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Streamlit server did not become healthy")
+
+
+def peak_rss_mb(pid):
+    """Peak resident set size of ``pid`` (Linux ``VmHWM``), or ``None``."""
+    try:
+        for line in pathlib.Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+# ---------- Reporting ----------
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def load_level(url, users, flows, seed, server_pid=None):
+    results, lock = [], threading.Lock()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(users) as pool:
+        futures = [pool.submit(user, url, flows, seed + i, results, lock) for i in range(users)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+    summary = {
+        "users": users,
+        "flows": len(results),
+        "seconds": elapsed,
+        "flows_per_s": len(results) / elapsed,
+        "transitions_per_s": len(results) * len(TRANSITIONS) / elapsed,
+        "server_peak_rss_mb": peak_rss_mb(server_pid) if server_pid else None,
+        "latency_ms": {},
+    }
+    for name in TRANSITIONS:
+        values = [r[name] * 1000 for r in results]
+        summary["latency_ms"][name] = {
+            "p50": percentile(values, 50), "p95": percentile(values, 95),
+            "p99": percentile(values, 99), "mean": statistics.fmean(values),
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="1,4,16", help="comma-separated concurrent user counts")
+    parser.add_argument("--flows", type=int, default=10, help="full flows per user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="use a running server instead of starting one")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore")
+    server, url = (None, args.url) if args.url else start_server()
+    levels = []
+    try:
+        for users in (int(u) for u in args.users.split(",")):
+            summary = load_level(url, users, args.flows, args.seed, server and server.pid)
+            levels.append(summary)
+            rss = summary["server_peak_rss_mb"]
+            print(f"\n{users} users: {summary['flows']} flows in {summary['seconds']:.1f}s, "
+                  f"{summary['flows_per_s']:.2f} flows/s"
+                  + (f", server peak RSS {rss:.0f} MB" if rss else ""))
+            print(f"  {'transition':<10} {'p50':>9} {'p95':>9} {'p99':>9}")
+            for name, row in summary["latency_ms"].items():
+                print(f"  {name:<10} {row['p50']:>7.1f}ms {row['p95']:>7.1f}ms {row['p99']:>7.1f}ms")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+
+    if args.json:
+        pathlib.Path(args.json).write_text(
+            json.dumps({"cpus": os.cpu_count(), "url": url, "levels": levels}, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""Replay captured traffic against one or two model targets.
+
+Reads the prediction log written by ``request_log.py`` (rotated ``.gz``
+segments included) and sends every payload to each target::
+
+    python backend/benchmarks/replay.py --target v1 --target v1:compiled
+    python backend/benchmarks/replay.py --mode rate --rate 200 --concurrency 8 --target v2
+    python backend/benchmarks/replay.py --mode original --speed 4 --target http://127.0.0.1:8000
+
+A target is a registry version with an optional backend (``v1``,
+``v1:compiled``; served in this process by a ``PredictionService``) or the
+URL of a running ``api.py``. Local targets get no prediction cache (so
+repeated payloads still reach the model; ``--cache`` keeps it), no shadow
+and no request log of their own.
+
+``--mode``:
+
+* ``max``       send as fast as ``--concurrency`` workers can (default)
+* ``rate``      start one request every ``1 / --rate`` seconds
+* ``original``  keep the logged gaps between requests, ``--speed`` times faster
+
+Records are streamed: only the per-record results (two numbers per target)
+stay in memory. Every target sees the same records in the same order, and
+results are kept by record position, so the diffs do not depend on
+concurrency or timing.
+
+Reports, per target, throughput, p50/p90/p99/max latency and how many sends
+started more than 10ms behind schedule; then label disagreements and
+probability differences against what was originally served and between the
+two targets. Exits non-zero when the second target's p99 is more than
+``--threshold`` slower than the first's, or its labels disagree with the
+first's on more than ``--max-disagreement`` of the records.
+"""
+import argparse
+import gzip
+import http.client
+import json
+import math
+import os
+import pathlib
+import queue
+import sys
+import threading
+import time
+import urllib.parse
+import warnings
+
+import numpy as np
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from encoder import PayloadError  # noqa: E402
+from schema import SCHEMA  # noqa: E402
+
+DEFAULT_LOGS = (BACKEND_DIR / "logs" / "requests*.jsonl*",)
+LATE_SECONDS = 0.010
+
+
+# ---------- Reading ----------
+def log_files(patterns):
+    """Files matching ``patterns``, oldest first.
+
+    Rotated segments (``requests-<stamp>-NNNN.jsonl.gz``) sort before the
+    live ``requests.jsonl``, so name order is time order.
+    """
+    files = set()
+    for pattern in patterns:
+        path = pathlib.Path(pattern)
+        if any(c in pattern for c in "*?["):
+            files.update(path.parent.glob(path.name))
+        elif path.exists():
+            files.add(path)
+    return sorted(files, key=lambda p: (str(p.parent), p.name))
+
+
+def read_records(paths, limit=None, skipped=None):
+    """Yield ``(ts, payload, label, probability)`` from JSONL logs, one at a time.
+
+    Lines that are not JSON or whose payload fails ``schema.SCHEMA`` are
+    counted in ``skipped`` (a dict) and left out.
+    """
+    count = 0
+    for path in paths:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if limit is not None and count >= limit:
+                    return
+                try:
+                    record = json.loads(line)
+                    payload = SCHEMA.check(record["payload"])
+                except (ValueError, KeyError, TypeError, PayloadError):
+                    if skipped is not None:
+                        skipped[str(path)] = skipped.get(str(path), 0) + 1
+                    continue
+                count += 1
+                yield record.get("ts", 0.0), payload, record.get("label"), record.get("probability")
+
+
+# ---------- Targets ----------
+class LocalTarget:
+    """A registry version served in this process."""
+
+    def __init__(self, spec):
+        from readiness import synthetic_payloads
+        from service import PredictionService
+
+        version, _, backend = spec.partition(":")
+        self.name = spec
+        self.service = PredictionService.from_registry(version or None, backend=backend or None)
+        self.service.warm_up(synthetic_payloads(64), contributions=False)
+
+    def predict(self, payload):
+        result = self.service.predict(payload)
+        return result.label, result.probability
+
+    def close(self):
+        self.service.close()
+
+
+class HttpTarget:
+    """A running ``api.py``; one keep-alive connection per worker thread."""
+
+    def __init__(self, url, timeout=30.0):
+        parts = urllib.parse.urlsplit(url)
+        self.name = url
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.path = (parts.path.rstrip("/") or "") + "/predict"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def predict(self, payload):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        body = json.dumps(payload).encode("utf-8")
+        try:
+            conn.request("POST", self.path, body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            data = json.loads(response.read())
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}: {data.get('error')}")
+        return data["prediction_label"], data["probability"]
+
+    def close(self):
+        pass
+
+
+def make_target(spec):
+    return HttpTarget(spec) if spec.startswith(("http://", "https://")) else LocalTarget(spec)
+
+
+# ---------- Replaying ----------
+def schedule(records, mode, rate=None, speed=1.0):
+    """Yield ``(index, due, payload, label, probability)``; ``due`` is seconds from the start."""
+    first = None
+    for index, (ts, payload, label, probability) in enumerate(records):
+        if mode == "rate":
+            due = index / rate
+        elif mode == "original":
+            first = ts if first is None else first
+            due = (ts - first) / speed
+        else:
+            due = 0.0
+        yield index, due, payload, label, probability
+
+
+def replay(target, scheduled, concurrency):
+    """Send every scheduled record to ``target`` and collect the results.
+
+    The calling thread paces the sends and hands them to ``concurrency``
+    workers over a short queue, so the log is never read far ahead.
+    """
+    results = {"labels": [], "probabilities": [], "recorded_labels": [], "recorded_probabilities": [],
+               "latencies": [], "errors": 0, "late": 0}
+    lock = threading.Lock()
+    work = queue.Queue(maxsize=concurrency * 2)
+
+    def worker():
+        while (item := work.get()) is not None:
+            index, payload = item
+            began = time.perf_counter()
+            try:
+                label, probability = target.predict(payload)
+            except Exception:
+                with lock:
+                    results["errors"] += 1
+                continue
+            seconds = time.perf_counter() - began
+            with lock:
+                results["labels"][index] = label
+                results["probabilities"][index] = math.nan if probability is None else probability
+                results["latencies"].append(seconds)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    for index, due, payload, label, probability in scheduled:
+        with lock:
+            results["labels"].append(-1)
+            results["probabilities"].append(math.nan)
+        results["recorded_labels"].append(-1 if label is None else label)
+        results["recorded_probabilities"].append(math.nan if probability is None else probability)
+        wait = started + due - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        elif due and -wait > LATE_SECONDS:
+            results["late"] += 1
+        work.put((index, payload))
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.join()
+    results["seconds"] = time.perf_counter() - started
+    return {key: np.asarray(value) if isinstance(value, list) else value for key, value in results.items()}
+
+
+# ---------- Reporting ----------
+def latency_summary(results):
+    n = len(results["labels"])
+    row = {"records": n, "errors": results["errors"], "late": results["late"],
+           "seconds": round(results["seconds"], 3),
+           "throughput_rps": round((n - results["errors"]) / max(results["seconds"], 1e-9), 1)}
+    latencies = results["latencies"]
+    if len(latencies):
+        p50, p90, p99 = np.percentile(latencies, (50, 90, 99)) * 1000
+        row.update(p50_ms=round(float(p50), 3), p90_ms=round(float(p90), 3), p99_ms=round(float(p99), 3),
+                   max_ms=round(float(latencies.max()) * 1000, 3))
+    return row
+
+
+def diff_summary(labels_a, proba_a, labels_b, proba_b):
+    """Label disagreements and probability differences where both sides have an answer."""
+    both = (labels_a >= 0) & (labels_b >= 0)
+    compared = int(both.sum())
+    disagreements = int(np.count_nonzero(labels_a[both] != labels_b[both]))
+    diff = np.abs(proba_a[both] - proba_b[both])
+    scored = ~np.isnan(diff)
+    row = {"compared": compared, "disagreements": disagreements,
+           "disagreement_rate": disagreements / compared if compared else None,
+           "mean_abs_diff": None, "max_abs_diff": None, "max_diff_record": None}
+    if scored.any():
+        worst = int(np.nanargmax(diff))
+        row.update(mean_abs_diff=float(diff[scored].mean()), max_abs_diff=float(diff[worst]),
+                   max_diff_record=int(np.flatnonzero(both)[worst]))
+    return row
+
+
+def print_report(report):
+    print(f"\n{'target':<28} {'rps':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'errors':>7} {'late':>6}")
+    for name, row in report["targets"].items():
+        print(f"{name:<28} {row['throughput_rps']:>9.1f} {row.get('p50_ms', math.nan):>7.2f}ms "
+              f"{row.get('p90_ms', math.nan):>7.2f}ms {row.get('p99_ms', math.nan):>7.2f}ms "
+              f"{row.get('max_ms', math.nan):>7.2f}ms {row['errors']:>7} {row['late']:>6}")
+    print(f"\n{'comparison':<44} {'compared':>9} {'disagree':>9} {'mean |dp|':>10} {'max |dp|':>10}")
+    for name, row in report["diffs"].items():
+        mean = "-" if row["mean_abs_diff"] is None else f"{row['mean_abs_diff']:.2e}"
+        worst = "-" if row["max_abs_diff"] is None else f"{row['max_abs_diff']:.2e}"
+        print(f"{name:<44} {row['compared']:>9} {row['disagreements']:>9} {mean:>10} {worst:>10}")
+
+
+def regressions(report, threshold, max_disagreement):
+    """Reasons the second target counts as a regression against the first."""
+    names = list(report["targets"])
+    if len(names) < 2:
+        return []
+    first, second = (report["targets"][name] for name in names[:2])
+    reasons = []
+    if second["errors"] > first["errors"]:
+        reasons.append(f"{second['errors']} errors against {first['errors']}")
+    if "p99_ms" in first and "p99_ms" in second and second["p99_ms"] > first["p99_ms"] * (1 + threshold):
+        reasons.append(f"p99 {second['p99_ms']:.2f}ms against {first['p99_ms']:.2f}ms")
+    rate = report["diffs"][f"{names[0]} vs {names[1]}"]["disagreement_rate"]
+    if max_disagreement is not None and rate is not None and rate > max_disagreement:
+        reasons.append(f"labels disagree on {rate:.2%} of records")
+    return reasons
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("logs", nargs="*", default=[str(p) for p in DEFAULT_LOGS],
+                        help="JSONL logs or globs (default backend/logs/requests*.jsonl*)")
+    parser.add_argument("--target", action="append", default=[],
+                        help="registry version[:backend] or api.py URL; give twice to compare "
+                             "(default: the serving version)")
+    parser.add_argument("--mode", default="max", choices=("max", "rate", "original"))
+    parser.add_argument("--rate", type=float, default=100.0, help="requests per second for --mode rate")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression for --mode original")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--limit", type=int, help="replay only the first N records")
+    parser.add_argument("--cache", action="store_true", help="keep the prediction cache on local targets")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="p99 slowdown counted as a regression (default 0.2 = 20%%)")
+    parser.add_argument("--max-disagreement", type=float,
+                        help="label disagreement rate counted as a regression (default: not checked)")
+    args = parser.parse_args(argv)
+    if len(args.target) > 2:
+        parser.error("give at most two --target")
+
+    paths = log_files(args.logs)
+    if not paths:
+        parser.error(f"no request logs match {' '.join(args.logs)}")
+    warnings.filterwarnings("ignore")
+    if not args.cache:
+        os.environ["INFLUENZA_PREDICTION_CACHE_SIZE"] = "0"
+    os.environ.pop("INFLUENZA_SHADOW_VERSION", None)
+    from request_log import set_default_log
+    set_default_log(None)  # do not log the replayed traffic
+
+    report = {"logs": [str(p) for p in paths], "mode": args.mode, "concurrency": args.concurrency,
+              "cpus": os.cpu_count(), "skipped": {}, "targets": {}, "diffs": {}}
+    runs = {}
+    for spec in args.target or [""]:
+        target = make_target(spec)
+        name = spec or f"{target.service.version} (serving)"
+        skipped = {}
+        try:
+            records = read_records(paths, args.limit, skipped)
+            runs[name] = replay(target, schedule(records, args.mode, args.rate, args.speed), args.concurrency)
+        finally:
+            target.close()
+        report["skipped"] = skipped
+        report["targets"][name] = latency_summary(runs[name])
+
+    names = list(runs)
+    for name in names:
+        run = runs[name]
+        report["diffs"][f"{name} vs recorded"] = diff_summary(
+            run["labels"], run["probabilities"], run["recorded_labels"], run["recorded_probabilities"])
+    if len(names) == 2:
+        a, b = runs[names[0]], runs[names[1]]
+        report["diffs"][f"{names[0]} vs {names[1]}"] = diff_summary(
+            a["labels"], a["probabilities"], b["labels"], b["probabilities"])
+
+    print(f"{report['targets'][names[0]]['records']:,} records from {len(paths)} file(s), "
+          f"{sum(report['skipped'].values())} skipped, mode {args.mode}, concurrency {args.concurrency}")
+    print_report(report)
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(report, indent=2) + "\n")
+    reasons = regressions(report, args.threshold, args.max_disagreement)
+    if reasons:
+        print("\nREGRESSION: " + "; ".join(reasons))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Bytes the Streamlit app sends to the browser on every rerun.
+
+Walks one session through Home -> Form 1 -> Form 2 -> Result -> Detail with
+``streamlit.testing.v1.AppTest`` and, after each rerun, sums the serialized
+size of every element and block the script produced. Streamlit resends all
+of them on each rerun, so this is what goes over the websocket per
+interaction::
+
+    python backend/benchmarks/rerun_bytes.py [--json rerun_bytes.json]
+
+``style`` counts markdown elements carrying ``<style>`` or stylesheet links.
+"""
+import argparse
+import json
+import os
+import pathlib
+import warnings
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+APP = BACKEND_DIR / "streamlit_influenza_app.py"
+
+FORM1_VALUES = ("170", "60", "38.5", "90", "98", "20", "120")
+
+
+def _walk(node):
+    yield node
+    for child in getattr(node, "children", {}).values():
+        yield from _walk(child)
+
+
+def measure(at):
+    """``{"total", "style", "elements"}`` for the app's last rerun."""
+    total = style = elements = 0
+    for node in _walk(at._tree):
+        proto = getattr(node, "proto", None)
+        if proto is None:
+            continue
+        size = len(proto.SerializeToString())
+        total += size
+        elements += 1
+        body = getattr(proto, "body", "")
+        if isinstance(body, str) and ("<style" in body or "stylesheet" in body):
+            style += size
+    return {"total": total, "style": style, "elements": elements}
+
+
+def session(at):
+    """Yield ``(step, AppTest)`` after each rerun of one full session."""
+    yield "home", at.run()
+    yield "form1", at.button[0].click().run()
+    yield "form1 (typing)", at.text_input[0].input(FORM1_VALUES[0]).run()
+    for box, value in zip(at.text_input, FORM1_VALUES):
+        box.input(value)
+    yield "form2", at.button[0].click().run()
+    yield "result", at.button[0].click().run()
+    yield "result (rerun)", at.run()
+    yield "detail", at.button(key="btn_detail").click().run()
+    yield "detail (rerun)", at.run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure bytes per Streamlit rerun.")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    json_path = pathlib.Path(args.json).resolve() if args.json else None
+
+    warnings.filterwarnings("ignore")
+    # AppTest only reads .streamlit/config.toml from the working directory.
+    os.chdir(BACKEND_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP), default_timeout=60)
+    rows = []
+    for step, at in session(at):
+        if at.exception:
+            raise SystemExit(f"{step}: {at.exception}")
+        rows.append({"step": step, **measure(at)})
+
+    print(f"{'step':<16} {'elements':>8} {'bytes':>8} {'style':>8}")
+    for row in rows:
+        print(f"{row['step']:<16} {row['elements']:>8} {row['total']:>8} {row['style']:>8}")
+    total = sum(r["total"] for r in rows)
+    style = sum(r["style"] for r in rows)
+    print(f"{'session':<16} {'':>8} {total:>8} {style:>8}")
+    if json_path:
+        json_path.write_text(json.dumps(rows, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
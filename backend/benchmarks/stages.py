@@ -0,0 +1,202 @@
+"""Micro-benchmarks for every stage of a prediction.
+
+    python backend/benchmarks/stages.py [--json stages.json] [--compare old.json]
+
+Times, in one process and with ``timeit``-style autoranging:
+
+* loading the serving model (each backend, registry cache cleared first)
+* assembling and validating the payload from ``form1``/``form2``
+* ``pd.DataFrame([payload])`` next to the ``FeatureEncoder`` we use instead
+* ``predict_proba`` at batch sizes 1, 32, 1k and 100k, per backend
+* ``get_recommendations`` and the batch rule engine
+* a Result page rerun through Streamlit's ``AppTest``
+
+Each stage reports the per-call minimum and median over ``--repeat`` runs.
+``--compare`` prints the change against an earlier ``--json`` file and exits
+non-zero if any median got slower than ``--threshold``.
+"""
+import argparse
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import timeit
+import warnings
+
+import numpy as np
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import prediction  # noqa: E402
+from encoder import FeatureEncoder  # noqa: E402
+from model_io import BACKENDS  # noqa: E402
+from recommendations import RULE_ENGINE  # noqa: E402
+from registry import ModelRegistry  # noqa: E402
+
+BATCH_SIZES = (1, 32, 1_000, 100_000)
+
+FORM1 = {"heightcm": 170.0, "weightkg": 60.0, "as_edenroll_temp": 38.5, "pulse": 90.0,
+         "rr": 20.0, "sbp": 120.0, "o2s": 98.0}
+FORM2 = {"season": 1, "WOS": 3, "cursympt_days": 2, "fluvaccine": 0, "exposehuman": 1, "travel": 0,
+         "cursympt_cough": 1, "cursympt_coughsputum": 0, "cursympt_sorethroat": 1,
+         "cursympt_rhinorrhea": 0, "cursympt_sinuspain": 0, "medhistav": 1, "pastmedchronlundis": 0}
+FORM1_TEXT = ("170", "60", "38.5", "90", "98", "20", "120")  # FormPage1 input order
+
+
+def measure(fn, repeat=5, min_seconds=0.2):
+    """Per-call ``min_us``/``median_us`` of ``fn()``, autoranged like timeit."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_seconds / max(elapsed, 1e-9))) if elapsed < min_seconds else number
+    runs = [t / number * 1e6 for t in timer.repeat(repeat, number)]
+    return {"min_us": min(runs), "median_us": statistics.median(runs), "number": number, "repeat": repeat}
+
+
+def sample_matrix(n_rows, seed=0):
+    """Plausible feature rows: vitals around normal values, 0/1 answers."""
+    rng = np.random.default_rng(seed)
+    payload = prediction.build_payload(FORM1, FORM2)
+    base = np.array([payload[f] for f in prediction.FEATURES], dtype=np.float32)
+    X = np.tile(base, (n_rows, 1))
+    X[:, :7] *= rng.normal(1.0, 0.05, size=(n_rows, 7)).astype(np.float32)
+    X[:, 10:] = rng.integers(0, 2, size=(n_rows, len(prediction.FEATURES) - 10))
+    return X
+
+
+# ---------- Stages ----------
+def bench_load(registry, repeat):
+    def load(backend):
+        ModelRegistry._loaded.clear()
+        registry.load(backend=backend)
+    return {f"load_model[{backend}]": measure(lambda b=backend: load(b), repeat) for backend in BACKENDS}
+
+
+def bench_payload(repeat):
+    import pandas as pd
+
+    payload = prediction.build_payload(FORM1, FORM2)
+    encoder = FeatureEncoder(prediction.FEATURES)
+    return {
+        "build_payload": measure(lambda: prediction.build_payload(FORM1, FORM2), repeat),
+        "parse_payload": measure(lambda: prediction.parse_payload({"form1": FORM1, "form2": FORM2}), repeat),
+        "pd.DataFrame([payload])": measure(lambda: pd.DataFrame([payload]), repeat),
+        "FeatureEncoder.encode": measure(lambda: encoder.encode(payload), repeat),
+    }
+
+
+def bench_predict(registry, repeat):
+    results = {}
+    for backend in BACKENDS:
+        model, _ = registry.load(backend=backend)
+        for n_rows in BATCH_SIZES:
+            X = sample_matrix(n_rows)
+            results[f"predict_proba[{backend}, batch={n_rows}]"] = measure(
+                lambda m=model, X=X: m.predict_proba(X), repeat)
+    return results
+
+
+def bench_recommendations(repeat):
+    payload = prediction.build_payload(FORM1, FORM2)
+    X = sample_matrix(100_000)
+    columns = dict(zip(prediction.FEATURES, X.T))
+    labels = np.arange(len(X)) % 2
+    return {
+        "get_recommendations": measure(lambda: prediction.get_recommendations(payload, 1), repeat),
+        "RULE_ENGINE.recommend_batch[100000]": measure(
+            lambda: RULE_ENGINE.recommend_batch(columns, labels), repeat),
+    }
+
+
+def bench_result_page(repeat):
+    # Render the model on every rerun rather than answering from the caches.
+    os.environ["INFLUENZA_PREDICTION_CACHE_SIZE"] = "0"
+    os.environ["INFLUENZA_SPLIT_MEMO_SIZE"] = "0"
+    os.chdir(BACKEND_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(BACKEND_DIR / "streamlit_influenza_app.py"), default_timeout=60).run()
+    at.button[0].click().run()
+    for box, value in zip(at.text_input, FORM1_TEXT):
+        box.input(value)
+    at.button[0].click().run()
+    at.button[0].click().run()
+    if at.exception or not any("result-badge" in m.value for m in at.markdown):
+        raise RuntimeError(f"Result page did not render: {at.exception}")
+    return {"result_page_rerun[AppTest]": measure(at.run, repeat, min_seconds=1.0)}
+
+
+# ---------- Reporting ----------
+def compare(results, baseline, threshold):
+    """Print median changes against ``baseline``; return the regressed names."""
+    regressed = []
+    print(f"\n{'stage':<44} {'before':>12} {'after':>12} {'change':>8}")
+    for name, row in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        change = row["median_us"] / old["median_us"] - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<44} {old['median_us']:>10.1f}us {row['median_us']:>10.1f}us {change:>+7.0%}{flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per stage")
+    parser.add_argument("--filter", default="", help="only run stages whose name contains this")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="median slowdown counted as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    json_path = pathlib.Path(args.json).resolve() if args.json else None
+    compare_path = pathlib.Path(args.compare).resolve() if args.compare else None
+
+    warnings.filterwarnings("ignore")
+    registry = ModelRegistry()
+    _, manifest = registry.load()
+    stages = (
+        ("load", lambda: bench_load(registry, args.repeat)),
+        ("payload", lambda: bench_payload(args.repeat)),
+        ("predict", lambda: bench_predict(registry, args.repeat)),
+        ("recommendations", lambda: bench_recommendations(args.repeat)),
+        ("result_page", lambda: bench_result_page(args.repeat)),
+    )
+
+    results = {}
+    print(f"{'stage':<44} {'min':>12} {'median':>12}")
+    for group, run in stages:
+        if args.filter and args.filter not in group:
+            continue
+        for name, row in run().items():
+            results[name] = row
+            print(f"{name:<44} {row['min_us']:>10.1f}us {row['median_us']:>10.1f}us")
+
+    if json_path:
+        import xgboost
+        json_path.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "xgboost": xgboost.__version__,
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+                "model_version": manifest["version"],
+                "model_sha256": manifest["sha256"],
+            },
+            "results": results,
+        }, indent=2) + "\n")
+
+    if compare_path:
+        baseline = json.loads(compare_path.read_text())["results"]
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
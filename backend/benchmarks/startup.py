@@ -0,0 +1,131 @@
+"""Cold-start budget: import time per module and model load time.
+
+Every measurement runs in a fresh interpreter so nothing is warm::
+
+    python backend/benchmarks/startup.py [--repeat 3] [--json startup.json]
+
+Reports ``python -X importtime`` cumulative time for each heavy dependency
+and for our own serving modules (broken down by the modules they import
+directly), then import + load + first predict for every way of loading the model.
+"""
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+
+DEPENDENCIES = ("numpy", "pandas", "joblib", "sklearn", "xgboost", "streamlit")
+SERVING_MODULES = ("prediction", "registry", "batching", "api")
+HEAVY_MODULES = ("xgboost", "sklearn", "pandas", "joblib", "streamlit")
+
+LOAD_SCENARIOS = (
+    ("native json (xgboost)", "prediction.load_model('models/v1/model.json', backend='xgboost')"),
+    ("native json (compiled)", "prediction.load_model('models/v1/model.json', backend='compiled')"),
+    ("registry (cached npz)", "registry.ModelRegistry().load(backend='compiled')[0]"),
+)
+
+_LOAD_SNIPPET = """
+import json, sys, time, warnings
+warnings.filterwarnings("ignore")
+t0 = time.perf_counter()
+import prediction, registry
+t1 = time.perf_counter()
+model = {loader}
+t2 = time.perf_counter()
+prediction.predict_payload(model, dict.fromkeys(prediction.FEATURES, 0))
+t3 = time.perf_counter()
+print(json.dumps({{
+    "import_s": t1 - t0, "load_s": t2 - t1, "first_predict_s": t3 - t2,
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def _run(args):
+    return subprocess.run(
+        [sys.executable, *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+
+
+# ---------- Import time ----------
+def _parse_importtime(stderr):
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return entries
+
+
+def import_profile(module):
+    """Cumulative import time of ``module`` and of each module it imports directly."""
+    entries = _parse_importtime(_run(["-X", "importtime", "-c", f"import {module}"]).stderr)
+    children = []
+    for depth, _, cumulative_us, name in entries:
+        if depth == 1:
+            children.append((name, cumulative_us))
+        elif depth == 0:
+            if name == module:
+                return {"cumulative_ms": cumulative_us / 1000,
+                        "children_ms": {n: us / 1000 for n, us in sorted(children, key=lambda c: -c[1])}}
+            children = []
+    raise RuntimeError(f"{module} not found in importtime output")
+
+
+# ---------- Load time ----------
+def load_profile(loader):
+    snippet = _LOAD_SNIPPET.format(loader=loader, heavy=HEAVY_MODULES)
+    return json.loads(_run(["-c", snippet]).stdout.strip().splitlines()[-1])
+
+
+def _median_of(runs, key):
+    return statistics.median(run[key] for run in runs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=5, help="direct imports to list per serving module")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {"python": sys.version.split()[0], "imports": {}, "loads": {}}
+
+    print("Import time (cumulative, median of %d)" % args.repeat)
+    for module in DEPENDENCIES + SERVING_MODULES:
+        try:
+            runs = [import_profile(module) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError:
+            print(f"  {module:<24} not installed")
+            continue
+        cumulative = statistics.median(r["cumulative_ms"] for r in runs)
+        results["imports"][module] = {"cumulative_ms": cumulative, "children_ms": runs[-1]["children_ms"]}
+        print(f"  {module:<24} {cumulative:9.1f} ms")
+        if module in SERVING_MODULES:
+            for child, ms in list(runs[-1]["children_ms"].items())[:args.top]:
+                print(f"    {child:<22} {ms:9.1f} ms")
+
+    print("\nModel load (import prediction + load + first predict, median of %d)" % args.repeat)
+    for label, loader in LOAD_SCENARIOS:
+        runs = [load_profile(loader) for _ in range(args.repeat)]
+        summary = {key: _median_of(runs, key) for key in ("import_s", "load_s", "first_predict_s")}
+        summary["total_s"] = sum(summary.values())
+        summary["heavy_modules"] = runs[-1]["heavy_modules"]
+        results["loads"][label] = summary
+        print(f"  {label:<24} import {summary['import_s'] * 1000:7.1f} ms  "
+              f"load {summary['load_s'] * 1000:7.1f} ms  "
+              f"first predict {summary['first_predict_s'] * 1000:6.1f} ms  "
+              f"total {summary['total_s'] * 1000:7.1f} ms  "
+              f"heavy: {', '.join(summary['heavy_modules']) or '-'}")
+
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
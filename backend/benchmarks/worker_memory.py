@@ -0,0 +1,85 @@
+"""Memory per inference worker, with and without the shared model copy.
+
+Starts an ``InferencePool`` for the serving model at each worker count, once
+with the compiled node tables in one shared-memory segment and once with
+every worker loading its own copy from the registry, scores a batch so the
+workers are warm, then reads each worker's ``/proc/<pid>/smaps_rollup``::
+
+    python backend/benchmarks/worker_memory.py [--workers 1,2,4] [--json worker_memory.json]
+
+``private`` is what a worker adds on its own; ``pss`` splits shared pages
+between the processes mapping them, so ``total pss`` is the fair cost of
+the whole pool. Linux only.
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import sys
+import warnings
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from inference_pool import InferencePool, load_registry_model  # noqa: E402
+from registry import ModelRegistry  # noqa: E402
+from tree_compiler import sample_inputs  # noqa: E402
+
+
+def measure(model, loader, workers, shared):
+    pool = InferencePool(model, loader, workers=workers, shared=shared)
+    try:
+        pool.predict_proba(sample_inputs(model, 4096))
+        rows = pool.worker_memory()
+        model_bytes = pool.shared.nbytes if pool.shared else None
+    finally:
+        pool.close()
+    if any("rss" not in row for row in rows):
+        raise RuntimeError("needs /proc/<pid>/smaps_rollup (Linux)")
+    return {
+        "workers": workers,
+        "shared": shared,
+        "shared_model_bytes": model_bytes,
+        "per_worker": rows,
+        "mean_rss_mb": round(statistics.fmean(row["rss"] for row in rows), 1),
+        "mean_private_mb": round(statistics.fmean(row["private"] for row in rows), 1),
+        "total_pss_mb": round(sum(row["pss"] for row in rows), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--version", help="registry version (default: the serving one)")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore")
+    registry = ModelRegistry()
+    model, manifest = registry.load(args.version, backend="compiled")
+    loader = (load_registry_model, (str(registry.root), manifest["version"], "compiled"))
+    tables = model.shared_layout()["nbytes"]
+    print(f"{manifest['version']}: {model.n_trees} trees, {model.n_nodes} nodes, "
+          f"{tables / 1024:.0f} KB of node tables")
+
+    results = []
+    print(f"\n{'workers':>7} {'model':<8} {'rss/worker':>11} {'private/worker':>15} {'total pss':>10}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        for shared in (False, True):
+            row = measure(model, loader, workers, shared)
+            results.append(row)
+            print(f"{workers:>7} {'shared' if shared else 'copied':<8} {row['mean_rss_mb']:>9.1f}MB "
+                  f"{row['mean_private_mb']:>13.1f}MB {row['total_pss_mb']:>8.1f}MB")
+
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps({
+            "cpus": os.cpu_count(),
+            "model_version": manifest["version"],
+            "node_table_bytes": tables,
+            "results": results,
+        }, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Precompiled feature encoder.
+
+Building ``pd.DataFrame([payload])`` for a single row costs more than
+evaluating the trees. ``FeatureEncoder`` is built once from the model's
+stored feature names and writes payload dicts straight into a contiguous
+float32 matrix in the booster's column order, which ``model.predict_proba``
+and ``Booster.inplace_predict`` accept as is.
+"""
+import numpy as np
+
+
+class PayloadError(ValueError):
+    """Raised when a payload does not match the fields the model expects."""
+
+    def __init__(self, message, missing=(), unexpected=(), invalid=(), errors=()):
+        super().__init__(message)
+        self.missing = list(missing)
+        self.unexpected = list(unexpected)
+        self.invalid = list(invalid)
+        self.errors = list(errors)  # per-field {"field", "code", "message"} (schema.py)
+
+    def to_dict(self):
+        return {
+            "error": str(self),
+            "missing": self.missing,
+            "unexpected": self.unexpected,
+            "invalid": self.invalid,
+            "errors": self.errors,
+        }
+
+
+class FeatureEncoder:
+    """Map payload dicts to float32 rows in a fixed column order."""
+
+    dtype = np.float32
+
+    def __init__(self, feature_names):
+        self.feature_names = tuple(feature_names)
+        self.n_features = len(self.feature_names)
+        self._key_set = frozenset(self.feature_names)
+        if len(self._key_set) != self.n_features:
+            raise ValueError("feature_names contains duplicates")
+
+    @classmethod
+    def from_model(cls, model, default=None):
+        """Build the encoder from the feature names stored in the model.
+
+        Looks at the XGBoost booster first, then sklearn's
+        ``feature_names_in_``; falls back to ``default``.
+        """
+        names = None
+        if hasattr(model, "get_booster"):
+            names = model.get_booster().feature_names
+        if names is None:
+            names = getattr(model, "feature_names", None)
+        if names is None and getattr(model, "feature_names_in_", None) is not None:
+            names = list(model.feature_names_in_)
+        if names is None:
+            names = default
+        if names is None:
+            raise ValueError("Model does not expose feature names; pass them explicitly.")
+        return cls(names)
+
+    # ---------- Validation ----------
+    def validate(self, payload):
+        if payload.keys() == self._key_set:
+            return
+        missing = [f for f in self.feature_names if f not in payload]
+        unexpected = sorted(k for k in payload if k not in self._key_set)
+        raise PayloadError("Invalid payload.", missing, unexpected)
+
+    def _invalid_fields(self, payload):
+        invalid = []
+        for f in self.feature_names:
+            try:
+                self.dtype(payload[f])
+            except (TypeError, ValueError):
+                invalid.append(f)
+        return invalid
+
+    # ---------- Encoding ----------
+    def empty(self, n_rows=1):
+        return np.empty((n_rows, self.n_features), dtype=self.dtype)
+
+    def encode(self, payload, out=None):
+        """Encode one payload into a ``(1, n_features)`` row.
+
+        ``out`` may be a preallocated row (see ``empty``) to reuse.
+        """
+        return self.encode_batch((payload,), out)
+
+    def encode_batch(self, payloads, out=None):
+        """Encode a sequence of payloads into an ``(n, n_features)`` matrix.
+
+        ``None`` values become NaN, which XGBoost treats as missing.
+        """
+        if not isinstance(payloads, (list, tuple)):
+            payloads = list(payloads)
+        if out is None:
+            out = self.empty(len(payloads))
+        elif out.shape != (len(payloads), self.n_features) or out.dtype != self.dtype:
+            raise ValueError(f"out must be a {self.dtype.__name__} array of shape "
+                             f"({len(payloads)}, {self.n_features})")
+        names = self.feature_names
+        for i, payload in enumerate(payloads):
+            self.validate(payload)
+            try:
+                out[i] = [payload[f] for f in names]
+            except (TypeError, ValueError):
+                raise PayloadError("Invalid payload.", invalid=self._invalid_fields(payload)) from None
+        return out
+
+    def decode(self, row):
+        """Inverse of ``encode`` for a single row, mainly for debugging."""
+        return dict(zip(self.feature_names, np.asarray(row, dtype=float).ravel().tolist()))
@@ -0,0 +1,393 @@
+"""Optional process pool that scores batches outside the Streamlit process.
+
+Streamlit runs every session's script in a thread of one process, so model
+calls made there compete with UI work for the GIL (and, with the xgboost
+backend, for XGBoost's own thread pool). ``InferencePool`` keeps a preloaded
+replica of the served model in each of ``workers`` worker processes:
+
+* feature rows go to a worker through a shared-memory input buffer and the
+  probabilities come back through a shared-memory output buffer; the pipe
+  to each worker only carries the row count
+* each worker gets an explicit thread budget (``threads``) through
+  ``OMP_NUM_THREADS`` and friends and XGBoost's ``nthread``, so
+  ``workers * threads`` can be kept at or under the core count
+* batches larger than ``max_rows`` are split across idle workers
+* a ``CompiledForest`` is not loaded per worker: its node tables are copied
+  once into a shared-memory segment (``SharedForest``) and every worker
+  attaches read-only views to it, so a worker only adds the interpreter and
+  NumPy. ``stats()["worker_memory_mb"]`` has each worker's RSS/PSS. The
+  xgboost backend's booster lives in native memory and is still loaded by
+  each worker.
+
+The pool has the ``predict``/``predict_proba``/``feature_names`` interface
+of a loaded model, so ``PredictionService`` hands it to the micro-batcher in
+place of the model and nothing else changes. If a worker dies, its batch is
+scored in-process with the local model and the worker is restarted.
+
+Configuration from the environment (see ``InferencePool.from_env``):
+
+``INFLUENZA_INFERENCE_WORKERS``   worker processes (default 0: in-process)
+``INFLUENZA_INFERENCE_THREADS``   threads per worker (default cores / workers)
+``INFLUENZA_INFERENCE_MAX_ROWS``  rows per shared-memory buffer (default 4096)
+``INFLUENZA_INFERENCE_SHARED``    set to 0 to load a compiled model per worker
+"""
+import collections
+import os
+import pathlib
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from tree_compiler import CompiledForest
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                   "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+
+def load_registry_model(root, version, backend):
+    """Worker-side loader for a registry version (must be picklable)."""
+    from registry import ModelRegistry
+
+    return ModelRegistry(root).load(version, backend=backend)[0]
+
+
+def _attach(name):
+    """Open the parent's segment without taking ownership of it."""
+    try:
+        return SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        from multiprocessing import resource_tracker
+
+        shm = SharedMemory(name=name)
+        # Otherwise this process's resource tracker unlinks it at exit.
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def attach_forest(name, layout):
+    """Worker-side loader for a ``SharedForest`` (must be picklable)."""
+    shm = _attach(name)
+    forest = CompiledForest.from_buffer(shm.buf, layout)
+    forest._shm = shm  # keep the mapping for as long as the views
+    return forest
+
+
+class SharedForest:
+    """One shared-memory copy of a ``CompiledForest``'s node tables."""
+
+    def __init__(self, forest):
+        self.layout = forest.shared_layout()
+        self.nbytes = self.layout["nbytes"]
+        self.shm = SharedMemory(create=True, size=max(self.nbytes, 1))
+        forest.copy_into(self.shm.buf, self.layout)
+
+    @property
+    def loader(self):
+        return attach_forest, (self.shm.name, self.layout)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def process_memory(pid):
+    """``{"rss", "pss", "shared", "private"}`` of ``pid`` in MB (Linux), or ``None``."""
+    try:
+        lines = pathlib.Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]
+    except OSError:
+        return None
+    kb = {key: int(value.split()[0]) for key, value in (line.split(":", 1) for line in lines)}
+    return {
+        "rss": round(kb["Rss"] / 1024, 1),
+        "pss": round(kb["Pss"] / 1024, 1),
+        "shared": round((kb["Shared_Clean"] + kb["Shared_Dirty"]) / 1024, 1),
+        "private": round((kb["Private_Clean"] + kb["Private_Dirty"]) / 1024, 1),
+    }
+
+
+def _worker_main(conn):
+    loader, threads, n_features, max_rows, in_name, out_name = conn.recv()
+    load, args = loader
+    model = load(*args)
+    if hasattr(model, "get_booster"):
+        model.get_booster().set_param({"nthread": threads})
+    shm_in, shm_out = _attach(in_name), _attach(out_name)
+    X_buf = np.ndarray((max_rows, n_features), dtype=np.float32, buffer=shm_in.buf)
+    p_buf = np.ndarray((max_rows,), dtype=np.float64, buffer=shm_out.buf)
+    conn.send(("ready", os.getpid()))
+    try:
+        while True:
+            n_rows = conn.recv()
+            if n_rows is None:
+                break
+            try:
+                p_buf[:n_rows] = model.predict_proba(X_buf[:n_rows])[:, 1]
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+            else:
+                conn.send(("ok", n_rows))
+    except (EOFError, KeyboardInterrupt):
+        pass  # parent went away
+    finally:
+        del X_buf, p_buf
+        shm_in.close()
+        shm_out.close()
+
+
+class InferenceError(RuntimeError):
+    """The model raised inside a worker process."""
+
+
+class _Worker:
+    """One worker process and its pair of shared-memory buffers."""
+
+    def __init__(self, loader, threads, n_features, max_rows, start_timeout):
+        self.shm_in = SharedMemory(create=True, size=max_rows * n_features * 4)
+        self.shm_out = SharedMemory(create=True, size=max_rows * 8)
+        self.X = np.ndarray((max_rows, n_features), dtype=np.float32, buffer=self.shm_in.buf)
+        self.p = np.ndarray((max_rows,), dtype=np.float64, buffer=self.shm_out.buf)
+        # A plain subprocess rather than multiprocessing's spawn, which would
+        # re-run __main__ -- under Streamlit, the app script itself.
+        parent_sock, child_sock = socket.socketpair()
+        env = dict(os.environ, **{k: str(threads) for k in THREAD_ENV_VARS})
+        with child_sock:
+            self.process = subprocess.Popen(
+                [sys.executable, __file__, str(child_sock.fileno())],
+                env=env, pass_fds=(child_sock.fileno(),), stdin=subprocess.DEVNULL)
+        self.conn = Connection(parent_sock.detach())
+        try:
+            self.conn.send((loader, threads, n_features, max_rows, self.shm_in.name, self.shm_out.name))
+            if not self.conn.poll(start_timeout):
+                raise RuntimeError(f"inference worker did not start within {start_timeout}s")
+            self.conn.recv()
+        except BaseException:
+            self.close()
+            raise
+
+    def send(self, X):
+        n_rows = len(X)
+        self.X[:n_rows] = X
+        self.conn.send(n_rows)
+
+    def receive(self, out):
+        status, value = self.conn.recv()
+        if status != "ok":
+            raise InferenceError(value)
+        out[:] = self.p[:value]
+
+    def close(self, timeout=5.0):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait(timeout)
+        self.conn.close()
+        del self.X, self.p
+        for shm in (self.shm_in, self.shm_out):
+            shm.close()
+            shm.unlink()
+
+
+class InferencePool:
+    """Model replicas in worker processes behind a model-like interface."""
+
+    def __init__(self, model, loader, workers=2, threads=None, max_rows=4096, start_timeout=60.0,
+                 shared=True):
+        from prediction import get_encoder  # not imported by the workers
+
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.model = model  # in-process fallback; also supplies the feature order
+        self.loader = loader  # (picklable function, args) that loads the model
+        self.workers = int(workers)
+        self.threads = int(threads or max(1, (os.cpu_count() or 1) // self.workers))
+        self.max_rows = int(max_rows)
+        self.start_timeout = float(start_timeout)
+        self.feature_names = list(get_encoder(model).feature_names)
+        self.classes_ = np.array([0, 1])
+        self.shared = SharedForest(model) if shared and isinstance(model, CompiledForest) else None
+        self._processes = {}  # live worker -> pid
+        self._idle = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.calls = self.rows = self.fallbacks = self.restarts = 0
+        for _ in range(self.workers):
+            self._idle.put(self._start_worker())
+
+    @classmethod
+    def from_env(cls, model, loader, **overrides):
+        """The pool configured by the environment, or ``None`` when disabled."""
+        threads = os.environ.get("INFLUENZA_INFERENCE_THREADS")
+        options = {
+            "workers": int(os.environ.get("INFLUENZA_INFERENCE_WORKERS", 0)),
+            "threads": int(threads) if threads else None,
+            "max_rows": int(os.environ.get("INFLUENZA_INFERENCE_MAX_ROWS", 4096)),
+            "shared": os.environ.get("INFLUENZA_INFERENCE_SHARED", "1") != "0",
+        }
+        options.update(overrides)
+        if options["workers"] < 1:
+            return None
+        return cls(model, loader, **options)
+
+    def _start_worker(self):
+        loader = self.shared.loader if self.shared else self.loader
+        worker = _Worker(loader, self.threads, len(self.feature_names), self.max_rows, self.start_timeout)
+        with self._lock:
+            if not self._closed:
+                self._processes[worker] = worker.process.pid
+                return worker
+        worker.close()  # close() ran while this one was starting
+        raise RuntimeError("InferencePool is closed")
+
+    # ---------- Model interface ----------
+    def predict_proba(self, X):
+        if self._closed:
+            raise RuntimeError("InferencePool is closed")
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        p = np.empty(len(X), dtype=np.float64)
+        pending = collections.deque()  # (worker, start, stop) in flight
+        try:
+            for start in range(0, len(X), self.max_rows):
+                stop = min(start + self.max_rows, len(X))
+                worker = self._try_acquire()
+                # Never block for a second worker while holding one, or two
+                # large calls could each wait on the other's workers.
+                while worker is None and pending:
+                    self._finish(*pending.popleft(), X, p)
+                    worker = self._try_acquire()
+                if worker is None:
+                    worker = self._idle.get()
+                try:
+                    worker.send(X[start:stop])
+                except (OSError, ValueError):
+                    self._replace(worker)
+                    p[start:stop] = self.model.predict_proba(X[start:stop])[:, 1]
+                    continue
+                pending.append((worker, start, stop))
+            while pending:
+                self._finish(*pending.popleft(), X, p)
+        finally:
+            # Only reached with work in flight if something raised above.
+            for worker, _, _ in pending:
+                self._replace(worker)
+        with self._lock:
+            self.calls += 1
+            self.rows += len(X)
+        return np.column_stack((1.0 - p, p))
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+    def _try_acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _finish(self, worker, start, stop, X, p):
+        try:
+            worker.receive(p[start:stop])
+        except InferenceError:
+            self._idle.put(worker)  # the worker itself is fine
+            raise
+        except (EOFError, OSError):
+            self._replace(worker)
+            p[start:stop] = self.model.predict_proba(X[start:stop])[:, 1]
+        else:
+            self._idle.put(worker)
+
+    def _replace(self, worker):
+        """Retire a dead worker and start a new one in its slot."""
+        with self._lock:
+            self.fallbacks += 1
+            self._processes.pop(worker, None)
+        worker.close(timeout=1.0)
+        if self._closed:
+            return
+        try:
+            self._idle.put(self._start_worker())
+            with self._lock:
+                self.restarts += 1
+        except Exception:
+            self._idle.put(_InProcess(self.model))
+
+    # ---------- Lifecycle ----------
+    def worker_memory(self):
+        """``process_memory`` of every live worker, with its ``pid``."""
+        with self._lock:
+            pids = sorted(self._processes.values())
+        return [dict(pid=pid, **(process_memory(pid) or {})) for pid in pids]
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "workers": self.workers,
+                "threads_per_worker": self.threads,
+                "max_rows": self.max_rows,
+                "shared_model_bytes": self.shared.nbytes if self.shared else None,
+                "calls": self.calls,
+                "rows": self.rows,
+                "fallbacks": self.fallbacks,
+                "restarts": self.restarts,
+            }
+        stats["worker_memory_mb"] = self.worker_memory()
+        return stats
+
+    def close(self, timeout=5.0):
+        """Stop every worker, giving batches in flight up to ``timeout`` to finish."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        # Wait for busy workers to come back, but not for ones a concurrent
+        # _replace() retired without putting anything on the idle queue.
+        deadline = time.monotonic() + timeout
+        for _ in range(self.workers):
+            try:
+                self._idle.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                break
+        with self._lock:
+            workers, self._processes = list(self._processes), {}
+        for worker in workers:
+            worker.close()
+        if self.shared is not None:
+            self.shared.close()
+
+
+class _InProcess:
+    """Stand-in for a worker that could not be restarted."""
+
+    def __init__(self, model):
+        self.model = model
+        self._X = None
+
+    def send(self, X):
+        self._X = X
+
+    def receive(self, out):
+        X, self._X = self._X, None
+        try:
+            out[:] = self.model.predict_proba(X)[:, 1]
+        except Exception as e:
+            raise InferenceError(f"{type(e).__name__}: {e}") from e
+
+    def close(self, timeout=None):
+        pass
+
+
+if __name__ == "__main__":
+    _worker_main(Connection(int(sys.argv[1])))
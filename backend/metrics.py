@@ -0,0 +1,236 @@
+"""Hot-path latency and throughput metrics in OpenMetrics text format.
+
+The prediction path is wrapped in ``stage(name)`` timers that feed one
+histogram, ``influenza_stage_seconds{stage=...}``:
+
+``css``              stylesheet injection (Streamlit pages)
+``form_parse``       turning form input / request bodies into a payload
+``encode``           building the feature matrix
+``predict``          the model call
+``recommendations``  the recommendation rules
+
+Counters cover predictions served and model errors (the UI's "Prediction
+Error" branch and API 500s). Cache, split memo and batching counters are
+read from ``PredictionService.stats()`` at scrape time, so they cost nothing
+on the hot path.
+
+``GET /metrics`` on the JSON API serves ``REGISTRY.render()``; the Streamlit
+process serves it on ``127.0.0.1:INFLUENZA_METRICS_PORT`` when that is set.
+``INFLUENZA_METRICS=0`` turns every timer and counter into a no-op.
+"""
+import bisect
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Seconds; the hot-path stages are tens of microseconds to tens of milliseconds.
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.enabled = True
+        self._values = {}  # label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield "_total", dict(zip(self.labelnames, labels)), value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.enabled = True
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        if not self.enabled:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels) if self.enabled else NULL_TIMER
+
+    def samples(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), values):
+                cumulative += count
+                yield "_bucket", {**base, "le": _format_value(float(bound))}, cumulative
+            yield "_count", base, cumulative
+            yield "_sum", base, values[-1]
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """Metric families plus scrape-time collectors, rendered as OpenMetrics."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def _add(self, metric):
+        metric.enabled = self.enabled
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def set_collector(self, key, collect):
+        """Register ``collect() -> [(name, type, help, samples)]`` under ``key``.
+
+        ``samples`` are ``(suffix, labels, value)``; a later call with the same
+        key replaces the collector (e.g. after a model reload).
+        """
+        with self._lock:
+            if collect is None:
+                self._collectors.pop(key, None)
+            else:
+                self._collectors[key] = collect
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors.values())
+        families = [(m.name, m.type, m.help, m.samples()) for m in metrics]
+        for collect in collectors:
+            families.extend(collect())
+        lines = []
+        for name, type_, help_, samples in families:
+            lines.append(f"# TYPE {name} {type_}")
+            lines.append(f"# HELP {name} {_escape(help_)}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry(enabled=os.environ.get("INFLUENZA_METRICS", "1") != "0")
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "influenza_stage_seconds", "Time spent in each stage of a prediction.", ("stage",))
+PREDICTIONS = REGISTRY.counter("influenza_predictions", "Predictions served, including cache hits.")
+MODEL_ERRORS = REGISTRY.counter(
+    "influenza_model_errors", "Predictions that failed with an error.", ("source",))
+
+
+def stage(name):
+    """Context manager timing one hot-path stage (a no-op when disabled)."""
+    return STAGE_SECONDS.time(name)
+
+
+# ---------- Endpoint ----------
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve ``/metrics`` from a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def serve_from_env():
+    """``serve(INFLUENZA_METRICS_PORT)`` if that is set and metrics are on."""
+    port = os.environ.get("INFLUENZA_METRICS_PORT")
+    if not port or not REGISTRY.enabled:
+        return None
+    return serve(int(port), os.environ.get("INFLUENZA_METRICS_HOST", "127.0.0.1"))
@@ -0,0 +1,91 @@
+"""Native XGBoost model files instead of joblib pickles.
+
+Unpickling a joblib ``.pkl`` imports sklearn and the whole xgboost
+sklearn wrapper just to rebuild an ``XGBClassifier``. The model is now also
+stored in XGBoost's own JSON format (``.json``; ``.ubj`` UBJSON also works
+with the xgboost backend), which can be served two ways:
+
+``compiled`` (default)  ``tree_compiler.CompiledForest`` built straight from
+                        the JSON, no xgboost import at all
+``xgboost``             a raw ``xgboost.Booster`` behind ``BoosterModel``
+
+Pick the backend with ``INFLUENZA_MODEL_BACKEND``. Served models live in the
+registry (``registry.py register`` converts pickles); a one-off conversion::
+
+    python backend/model_io.py path/to/model.pkl model.json
+"""
+import argparse
+import os
+
+import numpy as np
+
+BACKENDS = ("compiled", "xgboost")
+NATIVE_SUFFIXES = (".json", ".ubj")
+
+
+class BoosterModel:
+    """``predict``/``predict_proba`` over a raw ``xgboost.Booster``."""
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, booster):
+        self.booster = booster
+        self.feature_names = booster.feature_names
+
+    def get_booster(self):
+        return self.booster
+
+    def predict_proba(self, X):
+        p = np.asarray(self.booster.inplace_predict(X, validate_features=False), dtype=np.float64)
+        return np.column_stack((1.0 - p, p))
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+
+def default_backend():
+    backend = os.environ.get("INFLUENZA_MODEL_BACKEND", "compiled")
+    if backend not in BACKENDS:
+        raise ValueError(f"INFLUENZA_MODEL_BACKEND must be one of {BACKENDS}, got {backend!r}")
+    return backend
+
+
+def load_native(path, backend=None):
+    """Load a native XGBoost model file with the chosen backend."""
+    backend = backend or default_backend()
+    if backend == "compiled" and str(path).endswith(".json"):
+        from tree_compiler import compile_json
+        return compile_json(path)
+
+    import xgboost
+
+    booster = xgboost.Booster()
+    booster.load_model(str(path))
+    return BoosterModel(booster)
+
+
+def export_native(model, path):
+    """Save the booster inside ``model`` in XGBoost's native format."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    booster.save_model(str(path))
+
+
+def main(argv=None):
+    import prediction
+
+    parser = argparse.ArgumentParser(description="Convert a pickled model to XGBoost's native format.")
+    parser.add_argument("source", help="pickled model, relative to the backend directory")
+    parser.add_argument("target", help="output .json or .ubj file, relative to the backend directory")
+    args = parser.parse_args(argv)
+
+    if not args.target.endswith(NATIVE_SUFFIXES):
+        parser.error(f"target must end with one of {NATIVE_SUFFIXES}")
+    model = prediction.load_model(args.source)
+    if model is None:
+        parser.error(f"{args.source} not found")
+    export_native(model, prediction.BASE_DIR / args.target)
+    print(f"{args.source} -> {args.target}")
+
+
+if __name__ == "__main__":
+    main()
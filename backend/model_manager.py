@@ -0,0 +1,209 @@
+"""Hot model reload: background load, smoke test, atomic swap.
+
+``ModelManager`` owns the process's current ``PredictionService``. A daemon
+thread polls the registry every ``interval`` seconds; when the serving
+version, its manifest hash or the artifact's mtime changes it:
+
+1. builds a new service for that version off the request path
+   (``PredictionService.from_registry``, which verifies the SHA-256);
+2. smoke-tests it: the feature order must match ``schema.py``, the serving
+   path (batcher, pool, split memo) must agree with the bare model on
+   synthetic payloads, and p99 single-prediction latency must be within
+   ``max_p99_ms`` -- which also leaves it warm;
+3. swaps ``manager.service`` in one assignment.
+
+Callers read ``manager.service`` once per request or rerun, so in-flight
+work finishes on the service it started with; the old service is closed
+``drain_seconds`` after the swap and the registry forgets its model. A
+version that fails any step is logged in ``stats()``, is not kept loaded,
+and the current one keeps serving.
+
+Configuration from the environment (see ``ModelManager.from_env``):
+
+``INFLUENZA_RELOAD_INTERVAL``     seconds between registry checks (default 10,
+                                  0 disables hot reload)
+``INFLUENZA_RELOAD_DRAIN``        seconds before the old service is closed
+                                  (default 30)
+``INFLUENZA_RELOAD_MAX_P99_MS``   latency budget for the smoke test (default 100)
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+import metrics
+from prediction import get_encoder
+from registry import ModelRegistry, RegistryError
+from schema import SCHEMA
+
+
+class SmokeTestError(RuntimeError):
+    """A candidate version failed the pre-swap checks."""
+
+
+def _load_version(version):
+    from service import PredictionService
+
+    return PredictionService.from_registry(version)
+
+
+class ModelManager:
+    """The current ``PredictionService`` plus a watcher that replaces it."""
+
+    def __init__(self, service, load=_load_version, registry=None, version=None, interval=10.0,
+                 drain_seconds=30.0, max_p99_ms=100.0, smoke_rows=64, tolerance=1e-5,
+                 contributions=True):
+        self.service = service
+        self.load = load  # version -> PredictionService
+        self.registry = registry or ModelRegistry()
+        self.version = version  # pinned version; None follows the serving one
+        self.interval = float(interval)
+        self.drain_seconds = float(drain_seconds)
+        self.max_p99_ms = float(max_p99_ms)
+        self.smoke_rows = int(smoke_rows)
+        self.tolerance = float(tolerance)
+        self.contributions = contributions
+        self.swaps = self.rejected = 0
+        self.last_error = self.last_smoke_test = None
+        self._lock = threading.Lock()  # one reload at a time
+        self._stop = threading.Event()
+        self._thread = None
+        self._key = self._watch_key()
+        metrics.REGISTRY.set_collector("model_manager", self.metrics_families)
+
+    @classmethod
+    def from_env(cls, service, load=_load_version, **overrides):
+        options = {
+            "interval": float(os.environ.get("INFLUENZA_RELOAD_INTERVAL", 10)),
+            "drain_seconds": float(os.environ.get("INFLUENZA_RELOAD_DRAIN", 30)),
+            "max_p99_ms": float(os.environ.get("INFLUENZA_RELOAD_MAX_P99_MS", 100)),
+        }
+        options.update(overrides)
+        return cls(service, load, **options)
+
+    # ---------- Watching ----------
+    def _watch_key(self):
+        """``(version, sha256, artifact mtime)`` the registry points at, or ``None``."""
+        try:
+            version = self.version or self.registry.serving_version()
+            if not version:
+                return None
+            manifest = self.registry.manifest(version)
+            path = self.registry.root / version / manifest["artifact"]
+            return version, manifest["sha256"], path.stat().st_mtime_ns
+        except (RegistryError, OSError, ValueError, KeyError):
+            return None
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="model-reload", daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """Reload if the registry changed; returns True if a new version was swapped in."""
+        key = self._watch_key()
+        if key is None or key == self._key:
+            return False
+        # Remember the key even if the reload fails, so a bad version is not
+        # retried every poll; fixing it changes the mtime or hash again.
+        self._key = key
+        if key[1] == self.service.model_hash:
+            return False  # same artifact, only touched
+        return self.reload(key[0])
+
+    # ---------- Reloading ----------
+    def reload(self, version):
+        """Load, smoke-test and swap in ``version``; returns True on success."""
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                candidate = self.load(version)
+            except Exception as e:
+                return self._reject(version, f"load failed: {type(e).__name__}: {e}")
+            try:
+                report = self.smoke_test(candidate)
+            except Exception as e:
+                candidate.close()
+                if candidate.model_hash != self.service.model_hash:
+                    self.registry.evict(candidate.model_hash)
+                return self._reject(version, f"{type(e).__name__}: {e}")
+            report["version"] = candidate.version
+            report["reload_seconds"] = round(time.perf_counter() - started, 3)
+            old, self.service = self.service, candidate
+            metrics.REGISTRY.set_collector("service", candidate.metrics_families)
+            self.swaps += 1
+            self.last_smoke_test, self.last_error = report, None
+        timer = threading.Timer(self.drain_seconds, self._retire, (old,))
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _retire(self, old):
+        old.close()
+        if old.model_hash != self.service.model_hash:
+            self.registry.evict(old.model_hash)
+
+    def _reject(self, version, error):
+        self.rejected += 1
+        self.last_error = {"version": version, "error": error}
+        return False
+
+    def smoke_test(self, candidate):
+        """Raise ``SmokeTestError`` unless ``candidate`` is fit to serve.
+
+        Also warms it, so the first real request after the swap is not cold.
+        """
+        from readiness import synthetic_payloads
+
+        names = candidate.manifest.get("feature_names") or getattr(candidate.model, "feature_names", None)
+        if not names:
+            raise SmokeTestError("model has no feature names to check against the schema")
+        if tuple(names) != SCHEMA.names:
+            raise SmokeTestError(f"{len(names)} features do not match the schema's {len(SCHEMA.names)}")
+        candidate.warm_up(synthetic_payloads(self.smoke_rows, seed=1), self.contributions)
+
+        # Fresh payloads, so the split memo cannot answer from the warm-up.
+        payloads = synthetic_payloads(self.smoke_rows, seed=2)
+        reference = candidate.model.predict_proba(get_encoder(candidate.model).encode_batch(payloads))[:, 1]
+        served, latencies = [], []
+        for payload in payloads:
+            began = time.perf_counter()
+            served.append(candidate.score(payload).probability)
+            latencies.append(time.perf_counter() - began)
+        diff = float(np.max(np.abs(np.asarray(served, dtype=np.float64) - reference)))
+        if diff > self.tolerance:
+            raise SmokeTestError(f"serving path differs from the model by {diff:.3g}")
+        p50, p99 = np.percentile(latencies, (50, 99)) * 1000
+        if p99 > self.max_p99_ms:
+            raise SmokeTestError(f"p99 latency {p99:.1f}ms over the {self.max_p99_ms:g}ms budget")
+        return {"rows": len(payloads), "parity_max_abs_diff": diff,
+                "p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3)}
+
+    # ---------- Lifecycle ----------
+    def stats(self):
+        return {
+            "model_version": self.service.version,
+            "watching": self.version or "serving",
+            "interval_seconds": self.interval,
+            "swaps": self.swaps,
+            "rejected": self.rejected,
+            "last_smoke_test": self.last_smoke_test,
+            "last_error": self.last_error,
+        }
+
+    def metrics_families(self):
+        return [
+            ("influenza_model_reloads", "counter", "Hot reload attempts by outcome.",
+             [("_total", {"result": "swapped"}, self.swaps),
+              ("_total", {"result": "rejected"}, self.rejected)]),
+        ]
+
+    def close(self):
+        self._stop.set()
+        self.service.close()
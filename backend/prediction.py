@@ -0,0 +1,167 @@
+"""Model loading, payload assembly and recommendation logic.
+
+Shared by the Streamlit UI (``streamlit_influenza_app.py``) and the headless
+JSON API (``api.py``) so both paths predict and advise exactly the same way.
+"""
+import pathlib
+import weakref
+from collections import namedtuple
+from datetime import date
+
+import metrics
+from encoder import FeatureEncoder, PayloadError
+from model_io import NATIVE_SUFFIXES, load_native
+from recommendations import RULE_ENGINE
+from schema import SCHEMA
+
+BASE_DIR = pathlib.Path(__file__).parent
+
+# Kolom yang dibangun FormPage1 dan FormPage2, urutan sama dengan model.
+FORM1_FIELDS = (
+    "heightcm", "weightkg", "as_edenroll_temp", "pulse", "rr", "sbp", "o2s",
+)
+FORM2_FIELDS = (
+    "season", "WOS", "cursympt_days", "fluvaccine", "exposehuman", "travel",
+    "cursympt_cough", "cursympt_coughsputum", "cursympt_sorethroat",
+    "cursympt_rhinorrhea", "cursympt_sinuspain", "medhistav", "pastmedchronlundis",
+)
+FEATURES = FORM1_FIELDS + FORM2_FIELDS
+
+# Human-readable field names (form labels, older exports) -> model features.
+FIELD_ALIASES = {
+    "height": "heightcm",
+    "weight": "weightkg",
+    "temp": "as_edenroll_temp",
+    "temperature": "as_edenroll_temp",
+    "week_of_season": "WOS",
+    "symptom_days": "cursympt_days",
+    "flu_vaccine": "fluvaccine",
+    "expose_human": "exposehuman",
+    "cough": "cursympt_cough",
+    "cough_with_sputum": "cursympt_coughsputum",
+    "sore_throat": "cursympt_sorethroat",
+    "rhinorrhea": "cursympt_rhinorrhea",
+    "sinuspain": "cursympt_sinuspain",
+}
+
+
+# ---------- Helper: load model ----------
+def load_model(path, backend=None):
+    """Load a model file relative to the backend directory, or ``None``.
+
+    Served models come from the registry (``registry.load_serving_model``);
+    this loads an arbitrary file. Native XGBoost files go through
+    ``model_io.load_native`` (``backend`` is "compiled" or "xgboost"); heavy
+    libraries are only imported on the path that needs them.
+    """
+    path = BASE_DIR / path
+    if not path.exists():
+        return None
+    if path.suffix in NATIVE_SUFFIXES:
+        return load_native(path, backend)
+    if path.suffix == ".npz":
+        # Compiled node tables (see tree_compiler.py); no xgboost needed.
+        from tree_compiler import CompiledForest
+        return CompiledForest.load(path)
+    import joblib
+    return joblib.load(path)
+
+
+# ---------- Helper: payload ----------
+def week_of_season(date_val):
+    """Week number FormPage2 derives from the chosen date (WOS)."""
+    start = date(date_val.year, 1, 1)
+    return ((date_val - start).days // 7) + 1
+
+
+def build_payload(form1, form2):
+    """Merge the two form dicts the same way the Result page does."""
+    payload = {}
+    payload.update(form1 or {})
+    payload.update(form2 or {})
+    return payload
+
+
+def parse_payload(body):
+    """Validate a request body and return the flat 20-field payload.
+
+    Accepts either ``{"form1": {...}, "form2": {...}}`` (what the UI keeps in
+    session state) or the already merged flat dict. Values are checked
+    against ``schema.SCHEMA``; errors carry one entry per field.
+    """
+    if not isinstance(body, dict):
+        raise PayloadError("Payload must be a JSON object.")
+    if "form1" in body or "form2" in body:
+        forms = {name: body.get(name) for name in ("form1", "form2")}
+        bad = [name for name, form in forms.items() if form is not None and not isinstance(form, dict)]
+        if bad:
+            raise PayloadError(f"{' and '.join(bad)} must be JSON objects.", invalid=bad)
+        body = build_payload(forms["form1"], forms["form2"])
+    return SCHEMA.check(body)
+
+
+# ---------- Helper: prediction ----------
+_encoders = weakref.WeakKeyDictionary()
+
+
+def get_encoder(model):
+    """The ``FeatureEncoder`` for ``model``, built once per loaded model."""
+    encoder = _encoders.get(model)
+    if encoder is None:
+        encoder = _encoders[model] = FeatureEncoder.from_model(model, default=FEATURES)
+    return encoder
+
+
+def predict_matrix(model, X):
+    """Score an already encoded float32 matrix (see ``get_encoder``).
+
+    Returns a list of ``(label, probability)``, one per row. ``probability``
+    is the model's probability of the positive ("Infected") class, or
+    ``None`` when the model has no ``predict_proba``.
+    """
+    if not hasattr(model, "predict_proba"):
+        with metrics.stage("predict"):
+            labels = model.predict(X)
+        return [(int(label), None) for label in labels]
+    # One call instead of predict + predict_proba; argmax matches
+    # XGBClassifier.predict (positive only when p > 0.5).
+    with metrics.stage("predict"):
+        proba = model.predict_proba(X)
+    return [(int(label), float(p)) for label, p in zip(proba.argmax(axis=1), proba[:, 1])]
+
+
+def predict_rows(model, payloads):
+    """Score several payloads with one model call, in input order."""
+    with metrics.stage("encode"):
+        X = get_encoder(model).encode_batch(payloads)
+    return predict_matrix(model, X)
+
+
+def predict_payload(model, payload):
+    """Return ``(label, probability)`` for one payload."""
+    return predict_rows(model, [payload])[0]
+
+
+# Label, probability of "Infected" and the recommendation tuples for it.
+Prediction = namedtuple("Prediction", "label probability recommendations")
+
+
+def make_prediction(payload, predict_one):
+    """Run ``predict_one(payload) -> (label, probability)`` and add advice."""
+    label, probability = predict_one(payload)
+    with metrics.stage("recommendations"):
+        recommendations = tuple(get_recommendations(payload, label))
+    return Prediction(label, probability, recommendations)
+
+
+# ---------- Helper: Recommendation Logic ----------
+def get_recommendations(data, prediction_label):
+    """Recommendation tuples for one payload (rules in ``recommendations.py``)."""
+    return RULE_ENGINE.recommend(data, prediction_label)
+
+
+def recommendations_to_dicts(recommendations):
+    return [
+        {"title": title, "text": text, "source": src, "level": level}
+        for title, text, src, level in recommendations
+    ]
@@ -0,0 +1,133 @@
+"""Bounded in-process cache of finished predictions.
+
+Users often hit "Retry" and resubmit the same form. ``PredictionCache``
+keys each result by a SHA-256 of the normalized 20-feature payload plus
+the model artifact hash, so identical submissions skip the model and the
+recommendation rules, and a model change invalidates every entry without
+any explicit flush. Entries are evicted least-recently-used once
+``maxsize`` is reached, and expire ``ttl`` seconds after they were stored.
+
+Configuration from the environment (see ``PredictionCache.from_env``):
+
+``INFLUENZA_PREDICTION_CACHE_SIZE``  max entries (default 4096, 0 disables)
+``INFLUENZA_PREDICTION_CACHE_TTL``   seconds an entry stays valid (default 3600)
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from prediction import FEATURES
+
+
+def canonical_payload(payload):
+    """Feature values in model order, as floats; NaN/None become ``None``.
+
+    ``170``, ``170.0`` and ``"170"`` all normalize to the same value.
+    """
+    values = []
+    for f in FEATURES:
+        value = payload.get(f)
+        value = None if value is None else float(value)
+        if value is not None and math.isnan(value):
+            value = None
+        values.append(0.0 if value == 0 else value)  # folds -0.0 into 0.0
+    return values
+
+
+def payload_key(payload, model_hash):
+    raw = json.dumps([model_hash, canonical_payload(payload)], separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class PredictionCache:
+    """Thread-safe LRU + TTL cache of ``prediction.Prediction`` results."""
+
+    def __init__(self, maxsize=4096, ttl=3600.0, clock=time.monotonic):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls, **overrides):
+        options = {
+            "maxsize": int(os.environ.get("INFLUENZA_PREDICTION_CACHE_SIZE", 4096)),
+            "ttl": float(os.environ.get("INFLUENZA_PREDICTION_CACHE_TTL", 3600)),
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---------- Lookup ----------
+    def get(self, key):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def lookup(self, payload, model_hash):
+        """Cached result for this payload and model, or ``None``."""
+        return self.get(payload_key(payload, model_hash)) if self.enabled else None
+
+    def get_or_compute(self, payload, model_hash, compute):
+        """Cached ``compute(payload)`` for this payload and model."""
+        if not self.enabled:
+            return compute(payload)
+        key = payload_key(payload, model_hash)
+        value = self.get(key)
+        if value is None:
+            value = compute(payload)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
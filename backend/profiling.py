@@ -0,0 +1,194 @@
+"""Opt-in cProfile capture of individual Streamlit reruns and API predictions.
+
+Streamlit reruns the whole script on every interaction, so a slow page is
+hard to pin down from the outside. With profiling on, a sampled fraction of
+reruns (tagged with the page name) and API requests (tagged with the route)
+run under ``cProfile`` and each one leaves two files behind, including
+reruns cut short by the app's ``rerun()`` helper:
+
+``<time>-<tag>-<pid>.prof``       ``pstats`` data (``python -m pstats``, snakeviz)
+``<time>-<tag>-<pid>.collapsed``  folded stacks for flamegraph.pl / speedscope
+
+cProfile only records caller/callee pairs, so the folded stacks split a
+function's time between its call paths in proportion to those pairs; deep
+paths through functions called from several places are approximate.
+Only the newest ``keep`` profiles are kept.
+
+cProfile only sees the thread it runs on. Normally the model is scored on
+the micro-batcher's thread (or in ``InferencePool`` worker processes), so
+while a rerun or request is profiled (``Profiler.active()``)
+``PredictionService`` scores it inline instead: the profile shows encoding,
+the model call, contributions and recommendations, without batching or the
+pool. Prediction cache hits still answer without any model work.
+
+Configuration from the environment (see ``Profiler.from_env``):
+
+``INFLUENZA_PROFILE``        fraction of reruns/requests to profile, 0 to 1
+                             (default 0, off)
+``INFLUENZA_PROFILE_DIR``    output directory (default backend/profiles)
+``INFLUENZA_PROFILE_KEEP``   profiles kept before the oldest go (default 50)
+``INFLUENZA_PROFILE_QUERY``  set to 0 to ignore ``?profile=1`` in the UI
+
+In the UI, ``?profile=1`` profiles every rerun of that browser tab.
+"""
+import cProfile
+import contextlib
+import os
+import pathlib
+import pstats
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+
+DEFAULT_DIR = pathlib.Path(__file__).resolve().parent / "profiles"
+
+
+def _frame_name(func):
+    filename, line, name = func
+    if filename == "~":  # built-in
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(stats, max_depth=64):
+    """Folded ``frame;frame;frame microseconds`` lines from ``pstats`` data."""
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))  # edge cumulative time
+    # Calls made straight from the profiled block (top-level script code) have
+    # no recorded caller; that part of each function's time starts a stack.
+    roots = []
+    for func, (_, _, _, cumtime, callers) in stats.items():
+        called = sum(edge[3] for caller, edge in callers.items() if caller in stats)
+        if cumtime > 0 and called < cumtime:
+            roots.append((func, 1.0 - called / cumtime))
+
+    folded = defaultdict(float)
+
+    def walk(func, path, share):
+        # share: fraction of func's total time spent under this call path.
+        _, _, tottime, cumtime, _ = stats[func]
+        path = path + (func,)
+        if tottime * share > 0:
+            folded[path] += tottime * share
+        if len(path) >= max_depth or cumtime <= 0:
+            return
+        for callee, edge_cumtime in callees.get(func, ()):
+            callee_cumtime = stats[callee][3]
+            if callee in path or callee_cumtime <= 0:
+                continue  # recursion; its time is already in the caller's frame
+            child_share = share * edge_cumtime / callee_cumtime
+            if child_share * callee_cumtime >= 1e-6:
+                walk(callee, path, child_share)
+
+    for root, share in roots:
+        walk(root, (), share)
+    return [f"{';'.join(_frame_name(f) for f in path)} {round(seconds * 1e6)}"
+            for path, seconds in folded.items() if round(seconds * 1e6) > 0]
+
+
+class Profiler:
+    """Samples reruns/requests into cProfile and writes rotating profiles."""
+
+    def __init__(self, rate=0.0, directory=DEFAULT_DIR, keep=50, allow_query=True, rng=random.random):
+        self.rate = float(rate)
+        self.directory = pathlib.Path(directory)
+        self.keep = int(keep)
+        self.allow_query = allow_query
+        self.rng = rng
+        self._lock = threading.Lock()
+        self._active = threading.local()  # profile() and begin()/end() profile per thread
+        self.written = 0
+
+    @classmethod
+    def from_env(cls, **overrides):
+        options = {
+            "rate": float(os.environ.get("INFLUENZA_PROFILE", 0)),
+            "directory": os.environ.get("INFLUENZA_PROFILE_DIR", DEFAULT_DIR),
+            "keep": int(os.environ.get("INFLUENZA_PROFILE_KEEP", 50)),
+            "allow_query": os.environ.get("INFLUENZA_PROFILE_QUERY", "1") != "0",
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    def sampled(self, force=False):
+        return force or (self.rate > 0 and self.rng() < self.rate)
+
+    # ---------- Capture ----------
+    def active(self):
+        """Whether this thread is being profiled (``profile()`` or ``begin()``)."""
+        return (getattr(self._active, "profile", None) is not None
+                or getattr(self._active, "run", None) is not None)
+
+    @contextlib.contextmanager
+    def profile(self, tag, force=False):
+        """Profile the ``with`` body if it is sampled (API requests)."""
+        if not self.sampled(force):
+            yield None
+            return
+        profile = cProfile.Profile()
+        self._active.profile = profile
+        profile.enable()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            self._active.profile = None
+            self.write(profile, tag)
+
+    def begin(self, tag, force=False):
+        """Start profiling a Streamlit rerun on this thread, if sampled.
+
+        A rerun is top-level script code, so it cannot sit in a ``with``
+        block; ``end()`` writes the profile, at the bottom of the script and
+        right before ``st.rerun()``. A rerun that raises never reaches either
+        and is discarded by the next ``begin()`` on the same thread.
+        """
+        stale = getattr(self._active, "run", None)
+        if stale is not None:
+            stale[0].disable()
+        self._active.run = None
+        if not self.sampled(force):
+            return None
+        profile = cProfile.Profile()
+        self._active.run = (profile, tag)
+        profile.enable()
+        return profile
+
+    def end(self):
+        """Stop and write this thread's rerun profile; returns its path."""
+        run = getattr(self._active, "run", None)
+        if run is None:
+            return None
+        self._active.run = None
+        run[0].disable()
+        return self.write(*run)
+
+    # ---------- Output ----------
+    def write(self, profile, tag):
+        """Write ``.prof`` and ``.collapsed`` files; returns the ``.prof`` path."""
+        stats = pstats.Stats(profile)
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        safe_tag = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(tag)) or "run"
+        base = self.directory / f"{stamp}-{safe_tag}-{os.getpid()}"
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            stats.dump_stats(f"{base}.prof")
+            lines = collapsed_stacks(stats.stats)
+            pathlib.Path(f"{base}.collapsed").write_text("\n".join(lines) + "\n", encoding="utf-8")
+            self.written += 1
+            self._rotate()
+        return pathlib.Path(f"{base}.prof")
+
+    def _rotate(self):
+        profiles = sorted(self.directory.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+        for old in profiles[:max(len(profiles) - self.keep, 0)]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".collapsed").unlink(missing_ok=True)
+
+
+PROFILER = Profiler.from_env()
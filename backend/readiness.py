@@ -0,0 +1,230 @@
+"""Eager model load and warm-up, with readiness and liveness endpoints.
+
+Without this the first session (or API request) after a start pays for
+loading the model, the first batched predict and, on the Detail page, the
+xgboost import behind contributions. ``Startup`` does all of that once per
+process, ideally before any traffic arrives:
+
+* ``serve.py`` starts it in a background thread before Streamlit, so the
+  app's ``load_service()`` finds a warm service
+* ``api.py`` starts it next to the HTTP server and answers 503 until done
+* a plain ``streamlit run`` still works: the first session runs it inline
+
+Once warm, the service is handed to a ``model_manager.ModelManager``, which
+swaps in new registry versions without a restart; ``Startup.service()``
+always returns the current one.
+
+Warm-up sends ``rows`` synthetic payloads (drawn from the ranges in
+``schema.py``) through ``PredictionService.warm_up``, which skips the
+prediction cache, so nothing synthetic is ever served.
+
+``GET /healthz`` (liveness) answers 200 while the process is up; ``GET
+/readyz`` (readiness) answers 503 until warm-up has finished, and stays 503
+if loading failed. Both return the ``Startup.status()`` JSON.
+
+Configuration from the environment (see ``Startup.from_env``):
+
+``INFLUENZA_WARMUP_ROWS``           synthetic payloads (default 64, 0: load only)
+``INFLUENZA_WARMUP_CONTRIBUTIONS``  set to 0 to skip loading the explainer
+``INFLUENZA_HEALTH_PORT``           serve /healthz and /readyz (Streamlit only;
+                                    the API serves them on its own port)
+``INFLUENZA_HEALTH_HOST``           bind address (default 127.0.0.1)
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import metrics
+from registry import RegistryError
+from schema import SCHEMA
+
+
+def synthetic_payloads(n, seed=0):
+    """``n`` valid payloads spread over each field's plausible range."""
+    rng = np.random.default_rng(seed)
+    payloads = [{} for _ in range(n)]
+    for field in SCHEMA.fields:
+        if field.kind == "float":
+            values = np.round(rng.uniform(field.low, field.high, n), 1).tolist()
+        else:
+            values = rng.integers(field.low, field.high, n, endpoint=True).tolist()
+        blank = rng.random(n) < 0.1 if not field.required else np.zeros(n, dtype=bool)
+        for payload, value, skip in zip(payloads, values, blank):
+            payload[field.name] = None if skip else value
+    return payloads
+
+
+def _default_factory():
+    from service import PredictionService
+
+    return PredictionService.from_registry()
+
+
+def _default_manager(service, contributions=True):
+    from model_manager import ModelManager
+
+    return ModelManager.from_env(service, contributions=contributions)
+
+
+class Startup:
+    """Loads and warms this process's ``PredictionService`` exactly once."""
+
+    def __init__(self, factory=_default_factory, rows=64, contributions=True, manage=_default_manager,
+                 clock=time.monotonic):
+        self.factory = factory  # () -> PredictionService; RegistryError means no model
+        self.manage = manage  # (service, contributions) -> ModelManager, or None for no reload
+        self.manager = None
+        self.rows = int(rows)
+        self.contributions = contributions
+        self.clock = clock
+        self.started_at = clock()
+        self.state = "starting"  # -> loading -> warming -> ready | failed
+        self.error = None
+        self.load_seconds = self.warmup_seconds = None
+        self._service = None
+        self._lock = threading.Lock()
+        self._began = False
+        self._done = threading.Event()
+
+    @classmethod
+    def from_env(cls, factory=_default_factory, **overrides):
+        options = {
+            "rows": int(os.environ.get("INFLUENZA_WARMUP_ROWS", 64)),
+            "contributions": os.environ.get("INFLUENZA_WARMUP_CONTRIBUTIONS", "1") != "0",
+        }
+        options.update(overrides)
+        return cls(factory, **options)
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    @property
+    def current(self):
+        """The service to use for this request (``None`` until ready)."""
+        return self.manager.service if self.manager is not None else self._service
+
+    # ---------- Running ----------
+    def start(self):
+        """Run in a daemon thread."""
+        threading.Thread(target=self.service, name="warm-up", daemon=True).start()
+        return self
+
+    def service(self, timeout=None):
+        """The current warm service, or ``None`` if it could not be loaded.
+
+        The first caller does the work in its own thread; later callers wait
+        for it.
+        """
+        with self._lock:
+            first, self._began = not self._began, True
+        if first:
+            self._run()
+        else:
+            self._done.wait(timeout)
+        return self.current
+
+    def _run(self):
+        service = None
+        try:
+            self.state = "loading"
+            began = self.clock()
+            service = self.factory()
+            if service is None:
+                raise RegistryError("Model not found.")
+            self.load_seconds = self.clock() - began
+            self.state = "warming"
+            began = self.clock()
+            if self.rows > 0:
+                service.warm_up(synthetic_payloads(self.rows), self.contributions)
+            self.warmup_seconds = self.clock() - began
+            if self.manage is not None:
+                self.manager = self.manage(service, self.contributions).start()
+            self._service = service
+            metrics.REGISTRY.set_collector("service", service.metrics_families)
+            self.state = "ready"
+        except RegistryError as e:
+            self.state, self.error = "failed", str(e)
+        except Exception as e:
+            self.state, self.error = "failed", f"{type(e).__name__}: {e}"
+            if service is not None:
+                service.close()
+        finally:
+            self._done.set()
+
+    def status(self):
+        service = self.current
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "model_version": service.version if service else None,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_rows": self.rows,
+            "uptime_seconds": self.clock() - self.started_at,
+            "error": self.error,
+        }
+
+
+STARTUP = Startup.from_env()
+
+
+# ---------- Endpoints ----------
+def health_response(path, startup):
+    """``(status, body)`` for ``/healthz`` and ``/readyz``, else ``None``."""
+    path = path.split("?", 1)[0]
+    if path == "/healthz":
+        return 200, startup.status()
+    if path == "/readyz":
+        return (200 if startup.ready else 503), startup.status()
+    return None
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        response = health_response(self.path, self.server.startup)
+        if response is None:
+            self.send_error(404)
+            return
+        status, data = response
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1", startup=STARTUP):
+    """Serve ``/healthz`` and ``/readyz`` from a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    server.daemon_threads = True
+    server.startup = startup
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    return server
+
+
+_health_server = None
+_health_lock = threading.Lock()
+
+
+def serve_from_env():
+    """``serve(INFLUENZA_HEALTH_PORT)`` for ``STARTUP`` if that is set.
+
+    Idempotent, so both ``serve.py`` and the app script can call it.
+    """
+    global _health_server
+    port = os.environ.get("INFLUENZA_HEALTH_PORT")
+    if not port:
+        return None
+    with _health_lock:
+        if _health_server is None:
+            _health_server = serve(int(port), os.environ.get("INFLUENZA_HEALTH_HOST", "127.0.0.1"))
+        return _health_server
@@ -0,0 +1,161 @@
+"""Declarative recommendation rules, evaluated over whole batches.
+
+Each rule in ``RULES`` is one row: the field it looks at, a comparison, the
+threshold, the value used when the field is absent, the stage it belongs to
+and the recommendation it adds. Stages run in ``STAGES`` order and carry the
+precedence of the original hand-written rules:
+
+``red_flag``    any hit is an emergency: nothing else is added
+``risk``        added alongside each other
+``education``   only when no earlier stage added anything
+``prevention``  added whenever no red flag fired
+
+``RuleEngine.mask`` turns the table into one NumPy boolean mask per rule over
+a batch of records. Every row's result is a bit pattern (``codes``), and
+there are only a handful of distinct patterns, so recommendation lists are
+built once per pattern rather than once per record.
+"""
+import math
+import operator
+from collections import namedtuple
+
+import numpy as np
+
+# Pseudo-field holding the model's predicted label.
+LABEL = "prediction_label"
+
+Rule = namedtuple("Rule", "key field op threshold default stage title text source level")
+
+OPS = {"<": operator.lt, ">": operator.gt, "==": operator.eq}
+
+# (stage, mode): "stop" blocks all later stages for rows where a rule fired,
+# "fallback" only fires for rows with no recommendation yet.
+STAGES = (
+    ("red_flag", "stop"),
+    ("risk", "normal"),
+    ("education", "fallback"),
+    ("prevention", "normal"),
+)
+
+RULES = (
+    # --- KATEGORI 1: RED FLAGS ---
+    Rule("O2S_LOW", "o2s", "<", 95, 100, "red_flag", "Immediate Medical Attention",
+         "Saturasi oksigen < 95%. Tanda hipoksemia serius.", "WHO", "danger"),
+    Rule("RR_HIGH", "rr", ">", 24, 20, "red_flag", "Immediate Medical Attention",
+         "Laju napas > 24x/menit. Distres pernapasan.", "Merck Manual", "danger"),
+    Rule("TEMP_EXTREME", "as_edenroll_temp", ">", 40, 36, "red_flag", "Immediate Medical Attention",
+         "Suhu > 40°C. Hiperpireksia.", "CDC", "danger"),
+    Rule("SBP_LOW", "sbp", "<", 90, 120, "red_flag", "Immediate Medical Attention",
+         "Tekanan darah sistolik < 90. Tanda syok.", "WHO", "danger"),
+    # --- KATEGORI 2: RISIKO TINGGI ---
+    Rule("FEVER", "as_edenroll_temp", ">", 38.0, 36, "risk", "Consult a Doctor",
+         "Demam > 38°C menandakan infeksi. Konsultasi dokter disarankan.", "Panduan Medis Umum", "warning"),
+    Rule("CHRONIC_LUNG", "pastmedchronlundis", "==", 1, 0, "risk", "High Risk Factor",
+         "Riwayat penyakit paru kronis meningkatkan risiko komplikasi.", "CDC", "warning"),
+    # --- KATEGORI 3 & 4: EDUKASI ---
+    Rule("SELF_CARE", LABEL, "==", 1, None, "education", "Self-Care",
+         "Prediksi positif gejala ringan. Istirahat & hidrasi.", "CDC", "info"),
+    Rule("GENERAL_ADVICE", LABEL, "==", 0, None, "education", "General Advice",
+         "Prediksi negatif. Kemungkinan common cold. Istirahat.", "CDC", "info"),
+    Rule("VACCINE", "fluvaccine", "==", 0, 1, "prevention", "Prevention",
+         "Pertimbangkan vaksin flu tahunan.", "WHO", "info"),
+)
+
+
+def _scalar(value):
+    return math.nan if value is None else float(value)
+
+
+class RuleEngine:
+    """Evaluate a rule table for one record or a batch of them."""
+
+    def __init__(self, rules=RULES, stages=STAGES):
+        order = {name: i for i, (name, _) in enumerate(stages)}
+        unknown = {r.stage for r in rules} - order.keys()
+        if unknown:
+            raise ValueError(f"Rules use unknown stages: {sorted(unknown)}")
+        # Stable sort: table order is kept within a stage.
+        self.rules = tuple(sorted(rules, key=lambda r: order[r.stage]))
+        self.recommendations = tuple((r.title, r.text, r.source, r.level) for r in self.rules)
+        self._ops = [OPS[r.op] for r in self.rules]
+        self._stages = [
+            (mode, [i for i, r in enumerate(self.rules) if r.stage == name])
+            for name, mode in stages
+        ]
+        self._weights = np.left_shift(1, np.arange(len(self.rules), dtype=np.int64))
+        self._by_code = {}
+
+    # ---------- One record ----------
+    def recommend(self, data, label):
+        """Recommendation tuples for one record dict, in precedence order."""
+        fired = []
+        emitted = False
+        for mode, indices in self._stages:
+            if mode == "fallback" and emitted:
+                continue
+            hits = [i for i in indices if self._test_one(i, data, label)]
+            fired.extend(hits)
+            emitted = emitted or bool(hits)
+            if mode == "stop" and hits:
+                break
+        return [self.recommendations[i] for i in fired]
+
+    def _test_one(self, i, data, label):
+        rule = self.rules[i]
+        value = label if rule.field == LABEL else data.get(rule.field, rule.default)
+        return self._ops[i](_scalar(value), rule.threshold)
+
+    # ---------- Batches ----------
+    def mask(self, columns, labels):
+        """Boolean ``(n, n_rules)`` array: which rule fires for which row.
+
+        ``columns`` maps field names to 1-D arrays (a dict of arrays or a
+        DataFrame); absent fields take the rule default and NaN/None never
+        match. ``labels`` holds the predicted label per row.
+        """
+        labels = np.asarray(labels, dtype=np.float64)
+        n = len(labels)
+        fired = np.empty((n, len(self.rules)), dtype=bool)
+        for i, rule in enumerate(self.rules):
+            if rule.field == LABEL:
+                values = labels
+            elif rule.field in columns:
+                values = np.asarray(columns[rule.field], dtype=np.float64)
+            else:
+                values = np.full(n, rule.default, dtype=np.float64)
+            fired[:, i] = self._ops[i](values, rule.threshold)
+
+        emitted = np.zeros(n, dtype=bool)
+        stopped = np.zeros(n, dtype=bool)
+        for mode, indices in self._stages:
+            block = fired[:, indices] & ~stopped[:, None]
+            if mode == "fallback":
+                block &= ~emitted[:, None]
+            fired[:, indices] = block
+            hit = block.any(axis=1)
+            emitted |= hit
+            if mode == "stop":
+                stopped |= hit
+        return fired
+
+    def codes(self, columns, labels):
+        """One integer per row; bit ``i`` set when ``self.rules[i]`` fires."""
+        return self.mask(columns, labels).astype(np.int64) @ self._weights
+
+    def for_code(self, code):
+        """Recommendation tuples for a value returned by ``codes``."""
+        code = int(code)
+        recs = self._by_code.get(code)
+        if recs is None:
+            recs = self._by_code[code] = tuple(
+                rec for i, rec in enumerate(self.recommendations) if code >> i & 1)
+        return recs
+
+    def recommend_batch(self, columns, labels):
+        """Recommendation lists for every row, as ``recommend`` would give."""
+        unique, inverse = np.unique(self.codes(columns, labels), return_inverse=True)
+        lists = [self.for_code(code) for code in unique]
+        return [list(lists[i]) for i in inverse.ravel()]
+
+
+RULE_ENGINE = RuleEngine()
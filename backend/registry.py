@@ -0,0 +1,286 @@
+"""Versioned model registry: the single source of truth for served models.
+
+Each version is a directory under ``backend/models/`` holding the native
+XGBoost artifact and a ``manifest.json`` with the feature list and types,
+objective, training params, SHA-256 of the artifact and a benchmark
+summary taken when the version was registered::
+
+    models/
+        registry.json          {"serving": "v1"}
+        v1/model.json
+        v1/manifest.json
+
+Which version is served is configuration: ``INFLUENZA_MODEL_VERSION`` if
+set, else ``"serving"`` in ``models/registry.json``. Loading always goes
+through the manifest and verifies the hash. Compiled node tables are cached
+under ``models/.cache/<sha256>.npz`` (``INFLUENZA_MODEL_CACHE``), so every
+worker on the host reuses one verified artifact instead of recompiling.
+
+Loaded models are shared by every ``ModelRegistry`` in the process; the
+``INFLUENZA_MODEL_LOADED_MAX`` (default 4) most recently used are kept, and
+``evict`` drops a version that has stopped serving (see ``model_manager.py``).
+
+    python backend/registry.py list
+    python backend/registry.py register path/to/model.pkl v2 [--serve]
+    python backend/registry.py verify [VERSION]
+"""
+import argparse
+import collections
+import datetime
+import hashlib
+import json
+import math
+import os
+import pathlib
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from model_io import default_backend, export_native, load_native
+
+BASE_DIR = pathlib.Path(__file__).parent
+DEFAULT_ROOT = BASE_DIR / "models"
+MANIFEST = "manifest.json"
+ARTIFACT = "model.json"
+
+
+class RegistryError(Exception):
+    """Unknown version, missing artifact or a hash that does not match."""
+
+
+def sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write(path, write):
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=path.suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _json_safe_params(params):
+    return {
+        k: v for k, v in sorted(params.items())
+        if isinstance(v, (str, int, float, bool)) and not (isinstance(v, float) and math.isnan(v))
+    }
+
+
+class ModelRegistry:
+    # Process-wide so every ModelRegistry instance shares loaded models;
+    # least recently used first.
+    _loaded = collections.OrderedDict()
+    _lock = threading.Lock()
+    max_loaded = int(os.environ.get("INFLUENZA_MODEL_LOADED_MAX", 4))
+
+    def __init__(self, root=None, cache_dir=None):
+        self.root = pathlib.Path(root or os.environ.get("INFLUENZA_MODEL_REGISTRY") or DEFAULT_ROOT)
+        self.cache_dir = pathlib.Path(cache_dir or os.environ.get("INFLUENZA_MODEL_CACHE")
+                                      or self.root / ".cache")
+
+    # ---------- Lookup ----------
+    def versions(self):
+        return sorted(p.parent.name for p in self.root.glob(f"*/{MANIFEST}"))
+
+    def manifest(self, version):
+        path = self.root / version / MANIFEST
+        if not path.exists():
+            raise RegistryError(f"Unknown model version {version!r}")
+        return json.loads(path.read_text())
+
+    def artifact_path(self, version):
+        return self.root / version / self.manifest(version)["artifact"]
+
+    def serving_version(self):
+        version = os.environ.get("INFLUENZA_MODEL_VERSION")
+        if version:
+            return version
+        config = self.root / "registry.json"
+        if config.exists():
+            return json.loads(config.read_text()).get("serving")
+        return None
+
+    def set_serving_version(self, version):
+        self.manifest(version)  # must exist
+        config = self.root / "registry.json"
+        data = json.loads(config.read_text()) if config.exists() else {}
+        data["serving"] = version
+        # Atomic, so a reader polling for reloads never sees half a file.
+        _atomic_write(config, lambda f: f.write((json.dumps(data, indent=2) + "\n").encode("utf-8")))
+
+    # ---------- Loading ----------
+    def verify(self, version):
+        """Return the manifest, or raise if the artifact does not match it."""
+        manifest = self.manifest(version)
+        path = self.root / version / manifest["artifact"]
+        if not path.exists():
+            raise RegistryError(f"Artifact for {version!r} is missing: {path}")
+        digest = sha256_file(path)
+        if digest != manifest["sha256"]:
+            raise RegistryError(f"SHA-256 mismatch for {version!r}: manifest {manifest['sha256'][:12]}, "
+                                f"artifact {digest[:12]}")
+        return manifest
+
+    def load(self, version=None, backend=None):
+        """Return ``(model, manifest)`` for ``version`` (default: serving)."""
+        version = version or self.serving_version()
+        if not version:
+            raise RegistryError("No model version configured")
+        backend = backend or default_backend()
+        manifest = self.verify(version)
+        key = (manifest["sha256"], backend)
+        with self._lock:
+            model = self._loaded.get(key)
+            if model is None:
+                model = self._loaded[key] = self._load_artifact(version, manifest, backend)
+                while len(self._loaded) > max(self.max_loaded, 1):
+                    self._loaded.popitem(last=False)
+            else:
+                self._loaded.move_to_end(key)
+        return model, manifest
+
+    def evict(self, sha256):
+        """Forget the loaded models (all backends) for an artifact hash."""
+        with self._lock:
+            for key in [k for k in self._loaded if k[0] == sha256]:
+                del self._loaded[key]
+
+    def _load_artifact(self, version, manifest, backend):
+        path = self.root / version / manifest["artifact"]
+        if backend != "compiled":
+            return load_native(path, backend)
+
+        from tree_compiler import CompiledForest, compile_json
+
+        cached = self.cache_dir / f"{manifest['sha256']}.npz"
+        if cached.exists():
+            try:
+                forest = CompiledForest.load(cached)
+                # Entries from before n_features was stored may undercount it.
+                if forest.n_features == manifest.get("n_features", forest.n_features):
+                    return forest
+            except (OSError, ValueError, KeyError):
+                pass  # torn or stale cache entry; rebuild it below
+        forest = compile_json(path)
+        try:
+            _atomic_write(cached, forest.save)
+        except OSError:
+            pass  # read-only deploys still work, just without the shared cache
+        return forest
+
+    # ---------- Registration ----------
+    def register(self, model, version, source=None, benchmark=True):
+        """Store ``model`` (XGBClassifier or Booster) as a new version."""
+        target = self.root / version
+        if (target / MANIFEST).exists():
+            raise RegistryError(f"Version {version!r} already exists")
+        target.mkdir(parents=True, exist_ok=True)
+        export_native(model, target / ARTIFACT)
+
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        config = json.loads(booster.save_config())
+        n_features = int(config["learner"]["learner_model_param"]["num_feature"])
+        manifest = {
+            "version": version,
+            "artifact": ARTIFACT,
+            "format": "xgboost-json",
+            "sha256": sha256_file(target / ARTIFACT),
+            "size_bytes": (target / ARTIFACT).stat().st_size,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "source": source,
+            "objective": config["learner"]["objective"]["name"],
+            "n_features": n_features,
+            "feature_names": booster.feature_names,
+            "feature_types": booster.feature_types,
+            "num_boosted_rounds": booster.num_boosted_rounds(),
+            "training_params": _json_safe_params(model.get_params()) if hasattr(model, "get_params") else {},
+            "benchmark": self._benchmark(target / ARTIFACT, n_features) if benchmark else None,
+        }
+        (target / MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n")
+        return manifest
+
+    @staticmethod
+    def _benchmark(path, n_features, repeat=200):
+        from tree_compiler import compile_json
+
+        summary = {}
+        started = time.perf_counter()
+        forest = compile_json(path)
+        summary["compile_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        rng = np.random.default_rng(0)
+        for backend, model in (("compiled", forest), ("xgboost", load_native(path, "xgboost"))):
+            for n_rows in (1, 1000):
+                X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+                reps = repeat if n_rows == 1 else max(repeat // 20, 1)
+                model.predict_proba(X)
+                started = time.perf_counter()
+                for _ in range(reps):
+                    model.predict_proba(X)
+                summary[f"{backend}_predict_us_batch{n_rows}"] = round(
+                    (time.perf_counter() - started) / reps * 1e6, 1)
+        return summary
+
+
+def load_serving_model(backend=None, registry=None):
+    """``(model, manifest)`` for the configured version, or ``(None, None)``."""
+    registry = registry or ModelRegistry()
+    try:
+        return registry.load(backend=backend)
+    except RegistryError:
+        return None, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry.")
+    parser.add_argument("--root", help="registry directory (default backend/models)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="list versions and the serving one")
+    reg = sub.add_parser("register", help="add a model file as a new version")
+    reg.add_argument("source", help="pickled XGBClassifier or native .json/.ubj model")
+    reg.add_argument("version")
+    reg.add_argument("--serve", action="store_true", help="make it the serving version")
+    reg.add_argument("--no-benchmark", action="store_true")
+    ver = sub.add_parser("verify", help="check artifact hashes against manifests")
+    ver.add_argument("version", nargs="?")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    if args.command == "list":
+        serving = registry.serving_version()
+        for version in registry.versions():
+            manifest = registry.manifest(version)
+            print(f"{'*' if version == serving else ' '} {version:<16} {manifest['sha256'][:12]}  "
+                  f"{manifest['n_features']:>3} features  {manifest['created_at']}")
+    elif args.command == "register":
+        source = pathlib.Path(args.source)
+        if source.suffix in (".json", ".ubj"):
+            import xgboost
+            model = xgboost.Booster(model_file=str(source))
+        else:
+            import joblib
+            model = joblib.load(source)
+        manifest = registry.register(model, args.version, source=source.name,
+                                     benchmark=not args.no_benchmark)
+        if args.serve:
+            registry.set_serving_version(args.version)
+        print(json.dumps(manifest, indent=2))
+    elif args.command == "verify":
+        for version in [args.version] if args.version else registry.versions():
+            registry.verify(version)
+            print(f"{version}: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Buffered, non-blocking JSONL log of every prediction served.
+
+``PredictionService.predict`` hands each answered request to the process's
+``RequestLog``, which only appends a tuple to a bounded queue. A background
+thread turns the queue into JSON lines::
+
+    {"ts": 1792206859.101, "model_version": "v1", "label": 0, "probability": 0.12,
+     "latency_ms": 5.7, "payload": {"heightcm": 170.0, ...}}
+
+``payload`` is the validated payload in model feature order (``None`` for
+blank optional fields), so the log can be replayed as is
+(``benchmarks/replay.py``).
+
+* writes are batched and flushed every ``flush_interval`` seconds; fsyncs
+  are batched to at most one per ``fsync_interval``
+* the file is rotated when it reaches ``max_bytes`` or ``max_age`` seconds,
+  rotated segments are gzipped in the background and only the newest
+  ``keep`` are kept
+* when the queue is full the record is dropped and counted, never waited on
+
+Configuration from the environment (see ``RequestLog.from_env``):
+
+``INFLUENZA_REQUEST_LOG``            log file (default backend/logs/requests.jsonl;
+                                     0 turns logging off)
+``INFLUENZA_REQUEST_LOG_MAX_MB``     rotate at this size (default 64)
+``INFLUENZA_REQUEST_LOG_MAX_AGE``    rotate after this many seconds (default 86400)
+``INFLUENZA_REQUEST_LOG_KEEP``       rotated segments kept (default 20)
+``INFLUENZA_REQUEST_LOG_QUEUE``      records waiting before drops (default 10000)
+
+Each process needs its own file: ``api.py`` defaults to
+``backend/logs/api-requests.jsonl``.
+"""
+import atexit
+import gzip
+import json
+import os
+import pathlib
+import queue
+import shutil
+import threading
+import time
+
+import metrics
+from schema import SCHEMA
+
+DEFAULT_DIR = pathlib.Path(__file__).resolve().parent / "logs"
+DEFAULT_PATH = DEFAULT_DIR / "requests.jsonl"
+
+
+def _compress(path):
+    with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.unlink(path)
+
+
+class RequestLog:
+    """Appends prediction records to a rotating JSONL file from a writer thread."""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=64 << 20, max_age=86400.0, keep=20,
+                 max_queue=10_000, flush_interval=0.5, fsync_interval=2.0, max_batch=1024,
+                 clock=time.time):
+        self.path = pathlib.Path(path)
+        self.max_bytes = int(max_bytes)
+        self.max_age = float(max_age)
+        self.keep = int(keep)
+        self.flush_interval = float(flush_interval)
+        self.fsync_interval = float(fsync_interval)
+        self.max_batch = int(max_batch)
+        self.clock = clock
+        self.written = self.dropped = self.rotations = self.fsyncs = 0
+        self._queue = queue.Queue(maxsize=int(max_queue))
+        self._closed = threading.Event()
+        self._file = None
+        self._opened_at = self._size = 0
+        self._last_fsync = 0.0
+        self._compressing = []
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """The configured log, or ``None`` when ``INFLUENZA_REQUEST_LOG=0``."""
+        path = os.environ.get("INFLUENZA_REQUEST_LOG", "")
+        if path == "0":
+            return None
+        options = {
+            "path": path or DEFAULT_PATH,
+            "max_bytes": float(os.environ.get("INFLUENZA_REQUEST_LOG_MAX_MB", 64)) * (1 << 20),
+            "max_age": float(os.environ.get("INFLUENZA_REQUEST_LOG_MAX_AGE", 86400)),
+            "keep": int(os.environ.get("INFLUENZA_REQUEST_LOG_KEEP", 20)),
+            "max_queue": int(os.environ.get("INFLUENZA_REQUEST_LOG_QUEUE", 10_000)),
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    # ---------- Request path ----------
+    def record(self, payload, model_version, result, seconds):
+        """Queue one served prediction; drops it if the writer is behind."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((self.clock(), payload, model_version, result.label,
+                                    result.probability, seconds))
+        except queue.Full:
+            self.dropped += 1  # read only for stats; an occasional lost increment is fine
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None and not self._closed.is_set():
+                self._thread = threading.Thread(target=self._run, name="request-log", daemon=True)
+                self._thread.start()
+
+    # ---------- Writer thread ----------
+    def _run(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            self._sync()
+        self._close_file()
+
+    def _write(self, batch):
+        if self._file is None or self._size >= self.max_bytes or \
+                self.clock() - self._opened_at >= self.max_age:
+            self._rotate()
+        names = SCHEMA.names
+        data = "".join(
+            json.dumps({
+                "ts": round(ts, 3),
+                "model_version": version,
+                "label": label,
+                "probability": probability,
+                "latency_ms": round(seconds * 1000, 3),
+                "payload": {name: payload.get(name) for name in names},
+            }, separators=(",", ":")) + "\n"
+            for ts, payload, version, label, probability, seconds in batch).encode("utf-8")
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+        self.written += len(batch)
+
+    def _sync(self):
+        if self._file is not None and time.monotonic() - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = time.monotonic()
+            self.fsyncs += 1
+
+    def _rotate(self):
+        """Close the current file (moving it aside if it has data) and open a new one."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self._file is not None:
+            self._close_file()
+        if self.path.exists() and self.path.stat().st_size > 0:
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.clock()))
+            segment = self.path.with_name(f"{self.path.stem}-{stamp}-{self.rotations:04d}{self.path.suffix}")
+            os.replace(self.path, segment)
+            self.rotations += 1
+            thread = threading.Thread(target=self._compress_and_prune, args=(segment,),
+                                      name="request-log-gzip", daemon=True)
+            thread.start()
+            self._compressing = [t for t in self._compressing if t.is_alive()] + [thread]
+        self._file = open(self.path, "ab")
+        self._opened_at = self.clock()
+        self._size = 0
+
+    def _compress_and_prune(self, segment):
+        _compress(segment)
+        segments = sorted(self.path.parent.glob(f"{self.path.stem}-*{self.path.suffix}.gz"))
+        for old in segments[:max(len(segments) - self.keep, 0)]:
+            old.unlink(missing_ok=True)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    # ---------- Lifecycle ----------
+    def stats(self):
+        return {
+            "path": str(self.path),
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "rotations": self.rotations,
+            "fsyncs": self.fsyncs,
+        }
+
+    def metrics_families(self):
+        return [
+            ("influenza_request_log_records", "counter", "Prediction records written to the request log.",
+             [("_total", {}, self.written)]),
+            ("influenza_request_log_dropped", "counter", "Records dropped because the log queue was full.",
+             [("_total", {}, self.dropped)]),
+        ]
+
+    def close(self, timeout=5.0):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for thread in self._compressing:
+            thread.join(timeout)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_log():
+    """This process's ``RequestLog`` (``None`` when off), created on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            set_default_log(RequestLog.from_env())
+        return _default or None
+
+
+def set_default_log(log):
+    """Use ``log`` for services built from now on (``False`` keeps logging off)."""
+    global _default
+    _default = log if log is not None else False
+    if log:
+        metrics.REGISTRY.set_collector("request_log", log.metrics_families)
+        atexit.register(log.close)  # write out what is still queued
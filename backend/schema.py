@@ -0,0 +1,229 @@
+"""Feature schema and the validators compiled from it.
+
+``FIELDS`` lists every model feature once, in model order, with its type,
+unit, plausible range and whether a value is required. ``SCHEMA`` compiles
+that table into two validators that the UI, the JSON API and bulk scoring
+all use:
+
+``SCHEMA.validate(record)``        one dict of raw values (form text, JSON);
+                                   returns ``(payload, errors)``
+``SCHEMA.validate_matrix(X)``      an encoded float matrix; returns NumPy
+                                   masks (``BatchValidation``)
+
+Numbers may be written with a decimal comma ("37,5"). Optional fields left
+blank become ``None``, which the model treats as missing, instead of 0
+(which looks like an emergency to the red-flag rules). Errors are
+``FieldError(field, code, message)`` with ``code`` one of ``ERROR_CODES``.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from encoder import PayloadError
+
+# kind: "float", "int" (whole numbers) or "binary" (0/1 answers)
+Field = namedtuple("Field", "name kind unit low high required label")
+
+FIELDS = (
+    Field("heightcm", "float", "cm", 30, 250, False, "Height"),
+    Field("weightkg", "float", "kg", 1, 350, False, "Weight"),
+    Field("as_edenroll_temp", "float", "°C", 30, 45, True, "Temperature"),
+    Field("pulse", "float", "bpm", 20, 250, True, "Pulse"),
+    Field("rr", "float", "breaths/min", 4, 80, True, "Respiratory Rate"),
+    Field("sbp", "float", "mmHg", 40, 300, True, "Systolic Blood Pressure"),
+    Field("o2s", "float", "%", 50, 100, True, "Oxygen Saturation"),
+    Field("season", "int", "", 1, 4, True, "Season"),
+    Field("WOS", "int", "", 1, 53, True, "Week of season"),
+    Field("cursympt_days", "int", "days", 0, 365, True, "Days with symptoms"),
+    Field("fluvaccine", "binary", "", 0, 1, True, "Flu vaccine"),
+    Field("exposehuman", "binary", "", 0, 1, True, "Exposed to sick people"),
+    Field("travel", "binary", "", 0, 1, True, "Travelled in past 30 days"),
+    Field("cursympt_cough", "binary", "", 0, 1, True, "Cough"),
+    Field("cursympt_coughsputum", "binary", "", 0, 1, True, "Cough with sputum"),
+    Field("cursympt_sorethroat", "binary", "", 0, 1, True, "Sore throat"),
+    Field("cursympt_rhinorrhea", "binary", "", 0, 1, True, "Rhinorrhea"),
+    Field("cursympt_sinuspain", "binary", "", 0, 1, True, "Sinus pain"),
+    Field("medhistav", "binary", "", 0, 1, True, "Medical history available"),
+    Field("pastmedchronlundis", "binary", "", 0, 1, True, "Chronic lung disease"),
+)
+
+ERROR_CODES = ("required", "not_a_number", "not_integer", "out_of_range", "unexpected")
+
+FieldError = namedtuple("FieldError", "field code message")
+
+
+def parse_number(value):
+    """Float for a form/JSON value, ``None`` when blank; accepts "37,5"."""
+    if value is None or isinstance(value, bool):
+        return None if value is None else float(value)
+    if isinstance(value, (int, float)):
+        return None if math.isnan(value) else float(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        if "," in text and "." not in text:
+            text = text.replace(",", ".", 1)
+        number = float(text)
+        if not math.isfinite(number):  # "nan", "inf"
+            raise ValueError(value)
+        return number
+    raise ValueError(value)
+
+
+def _format(value):
+    return f"{value:g}"
+
+
+class BatchValidation:
+    """Per-cell error masks for a batch, each ``(n_rows, n_fields)``."""
+
+    def __init__(self, schema, masks):
+        self.schema = schema
+        self.masks = masks  # code -> bool array
+        self.invalid = np.zeros(next(iter(masks.values())).shape, dtype=bool)
+        for mask in masks.values():
+            self.invalid |= mask
+
+    @property
+    def invalid_rows(self):
+        return self.invalid.any(axis=1)
+
+    def row_errors(self, i):
+        """``FieldError`` list for row ``i``."""
+        errors = []
+        for j in np.flatnonzero(self.invalid[i]):
+            field = self.schema.fields[j]
+            for code, mask in self.masks.items():
+                if mask[i, j]:
+                    errors.append(FieldError(field.name, code, self.schema.message(field, code)))
+        return errors
+
+    def error_strings(self):
+        """``"field:code;field:code"`` per row ("" for valid rows)."""
+        out = np.full(len(self.invalid), "", dtype=object)
+        rows = np.flatnonzero(self.invalid_rows)
+        if not len(rows):
+            return out
+        # Bad rows tend to repeat a few patterns; format each pattern once.
+        codes = list(self.masks)
+        stacked = np.stack([self.masks[code][rows] for code in codes], axis=1)
+        packed = np.packbits(stacked.reshape(len(rows), -1), axis=1)
+        keys = np.ascontiguousarray(packed).view(f"V{packed.shape[1]}").ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        names = self.schema.names
+        texts = np.array([";".join(f"{names[j]}:{codes[c]}" for j in range(len(names))
+                                   for c in range(len(codes)) if stacked[i, c, j])
+                          for i in first], dtype=object)
+        out[rows] = texts[inverse.ravel()]
+        return out
+
+    def summary(self):
+        """``{field: {code: count}}`` over the whole batch."""
+        counts = {}
+        for code, mask in self.masks.items():
+            for j, n in enumerate(mask.sum(axis=0)):
+                if n:
+                    counts.setdefault(self.schema.fields[j].name, {})[code] = int(n)
+        return counts
+
+
+class CompiledSchema:
+    """Validators for one field table, precomputed once."""
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.names = tuple(f.name for f in self.fields)
+        self.by_name = {f.name: f for f in self.fields}
+        self.low = np.array([f.low for f in self.fields], dtype=np.float64)
+        self.high = np.array([f.high for f in self.fields], dtype=np.float64)
+        self.required = np.array([f.required for f in self.fields], dtype=bool)
+        self.integer = np.array([f.kind != "float" for f in self.fields], dtype=bool)
+        # One flat tuple per field for the scalar path.
+        self._checks = tuple((f, f.kind != "float") for f in self.fields)
+
+    def message(self, field, code, value=None):
+        unit = f" {field.unit}" if field.unit else ""
+        if code == "required":
+            return f"{field.label} is required."
+        if code == "not_a_number":
+            return f"{field.label} must be a number."
+        if code == "not_integer":
+            return f"{field.label} must be a whole number."
+        if code == "out_of_range":
+            shown = "" if value is None else f" ({_format(value)}{unit})"
+            return f"{field.label}{shown} must be between {_format(field.low)} and {_format(field.high)}{unit}."
+        return f"Unexpected field {field.name!r}."
+
+    # ---------- One record ----------
+    def validate(self, record, names=None, allow_unexpected=False):
+        """Parse and check ``record``; returns ``(payload, errors)``.
+
+        ``names`` limits the check to some fields (one form page). The
+        payload holds every checked field: ints for whole-number fields,
+        floats otherwise, ``None`` for blank optional fields.
+        """
+        checks = self._checks if names is None else tuple(
+            (self.by_name[n], self.by_name[n].kind != "float") for n in names)
+        payload, errors = {}, []
+        for field, integer in checks:
+            try:
+                value = parse_number(record.get(field.name))
+            except (TypeError, ValueError):
+                errors.append(FieldError(field.name, "not_a_number", self.message(field, "not_a_number")))
+                continue
+            if value is None:
+                if field.required:
+                    errors.append(FieldError(field.name, "required", self.message(field, "required")))
+                payload[field.name] = None
+                continue
+            if integer and not value.is_integer():
+                errors.append(FieldError(field.name, "not_integer", self.message(field, "not_integer")))
+                continue
+            if not field.low <= value <= field.high:
+                errors.append(FieldError(field.name, "out_of_range",
+                                         self.message(field, "out_of_range", value)))
+                continue
+            payload[field.name] = int(value) if integer else value
+        if not allow_unexpected:
+            allowed = self.by_name if names is None else set(names)
+            for key in sorted(k for k in record if k not in allowed):
+                errors.append(FieldError(key, "unexpected", f"Unexpected field {key!r}."))
+        return payload, errors
+
+    def check(self, record, names=None):
+        """``validate`` that raises ``PayloadError`` on any error."""
+        payload, errors = self.validate(record, names)
+        if errors:
+            raise payload_error(errors)
+        return payload
+
+    # ---------- Batches ----------
+    def validate_matrix(self, X):
+        """Masks for an ``(n, n_fields)`` float matrix in schema order.
+
+        NaN counts as blank, so unparseable values that were coerced to NaN
+        show up as ``required`` for required fields.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        blank = np.isnan(X)
+        with np.errstate(invalid="ignore"):
+            not_integer = self.integer & ~blank & (X != np.round(X))
+            out_of_range = ~blank & ~not_integer & ((X < self.low) | (X > self.high))
+        return BatchValidation(self, {
+            "required": blank & self.required,
+            "not_integer": not_integer,
+            "out_of_range": out_of_range,
+        })
+
+
+def payload_error(errors):
+    """``PayloadError`` carrying structured ``FieldError``s."""
+    by_code = {code: [e.field for e in errors if e.code == code] for code in ERROR_CODES}
+    invalid = by_code["not_a_number"] + by_code["not_integer"] + by_code["out_of_range"]
+    return PayloadError("Invalid payload.", by_code["required"], by_code["unexpected"], invalid,
+                        errors=[e._asdict() for e in errors])
+
+
+SCHEMA = CompiledSchema(FIELDS)
@@ -0,0 +1,273 @@
+"""Streaming bulk scoring for cohort files.
+
+Scores whole surveillance cohorts without going through the UI::
+
+    python backend/score_cohort.py cohort.csv scored.csv --chunk-size 50000 --workers 8
+    python backend/score_cohort.py cohort.parquet scored.parquet
+
+Input is read in fixed-size chunks (CSV via pandas, Parquet via pyarrow
+record batches). Columns may use the model feature names or the form-style
+names in ``prediction.FIELD_ALIASES``; a ``date`` column is turned into
+``WOS``, "Yes"/"No" answers into 1/0 and decimal commas into points, as the
+forms do. Missing values stay NaN, which the model treats as missing.
+
+Every row is checked against ``schema.SCHEMA`` and a ``validation_errors``
+column lists its problems as ``field:code`` pairs ("" for clean rows).
+``--invalid blank`` also scores out-of-range and non-integer values as
+missing; ``--invalid drop`` leaves those rows out of the output.
+
+Chunks are scored on a process pool with a vectorized predict and the
+batch rule engine in ``recommendations.py``. At most ``2 * workers`` chunks
+are in flight and results are written in input order as soon as they are
+ready, so memory stays flat regardless of file size.
+
+``--contributions approximate`` (or ``exact``) adds one ``contrib_<feature>``
+column per feature plus ``contrib_base``, the per-row feature contributions
+from XGBoost's ``pred_contribs`` (see ``contributions.py``). Approximate
+contributions cost a few times the prediction itself; exact TreeSHAP is
+several hundred times slower and is best paired with ``--workers``.
+"""
+import argparse
+import json
+import os
+import pathlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import prediction
+from contributions import ContributionExplainer
+from prediction import FEATURES, FIELD_ALIASES, predict_matrix
+from recommendations import RULE_ENGINE
+from registry import ModelRegistry
+from schema import SCHEMA
+
+_YES_NO = {"yes": 1, "no": 0, "y": 1, "n": 0, "true": 1, "false": 0}
+
+_model = None
+_explainer = None
+
+
+# ---------- Field mapping ----------
+def _yes_no_to_number(column):
+    if pd.api.types.is_numeric_dtype(column):
+        return pd.to_numeric(column, errors="coerce")
+    text = column.astype(str).str.strip()
+    mapped = text.str.lower().map(_YES_NO)
+    # "37,5" -> "37.5", like schema.parse_number.
+    text = text.where(text.str.contains(".", regex=False), text.str.replace(",", ".", n=1, regex=False))
+    return mapped.where(mapped.notna(), pd.to_numeric(text, errors="coerce"))
+
+
+def _week_of_season(column):
+    # Vectorized prediction.week_of_season: whole weeks since 1 January, 1-based.
+    dates = pd.to_datetime(column, errors="coerce")
+    return (dates.dt.dayofyear - 1) // 7 + 1
+
+
+def to_feature_frame(chunk):
+    """Map a raw cohort chunk onto the model's feature columns."""
+    chunk = chunk.rename(columns={k: v for k, v in FIELD_ALIASES.items() if k in chunk.columns})
+    if "WOS" not in chunk.columns and "date" in chunk.columns:
+        chunk = chunk.assign(WOS=_week_of_season(chunk["date"]))
+    missing = [f for f in FEATURES if f not in chunk.columns]
+    if missing:
+        raise prediction.PayloadError("Cohort is missing columns.", missing=missing)
+    return pd.DataFrame({f: _yes_no_to_number(chunk[f]) for f in FEATURES}, index=chunk.index)
+
+
+# ---------- Workers ----------
+def load_explainer(version, contributions, threads=None):
+    """``ContributionExplainer`` for ``--contributions``, or ``None``."""
+    if not contributions:
+        return None
+    registry = ModelRegistry()
+    version = version or registry.serving_version()
+    explainer = ContributionExplainer.for_model(
+        None, registry.artifact_path(version), approximate=contributions == "approximate")
+    if threads:
+        explainer.booster.set_param({"nthread": threads})
+    return explainer
+
+
+def _init_worker(version, backend, threads, contributions=None):
+    global _model, _explainer
+    _model, _ = ModelRegistry().load(version, backend=backend)
+    if hasattr(_model, "booster"):
+        _model.booster.set_param({"nthread": threads})
+    _explainer = load_explainer(version, contributions, threads)
+
+
+def score_chunk(chunk, model=None, explainer=None, invalid="flag"):
+    """Return ``chunk`` with the prediction and recommendation columns added.
+
+    ``invalid`` is "flag", "blank" or "drop" (see the module docstring).
+    """
+    model = model or _model
+    explainer = explainer or _explainer
+    features = to_feature_frame(chunk)
+    checked = SCHEMA.validate_matrix(features.to_numpy(dtype=np.float64))
+    errors = checked.error_strings()
+    if invalid == "drop":
+        keep = ~checked.invalid_rows
+        chunk, features, errors = chunk[keep], features[keep], errors[keep]
+    elif invalid == "blank":
+        features = features.mask(checked.masks["out_of_range"] | checked.masks["not_integer"])
+    X = np.ascontiguousarray(features.to_numpy(dtype=np.float32))
+    results = predict_matrix(model, X)
+    labels = [label for label, _ in results]
+    # Only a few distinct rule outcomes exist; serialize each one once.
+    codes, inverse = np.unique(RULE_ENGINE.codes(features, labels), return_inverse=True)
+    texts = np.array([
+        json.dumps(prediction.recommendations_to_dicts(RULE_ENGINE.for_code(code)), ensure_ascii=False)
+        for code in codes
+    ], dtype=object)
+    recommendations = texts[inverse.ravel()]
+    scored = chunk.assign(
+        prediction_label=labels,
+        probability=[p for _, p in results],
+        recommendations=recommendations,
+        validation_errors=errors,
+    )
+    if explainer is not None:
+        contribs = explainer.contributions(X)
+        columns = {f"contrib_{f}": contribs[:, j] for j, f in enumerate(explainer.feature_names)}
+        columns["contrib_base"] = contribs[:, -1]
+        scored = scored.assign(**columns)
+    return scored
+
+
+# ---------- I/O ----------
+def read_chunks(path, chunk_size):
+    path = pathlib.Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Append scored chunks to CSV or Parquet as they arrive.
+
+    A Parquet file has one schema, taken from the first chunk; later chunks
+    are cast to it, so a pass-through column whose inferred dtype changes
+    between chunks (ints first, then a stray string) is written consistently
+    or fails with the column named.
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.parquet = self.path.suffix == ".parquet"
+        self._writer = None
+        self._first = True
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            elif not table.schema.equals(self._writer.schema):
+                table = self._cast(table, self._writer.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    @staticmethod
+    def _cast(table, schema):
+        import pyarrow as pa
+        if table.schema.names != schema.names:
+            raise ValueError(f"Chunk columns {table.schema.names} differ from the first chunk's "
+                             f"{schema.names}.")
+        columns = []
+        for name, column in zip(schema.names, table.columns):
+            target = schema.field(name).type
+            try:
+                columns.append(column.cast(target))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"Column {name!r} is {column.type} in this chunk but {target} in "
+                                 f"the first one, and its values do not convert: {e}. Write CSV "
+                                 "or fix the column's type in the input.") from None
+        return pa.Table.from_arrays(columns, schema=schema)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def score_file(source, target, chunk_size=50_000, workers=None, version=None,
+               backend="xgboost", threads_per_worker=1, progress=None, contributions=None,
+               invalid="flag"):
+    """Score ``source`` into ``target``; returns ``(rows, seconds)``."""
+    workers = os.cpu_count() if workers is None else workers
+    writer = ChunkWriter(target)
+    rows, started = 0, time.perf_counter()
+    try:
+        if workers <= 0:
+            model, _ = ModelRegistry().load(version, backend=backend)
+            explainer = load_explainer(version, contributions)
+            for chunk in read_chunks(source, chunk_size):
+                scored = score_chunk(chunk, model, explainer, invalid)
+                writer.write(scored)
+                rows += len(scored)
+                if progress:
+                    progress(rows, time.perf_counter() - started)
+            return rows, time.perf_counter() - started
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(version, backend, threads_per_worker, contributions)) as pool:
+            pending = []
+            chunks = read_chunks(source, chunk_size)
+            while True:
+                while len(pending) < 2 * workers:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending.append(pool.submit(score_chunk, chunk, invalid=invalid))
+                if not pending:
+                    break
+                scored = pending.pop(0).result()
+                writer.write(scored)
+                rows += len(scored)
+                if progress:
+                    progress(rows, time.perf_counter() - started)
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a cohort CSV/Parquet file in streaming chunks.")
+    parser.add_argument("source", help="input .csv or .parquet")
+    parser.add_argument("target", help="output .csv or .parquet")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="scoring processes (default: CPU count, 0 = in-process)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--version", help="registry version (default: the serving one)")
+    parser.add_argument("--backend", default="xgboost", choices=("xgboost", "compiled"))
+    parser.add_argument("--contributions", choices=("approximate", "exact"),
+                        help="also write per-feature contribution columns")
+    parser.add_argument("--invalid", default="flag", choices=("flag", "blank", "drop"),
+                        help="rows failing the schema: only flag them, score bad values as "
+                             "missing, or leave the rows out")
+    args = parser.parse_args(argv)
+
+    def progress(rows, seconds):
+        print(f"\r{rows:,} rows  {rows / max(seconds, 1e-9):,.0f} rows/s", end="", file=sys.stderr)
+
+    rows, seconds = score_file(args.source, args.target, args.chunk_size, args.workers,
+                               args.version, args.backend, args.threads_per_worker, progress,
+                               args.contributions, args.invalid)
+    print(f"\nScored {rows:,} rows in {seconds:.1f}s -> {args.target}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Start the Streamlit UI with the model already loaded and warm.
+
+    python backend/serve.py [streamlit options, e.g. --server.port 8501]
+
+Same as ``streamlit run backend/streamlit_influenza_app.py``, except that
+the model is loaded and warmed (``readiness.STARTUP``) while Streamlit
+starts, and ``/healthz`` and ``/readyz`` are served on
+``INFLUENZA_HEALTH_PORT`` from the start. Point the load balancer's health
+check at ``/readyz`` so no session lands on a cold instance.
+"""
+import pathlib
+import sys
+
+import readiness
+
+APP = pathlib.Path(__file__).resolve().parent / "streamlit_influenza_app.py"
+
+
+def main(argv=None):
+    readiness.serve_from_env()
+    readiness.STARTUP.start()
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", str(APP), *(sys.argv[1:] if argv is None else argv)]
+    return cli.main()
+
+
+if __name__ == "__main__":
+    main()
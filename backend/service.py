@@ -0,0 +1,213 @@
+"""Everything needed to answer predictions for one served model.
+
+``PredictionService`` bundles the model, its manifest and the layers in
+front of it so the Streamlit UI and the JSON API answer exactly the same
+way::
+
+    PredictionCache   full result (label, probability, recommendations)
+                      keyed by the raw payload + model hash
+    SplitMemo         (label, probability) keyed by split intervals
+    MicroBatcher      merges concurrent misses into one model call
+    InferencePool     optional worker processes that run that call
+                      (``INFLUENZA_INFERENCE_WORKERS``)
+
+Every answered payload is queued for the request log (``request_log.py``)
+and, when ``INFLUENZA_SHADOW_VERSION`` is set, for a ``ShadowEvaluator``
+that scores it with a candidate model; neither runs on the request path.
+
+Feature contributions (``explain``) have their own micro-batcher and share
+the prediction cache; the booster behind them is loaded on first use, or by
+``warm_up`` before the first request (see ``readiness.py``).
+"""
+import threading
+import time
+
+import metrics
+from batching import MicroBatcher
+from contributions import ContributionExplainer, explain_rows
+from inference_pool import InferencePool, load_registry_model
+from model_io import default_backend
+from prediction import make_prediction, predict_payload
+from prediction_cache import PredictionCache
+from profiling import PROFILER
+from registry import ModelRegistry
+from request_log import default_log
+from shadow import ShadowEvaluator
+from split_memo import SplitMemo, SplitQuantizer
+from tree_compiler import CompiledForest, compile_model
+
+
+class PredictionService:
+    def __init__(self, model, manifest, batcher=None, cache=None, split_memo=None, pool=None,
+                 artifact_path=None, shadow=None, request_log=None):
+        self.model = model
+        self.pool = pool
+        self.shadow = shadow
+        self.request_log = request_log if request_log is not None else default_log()
+        self.artifact_path = artifact_path
+        self.manifest = manifest
+        self.version = manifest.get("version")
+        self.model_hash = manifest["sha256"]
+        self.batcher = batcher or MicroBatcher.from_env(model)
+        self.cache = cache or PredictionCache.from_env()
+        self.split_memo = split_memo
+        self._predict_one = split_memo.wrap(self.batcher.predict) if split_memo else self.batcher.predict
+        # Profiled requests score on their own thread, where cProfile sees it.
+        self._predict_inline = split_memo.wrap(self._score_inline) if split_memo else self._score_inline
+        self._explainer = self._explain_batcher = None
+        self._explainer_loaded = False
+        self._explain_lock = threading.Lock()
+
+    @classmethod
+    def for_model(cls, model, manifest, pool=None, artifact_path=None, shadow=None, **batch_options):
+        """Build the full stack (batcher, caches, split memo) for ``model``.
+
+        With a ``pool`` the batcher scores through its worker processes.
+        ``artifact_path`` is the model file contributions are loaded from
+        when ``model`` has no booster of its own; ``shadow`` is an optional
+        ``ShadowEvaluator``.
+        """
+        forest = model if isinstance(model, CompiledForest) else compile_model(model)
+        memo = None
+        if forest.feature_names:
+            memo = SplitMemo.from_env(SplitQuantizer.from_forest(forest))
+        if pool is not None:
+            batcher = MicroBatcher.from_env(pool, workers=pool.workers, **batch_options)
+        else:
+            batcher = MicroBatcher.from_env(model, **batch_options)
+        return cls(model, manifest, batcher, PredictionCache.from_env(), memo, pool, artifact_path, shadow)
+
+    @classmethod
+    def from_registry(cls, version=None, backend=None, registry=None, **batch_options):
+        registry = registry or ModelRegistry()
+        backend = backend or default_backend()
+        model, manifest = registry.load(version, backend=backend)
+        shadow = ShadowEvaluator.from_env(manifest["version"], backend, registry)
+        pool = InferencePool.from_env(
+            model, (load_registry_model, (str(registry.root), manifest["version"], backend)))
+        return cls.for_model(model, manifest, pool, registry.artifact_path(manifest["version"]),
+                             shadow, **batch_options)
+
+    # ---------- Predictions ----------
+    def predict(self, payload):
+        """``prediction.Prediction`` for a validated 20-field payload."""
+        metrics.PREDICTIONS.inc()
+        started = time.perf_counter()
+        predict_one = self._predict_inline if PROFILER.active() else self._predict_one
+        result = self.cache.get_or_compute(
+            payload, self.model_hash, lambda p: make_prediction(p, predict_one))
+        seconds = time.perf_counter() - started
+        if self.request_log:
+            self.request_log.record(payload, self.version, result, seconds)
+        if self.shadow:
+            self.shadow.submit(payload, result, seconds)
+        return result
+
+    def score(self, payload):
+        """``Prediction`` straight from the serving path (split memo, batcher, pool).
+
+        Skips the prediction cache, request log, shadow and counters; used to
+        check and warm a service before it takes traffic.
+        """
+        return make_prediction(payload, self._predict_one)
+
+    def _score_inline(self, payload):
+        return predict_payload(self.model, payload)
+
+    def lookup(self, payload):
+        """Previously computed ``Prediction`` for this payload, or ``None``."""
+        return self.cache.lookup(payload, self.model_hash)
+
+    # ---------- Contributions ----------
+    @property
+    def explainer(self):
+        """The ``ContributionExplainer``, or ``None`` without a booster or xgboost."""
+        with self._explain_lock:
+            if not self._explainer_loaded:
+                self._explainer_loaded = True
+                try:
+                    self._explainer = ContributionExplainer.for_model(self.model, self.artifact_path)
+                except ImportError:
+                    self._explainer = None
+                if self._explainer is not None:
+                    self._explain_batcher = MicroBatcher.from_env(self._explainer, predict_fn=explain_rows)
+            return self._explainer
+
+    def explain(self, payload):
+        """Exact ``contributions.Explanation`` for one payload, or ``None``.
+
+        Cached next to the payload's prediction, so the Detail page and API
+        retries do not recompute it.
+        """
+        if self.explainer is None:
+            return None
+        if PROFILER.active():
+            return self.cache.get_or_compute(
+                payload, self.model_hash + ":contributions", lambda p: explain_rows(self.explainer, [p])[0])
+        return self.cache.get_or_compute(
+            payload, self.model_hash + ":contributions", self._explain_batcher.predict)
+
+    def explain_batch(self, payloads, approximate=False):
+        """Explanations for many payloads in one booster call (uncached)."""
+        if self.explainer is None:
+            return None
+        X = self.explainer.encoder.encode_batch(payloads)
+        return self.explainer.explain_matrix(X, approximate)
+
+    # ---------- Warm-up ----------
+    def warm_up(self, payloads, contributions=True):
+        """Run ``payloads`` through every serving layer but the prediction cache.
+
+        One concurrent burst exercises the batcher (and pool workers), then
+        each payload goes through the split memo and recommendation rules.
+        Nothing is cached or counted as a served prediction.
+        """
+        for future in [self.batcher.submit(p) for p in payloads]:
+            future.result()
+        for payload in payloads:
+            self.score(payload)
+        if contributions and payloads and self.explainer is not None:
+            self._explain_batcher.predict(payloads[0])
+
+    def stats(self):
+        return {
+            "model_version": self.version,
+            "model_sha256": self.model_hash,
+            "batching": self.batcher.stats.snapshot(),
+            "prediction_cache": self.cache.stats(),
+            "split_memo": self.split_memo.stats() if self.split_memo else None,
+            "inference_pool": self.pool.stats() if self.pool else None,
+            "contributions_batching": self._explain_batcher.stats.snapshot() if self._explain_batcher else None,
+            "shadow": self.shadow.stats() if self.shadow else None,
+            "request_log": self.request_log.stats() if self.request_log else None,
+        }
+
+    def metrics_families(self):
+        """Cache and batching counters for ``metrics.REGISTRY``."""
+        caches = {"prediction": self.cache.stats()}
+        if self.split_memo:
+            caches["split_memo"] = self.split_memo.stats()
+        batching = self.batcher.stats.snapshot()
+        version = {"model_version": self.version}
+        shadow = self.shadow.metrics_families() if self.shadow else []
+        return shadow + [
+            ("influenza_cache_hits", "counter", "Cache lookups answered from the cache.",
+             [("_total", {"cache": name}, s["hits"]) for name, s in caches.items()]),
+            ("influenza_cache_misses", "counter", "Cache lookups that had to compute.",
+             [("_total", {"cache": name}, s["misses"]) for name, s in caches.items()]),
+            ("influenza_cache_entries", "gauge", "Entries currently cached.",
+             [("", {"cache": name}, s["size"]) for name, s in caches.items()]),
+            ("influenza_batches", "counter", "Model calls made by the micro-batcher.",
+             [("_total", version, batching["batches"])]),
+            ("influenza_batched_requests", "counter", "Rows scored through the micro-batcher.",
+             [("_total", version, batching["requests"])]),
+        ]
+
+    def close(self):
+        if self.shadow:
+            self.shadow.close()
+        self.batcher.close()
+        if self._explain_batcher:
+            self._explain_batcher.close()
+        if self.pool:
+            self.pool.close()
@@ -0,0 +1,316 @@
+"""Bounded server-side store for per-session UI state.
+
+Phones keep their Streamlit session open indefinitely, so the UI keeps its
+own state (``page``, ``form1``, ``form2``, ``last_pred_label``) here instead
+of letting it pile up in ``st.session_state``. Every store is capped by
+session count and total serialized bytes (least recently used sessions go
+first) and forgets sessions idle for longer than ``idle_timeout``.
+``SessionReaper`` periodically expires idle sessions.
+
+Only the stored state is dropped here; a tab that comes back starts on
+Home. Streamlit has no supported way to close a session from the server,
+so the session itself is closed by Streamlit once its websocket has been
+gone for ``server.disconnectedSessionTTL`` seconds (set in
+``.streamlit/config.toml``); with the state kept here, what an open
+session holds on its own is small.
+
+Backends: ``MemorySessionStore`` (default), ``SQLiteSessionStore`` (one file
+shared by every process on the host) and ``RedisSessionStore`` (any client
+with the redis-py ``get``/``set``/``delete``/``exists`` methods; ``redis`` is
+only imported for ``redis://`` URLs).
+
+Configuration from the environment (see ``open_store``):
+
+``INFLUENZA_SESSION_STORE``          "memory", "sqlite:///path/sessions.db" or
+                                     "redis://host:6379/0" (default memory)
+``INFLUENZA_SESSION_MAX``            max sessions kept (default 10000)
+``INFLUENZA_SESSION_MAX_BYTES``      max total state size (default 16 MiB)
+``INFLUENZA_SESSION_IDLE_TIMEOUT``   idle seconds before a session is dropped
+                                     (default 1800)
+``INFLUENZA_SESSION_REAP_INTERVAL``  seconds between reaper passes (default 60)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def encode_state(state):
+    return json.dumps(state, separators=(",", ":"), sort_keys=True)
+
+
+class SessionStore:
+    """Common caps and counters; backends implement the storage."""
+
+    def __init__(self, max_sessions=10_000, max_bytes=16 << 20, idle_timeout=1800.0, clock=time.time):
+        self.max_sessions = int(max_sessions)
+        self.max_bytes = int(max_bytes)
+        self.idle_timeout = float(idle_timeout)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, session_id):
+        """The session's state dict (and mark it active), or ``None``."""
+        raise NotImplementedError
+
+    def put(self, session_id, state):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def reap(self):
+        """Drop idle sessions; return how many were dropped."""
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions in one process, as an LRU of serialized states."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._sessions = OrderedDict()  # id -> (last_seen, encoded state)
+        self._bytes = 0
+
+    def get(self, session_id):
+        now = self.clock()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if now - entry[0] > self.idle_timeout:
+                self._remove(session_id)
+                self.expirations += 1
+                return None
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            return json.loads(entry[1])
+
+    def put(self, session_id, state):
+        blob = encode_state(state)
+        with self._lock:
+            self._remove(session_id)
+            self._sessions[session_id] = (self.clock(), blob)
+            self._bytes += len(blob)
+            while len(self._sessions) > 1 and (
+                    len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+                oldest = next(iter(self._sessions))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._remove(session_id)
+
+    def _remove(self, session_id):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def reap(self):
+        cutoff = self.clock() - self.idle_timeout
+        expired = 0
+        with self._lock:
+            # Oldest first, so stop at the first session still active.
+            for session_id, (last_seen, _) in list(self._sessions.items()):
+                if last_seen > cutoff:
+                    break
+                self._remove(session_id)
+                expired += 1
+            self.expirations += expired
+        return expired
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "largest_bytes": max((len(blob) for _, blob in self._sessions.values()), default=0),
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite file, shared by every process on the host."""
+
+    def __init__(self, path, **options):
+        super().__init__(**options)
+        self.path = str(path)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, state TEXT NOT NULL, size INTEGER NOT NULL, last_seen REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+
+    def get(self, session_id):
+        now = self.clock()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state, last_seen FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.idle_timeout:
+                self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self.expirations += 1
+                return None
+            self._db.execute("UPDATE sessions SET last_seen = ? WHERE id = ?", (now, session_id))
+            return json.loads(row[0])
+
+    def put(self, session_id, state):
+        blob = encode_state(state)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (id, state, size, last_seen) VALUES (?, ?, ?, ?)",
+                (session_id, blob, len(blob), self.clock()))
+            while True:
+                count, total = self._totals()
+                if count <= 1 or (count <= self.max_sessions and total <= self.max_bytes):
+                    break
+                oldest, = self._db.execute(
+                    "SELECT id FROM sessions ORDER BY last_seen LIMIT 1").fetchone()
+                self._db.execute("DELETE FROM sessions WHERE id = ?", (oldest,))
+                self.evictions += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def _totals(self):
+        return self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+
+    def reap(self):
+        cutoff = self.clock() - self.idle_timeout
+        with self._lock:
+            expired = self._db.execute("DELETE FROM sessions WHERE last_seen <= ?", (cutoff,)).rowcount
+            self.expirations += expired
+        return expired
+
+    def stats(self):
+        with self._lock:
+            count, total = self._totals()
+            largest, = self._db.execute("SELECT COALESCE(MAX(size), 0) FROM sessions").fetchone()
+            return {
+                "backend": "sqlite",
+                "sessions": count,
+                "max_sessions": self.max_sessions,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "largest_bytes": largest,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions in Redis; idle expiry is the key TTL.
+
+    Redis enforces the size cap itself (``maxmemory`` with a ``volatile-*``
+    eviction policy); ``max_sessions``/``max_bytes`` are not applied here.
+    ``reap`` counts the sessions this process served whose keys are gone.
+    """
+
+    def __init__(self, client, prefix="influenza:session:", **options):
+        super().__init__(**options)
+        self.client = client
+        self.prefix = prefix
+        self._known = set()
+
+    @classmethod
+    def from_url(cls, url, **options):
+        import redis
+        return cls(redis.Redis.from_url(url), **options)
+
+    def _key(self, session_id):
+        return self.prefix + session_id
+
+    def get(self, session_id):
+        blob = self.client.get(self._key(session_id))
+        if blob is None:
+            return None
+        self.client.expire(self._key(session_id), max(int(self.idle_timeout), 1))
+        return json.loads(blob)
+
+    def put(self, session_id, state):
+        self.client.set(self._key(session_id), encode_state(state), ex=max(int(self.idle_timeout), 1))
+        with self._lock:
+            self._known.add(session_id)
+
+    def delete(self, session_id):
+        self.client.delete(self._key(session_id))
+        with self._lock:
+            self._known.discard(session_id)
+
+    def reap(self):
+        with self._lock:
+            known = list(self._known)
+        expired = [s for s in known if not self.client.exists(self._key(s))]
+        with self._lock:
+            self._known.difference_update(expired)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "redis", "sessions": len(self._known), "expirations": self.expirations}
+
+
+def open_store(url=None, **overrides):
+    """Build the store named by ``url`` or ``INFLUENZA_SESSION_STORE``."""
+    url = url or os.environ.get("INFLUENZA_SESSION_STORE") or "memory"
+    options = {
+        "max_sessions": int(os.environ.get("INFLUENZA_SESSION_MAX", 10_000)),
+        "max_bytes": int(os.environ.get("INFLUENZA_SESSION_MAX_BYTES", 16 << 20)),
+        "idle_timeout": float(os.environ.get("INFLUENZA_SESSION_IDLE_TIMEOUT", 1800)),
+    }
+    options.update(overrides)
+    if url == "memory":
+        return MemorySessionStore(**options)
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):], **options)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore.from_url(url, **options)
+    raise ValueError(f"Unknown session store {url!r}")
+
+
+class SessionReaper:
+    """Background thread that reaps ``store`` every ``interval`` seconds."""
+
+    def __init__(self, store, interval=60.0):
+        self.store = store
+        self.interval = float(interval)
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="session-reaper", daemon=True)
+
+    @classmethod
+    def from_env(cls, store, **overrides):
+        options = {"interval": float(os.environ.get("INFLUENZA_SESSION_REAP_INTERVAL", 60))}
+        options.update(overrides)
+        return cls(store, **options)
+
+    def start(self):
+        self._worker.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._worker.join(timeout)
+
+    def reap_once(self):
+        return self.store.reap()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.reap_once()
+
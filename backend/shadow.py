@@ -0,0 +1,245 @@
+"""Shadow evaluation of a candidate model on live traffic.
+
+The served (primary) model answers every request as usual. With
+``INFLUENZA_SHADOW_VERSION`` set, each answered payload is also offered to
+a ``ShadowEvaluator``, which scores it with the candidate model in its own
+background thread and records:
+
+* how often the candidate's label disagrees with the primary's, and the
+  mean absolute difference in probability
+* primary latency (as served, cache hits included) and candidate latency
+  (per batch and per row)
+* the two score distributions, as 10-bin probability histograms
+
+Every ``log_interval`` seconds the window is appended as one JSON line to
+``log_path`` and reset; ``stats()`` has the running totals.
+
+The primary path only pays for a ``put_nowait`` on a bounded queue: when
+the candidate falls behind, payloads are dropped (and counted) rather than
+queued, so shadowing can never delay an answer or grow without bound.
+Candidates must take the same 20-field payload; a model whose feature names
+do not match ``schema.py`` (such as ``v0-legacy``, 79 unnamed features) is
+refused when the service is built.
+
+Configuration from the environment (see ``ShadowEvaluator.from_env``):
+
+``INFLUENZA_SHADOW_VERSION``       registry version to shadow (default: off)
+``INFLUENZA_SHADOW_BACKEND``       its backend (default: the serving default)
+``INFLUENZA_SHADOW_QUEUE``         max payloads waiting (default 256)
+``INFLUENZA_SHADOW_SAMPLE``        fraction of traffic shadowed (default 1)
+``INFLUENZA_SHADOW_LOG``           JSONL summary file (default backend/logs/shadow.jsonl)
+``INFLUENZA_SHADOW_LOG_INTERVAL``  seconds per summary line (default 60)
+"""
+import collections
+import json
+import os
+import pathlib
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+from encoder import FeatureEncoder
+from model_io import default_backend
+from registry import ModelRegistry
+from schema import SCHEMA
+
+DEFAULT_LOG = pathlib.Path(__file__).resolve().parent / "logs" / "shadow.jsonl"
+BINS = 10
+
+
+class ShadowError(ValueError):
+    """The candidate cannot score the payloads the primary model takes."""
+
+
+def _percentiles(samples):
+    if not samples:
+        return None
+    p50, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), (50, 99)) * 1000
+    return {"p50": round(float(p50), 3), "p99": round(float(p99), 3)}
+
+
+class _Window:
+    """Counters for one summary interval."""
+
+    def __init__(self, started, max_samples=4096):
+        self.started = started
+        self.compared = self.disagreements = self.dropped = self.errors = 0
+        self.abs_diff = 0.0
+        self.primary_ms = collections.deque(maxlen=max_samples)
+        self.candidate_ms = collections.deque(maxlen=max_samples)  # per row
+        self.candidate_batch_ms = collections.deque(maxlen=max_samples)
+        self.primary_hist = np.zeros(BINS, dtype=np.int64)
+        self.candidate_hist = np.zeros(BINS, dtype=np.int64)
+
+    def to_dict(self, ended):
+        return {
+            "started": round(self.started, 3),
+            "ended": round(ended, 3),
+            "compared": self.compared,
+            "disagreements": self.disagreements,
+            "disagreement_rate": self.disagreements / self.compared if self.compared else None,
+            "mean_abs_diff": self.abs_diff / self.compared if self.compared else None,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "primary_ms": _percentiles(self.primary_ms),
+            "candidate_ms": _percentiles(self.candidate_ms),
+            "candidate_batch_ms": _percentiles(self.candidate_batch_ms),
+            "primary_hist": self.primary_hist.tolist(),
+            "candidate_hist": self.candidate_hist.tolist(),
+        }
+
+
+class ShadowEvaluator:
+    """Scores a sample of live payloads with a candidate model, off the request path."""
+
+    def __init__(self, model, version, feature_names=None, primary_version=None, max_queue=256,
+                 sample=1.0, log_path=DEFAULT_LOG, log_interval=60.0, max_batch=64,
+                 rng=random.random, clock=time.time):
+        names = feature_names or getattr(model, "feature_names", None)
+        if not names or tuple(names) != SCHEMA.names:
+            raise ShadowError(f"candidate {version!r} does not take the schema's "
+                              f"{len(SCHEMA.names)} named features")
+        self.model = model
+        self.version = version
+        self.primary_version = primary_version
+        self.encoder = FeatureEncoder(names)
+        self.sample = float(sample)
+        self.log_path = pathlib.Path(log_path) if log_path else None
+        self.log_interval = float(log_interval)
+        self.max_batch = int(max_batch)
+        self.rng = rng
+        self.clock = clock
+        self.compared = self.disagreements = self.dropped = self.errors = 0
+        self._window = _Window(clock())
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=int(max_queue))
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="shadow", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, primary_version, primary_backend=None, registry=None, **overrides):
+        """The configured evaluator, or ``None`` when shadowing is off."""
+        version = os.environ.get("INFLUENZA_SHADOW_VERSION")
+        backend = os.environ.get("INFLUENZA_SHADOW_BACKEND") or default_backend()
+        if not version or (version, backend) == (primary_version, primary_backend or default_backend()):
+            return None
+        model, manifest = (registry or ModelRegistry()).load(version, backend=backend)
+        options = {
+            "max_queue": int(os.environ.get("INFLUENZA_SHADOW_QUEUE", 256)),
+            "sample": float(os.environ.get("INFLUENZA_SHADOW_SAMPLE", 1)),
+            "log_path": os.environ.get("INFLUENZA_SHADOW_LOG", DEFAULT_LOG),
+            "log_interval": float(os.environ.get("INFLUENZA_SHADOW_LOG_INTERVAL", 60)),
+        }
+        options.update(overrides)
+        return cls(model, f"{version}:{backend}", manifest.get("feature_names"), primary_version, **options)
+
+    # ---------- Primary path ----------
+    def submit(self, payload, result, seconds):
+        """Offer one answered payload; never blocks."""
+        if self._closed.is_set() or (self.sample < 1 and self.rng() >= self.sample):
+            return
+        try:
+            self._queue.put_nowait((payload, result.label, result.probability, seconds))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._window.dropped += 1
+
+    # ---------- Shadow thread ----------
+    def _run(self):
+        next_flush = self.clock() + self.log_interval
+        while not (self._closed.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=max(0.0, min(next_flush - self.clock(), 0.5)))]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                self._score(batch)
+            if self.clock() >= next_flush:
+                self.flush()
+                next_flush = self.clock() + self.log_interval
+        self.flush()
+
+    def _score(self, batch):
+        started = time.perf_counter()
+        try:
+            proba = self.model.predict_proba(self.encoder.encode_batch([item[0] for item in batch]))
+        except Exception:
+            with self._lock:
+                self.errors += len(batch)
+                self._window.errors += len(batch)
+            return
+        seconds = time.perf_counter() - started
+        labels = proba.argmax(axis=1)
+        candidate = proba[:, 1]
+        primary_labels = np.array([item[1] for item in batch])
+        primary = np.array([np.nan if item[2] is None else item[2] for item in batch], dtype=np.float64)
+        disagreements = int(np.count_nonzero(labels != primary_labels))
+        with self._lock:
+            window = self._window
+            self.compared += len(batch)
+            self.disagreements += disagreements
+            window.compared += len(batch)
+            window.disagreements += disagreements
+            window.abs_diff += float(np.nansum(np.abs(candidate - primary)))
+            window.primary_ms.extend(item[3] for item in batch)
+            window.candidate_ms.append(seconds / len(batch))
+            window.candidate_batch_ms.append(seconds)
+            scored = ~np.isnan(primary)
+            window.primary_hist += np.bincount(np.minimum(primary[scored] * BINS, BINS - 1).astype(np.int64),
+                                               minlength=BINS)
+            window.candidate_hist += np.bincount(np.minimum(candidate * BINS, BINS - 1).astype(np.int64),
+                                                 minlength=BINS)
+
+    def flush(self):
+        """Append the current window to the log (if it saw traffic) and start a new one."""
+        now = self.clock()
+        with self._lock:
+            window, self._window = self._window, _Window(now)
+        if self.log_path is None or not (window.compared or window.dropped or window.errors):
+            return None
+        record = {"primary": self.primary_version, "candidate": self.version, **window.to_dict(now)}
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        return record
+
+    # ---------- Lifecycle ----------
+    def stats(self):
+        with self._lock:
+            return {
+                "candidate": self.version,
+                "queued": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "sample": self.sample,
+                "compared": self.compared,
+                "disagreements": self.disagreements,
+                "disagreement_rate": self.disagreements / self.compared if self.compared else None,
+                "dropped": self.dropped,
+                "errors": self.errors,
+            }
+
+    def metrics_families(self):
+        stats = self.stats()
+        labels = {"candidate": self.version}
+        return [
+            ("influenza_shadow_compared", "counter", "Payloads scored by the shadow model.",
+             [("_total", labels, stats["compared"])]),
+            ("influenza_shadow_disagreements", "counter", "Shadow labels that differ from the served ones.",
+             [("_total", labels, stats["disagreements"])]),
+            ("influenza_shadow_dropped", "counter", "Payloads skipped because the shadow queue was full.",
+             [("_total", labels, stats["dropped"])]),
+        ]
+
+    def close(self, timeout=5.0):
+        self._closed.set()
+        self._thread.join(timeout)
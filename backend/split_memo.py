@@ -0,0 +1,118 @@
+"""Exact prediction memo keyed by split-threshold intervals.
+
+The trees only ever compare a feature with its split thresholds
+(``x < t``, in float32). Two inputs that fall into the same interval
+between consecutive thresholds on every feature therefore take the same
+path through every tree and get exactly the same prediction. Keying a
+memo by the tuple of interval indices, instead of the raw values, makes a
+temperature of 38.15 and 38.2 share an entry whenever no split lies
+between them, with no loss of exactness.
+
+``SplitQuantizer`` extracts the sorted thresholds per feature from a
+``CompiledForest``; ``SplitMemo`` wraps a ``predict_one(payload)`` callable
+with an LRU memo keyed by interval indices.
+
+``INFLUENZA_SPLIT_MEMO_SIZE`` sets the number of entries (default 65536,
+0 disables).
+"""
+import bisect
+import math
+import os
+import struct
+
+import numpy as np
+
+from encoder import FeatureEncoder
+from prediction_cache import PredictionCache
+
+_FLOAT32 = struct.Struct("f")
+MISSING = -1
+
+
+def _to_float32(value):
+    # XGBoost compares float32 values; round exactly as it does.
+    try:
+        return _FLOAT32.unpack(_FLOAT32.pack(value))[0]
+    except OverflowError:
+        return math.copysign(math.inf, value)
+
+
+class SplitQuantizer:
+    """Map feature values to the index of their split-threshold interval.
+
+    The index is the number of thresholds ``t <= x`` for that feature, so
+    every ``x < t`` test in the forest has the same outcome for all values
+    sharing an index. Missing values (NaN/None) get ``MISSING``.
+    """
+
+    def __init__(self, feature_names, thresholds):
+        self.feature_names = tuple(feature_names)
+        self.thresholds = [np.unique(np.asarray(t, dtype=np.float32)) for t in thresholds]
+        self._threshold_lists = [t.astype(np.float64).tolist() for t in self.thresholds]
+        self.encoder = FeatureEncoder(self.feature_names)
+
+    @classmethod
+    def from_forest(cls, forest, feature_names=None):
+        feature_names = feature_names or forest.feature_names
+        internal = forest.left != np.arange(forest.n_nodes)
+        thresholds = [forest.threshold[internal & (forest.feature == j)]
+                      for j in range(len(feature_names))]
+        return cls(feature_names, thresholds)
+
+    @property
+    def n_intervals(self):
+        """Intervals per feature (thresholds + 1)."""
+        return [len(t) + 1 for t in self.thresholds]
+
+    def key(self, payload):
+        """Interval indices of one payload, as a hashable tuple."""
+        self.encoder.validate(payload)
+        key = []
+        for name, cuts in zip(self.feature_names, self._threshold_lists):
+            value = payload[name]
+            if value is None or math.isnan(value := float(value)):
+                key.append(MISSING)
+            else:
+                key.append(bisect.bisect_right(cuts, _to_float32(value)))
+        return tuple(key)
+
+    def bins(self, X):
+        """Interval indices for a float32 matrix, shape ``(n, n_features)``."""
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty(X.shape, dtype=np.int32)
+        for j, cuts in enumerate(self.thresholds):
+            out[:, j] = np.searchsorted(cuts, X[:, j], side="right")
+        out[np.isnan(X)] = MISSING
+        return out
+
+
+class SplitMemo:
+    """Memoize ``(label, probability)`` by split-interval key."""
+
+    def __init__(self, quantizer, maxsize=65536):
+        self.quantizer = quantizer
+        # Entries never go stale for a given model, hence no TTL.
+        self.cache = PredictionCache(maxsize=maxsize, ttl=math.inf)
+
+    @classmethod
+    def from_env(cls, quantizer, **overrides):
+        options = {"maxsize": int(os.environ.get("INFLUENZA_SPLIT_MEMO_SIZE", 65536))}
+        options.update(overrides)
+        return cls(quantizer, **options)
+
+    def wrap(self, predict_one):
+        if not self.cache.enabled:
+            return predict_one
+
+        def predict(payload):
+            key = self.quantizer.key(payload)
+            result = self.cache.get(key)
+            if result is None:
+                result = predict_one(payload)
+                self.cache.put(key, result)
+            return result
+
+        return predict
+
+    def stats(self):
+        return self.cache.stats()
@@ -1,181 +1,108 @@
-import streamlit as st
-import pandas as pd
-import joblib
-import os
+import hashlib
 import pathlib
+
+import streamlit as st
 from datetime import datetime, date
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import metrics
+import readiness
+from profiling import PROFILER
+from contributions import top_contributions
+from prediction import FORM2_FIELDS, build_payload, get_recommendations, week_of_season
+from schema import SCHEMA
+from session_store import SessionReaper, open_store
 
 # ---------- Helper: load model ----------
+# One service per process: the model plus the batcher and caches in front of
+# it are shared by every session. serve.py loads and warms it before the
+# first session; under a plain `streamlit run` the first session does. New
+# registry versions are swapped in between reruns (see model_manager.py), so
+# read it once per rerun.
+service = readiness.STARTUP.service()
+model = service.model if service else None
+
+# Stage timings for this process on INFLUENZA_METRICS_PORT (see metrics.py),
+# /healthz and /readyz on INFLUENZA_HEALTH_PORT (see readiness.py).
 @st.cache_resource
-def load_model(path="model_pipeline.pkl"):
-    path = pathlib.Path(__file__).parent / path
-    if not path.exists():
-        return None
-    return joblib.load(path)
-
-model = load_model("model_pipeline.pkl")
-
-# ---------- Helper: Recommendation Logic ----------
-def get_recommendations(data, prediction_label):
-    recs_keys = set()
-    recommendations = []
-
-    # --- KATEGORI 1: RED FLAGS ---
-    if float(data.get("o2s", 100)) < 95:
-        recs_keys.add("O2S_LOW")
-        recommendations.append(("Immediate Medical Attention", "Saturasi oksigen < 95%. Tanda hipoksemia serius.", "WHO", "danger"))
-    if float(data.get("rr", 20)) > 24:
-        recs_keys.add("RR_HIGH")
-        recommendations.append(("Immediate Medical Attention", "Laju napas > 24x/menit. Distres pernapasan.", "Merck Manual", "danger"))
-    if float(data.get("as_edenroll_temp", 36)) > 40:
-        recs_keys.add("TEMP_EXTREME")
-        recommendations.append(("Immediate Medical Attention", "Suhu > 40°C. Hiperpireksia.", "CDC", "danger"))
-    if float(data.get("sbp", 120)) < 90:
-        recs_keys.add("SBP_LOW")
-        recommendations.append(("Immediate Medical Attention", "Tekanan darah sistolik < 90. Tanda syok.", "WHO", "danger"))
-
-    if any(r[3] == 'danger' for r in recommendations):
-        return recommendations
-
-    # --- KATEGORI 2: RISIKO TINGGI ---
-    temp = float(data.get("as_edenroll_temp", 36))
-    if temp > 38.0:
-        msg = "Demam > 38°C menandakan infeksi. Konsultasi dokter disarankan."
-        recommendations.append(("Consult a Doctor", msg, "Panduan Medis Umum", "warning"))
-    if data.get("pastmedchronlundis", 0) == 1:
-        recommendations.append(("High Risk Factor", "Riwayat penyakit paru kronis meningkatkan risiko komplikasi.", "CDC", "warning"))
-
-    # --- KATEGORI 3 & 4: EDUKASI ---
-    if prediction_label == 1 and not recommendations:
-         recommendations.append(("Self-Care", "Prediksi positif gejala ringan. Istirahat & hidrasi.", "CDC", "info"))
-    elif prediction_label == 0 and not recommendations:
-         recommendations.append(("General Advice", "Prediksi negatif. Kemungkinan common cold. Istirahat.", "CDC", "info"))
-    
-    if data.get("fluvaccine", 1) == 0:
-        recommendations.append(("Prevention", "Pertimbangkan vaksin flu tahunan.", "WHO", "info"))
+def start_metrics_server():
+    readiness.serve_from_env()
+    return metrics.serve_from_env()
 
-    return recommendations
+start_metrics_server()
 
 # ---------- UI Config ----------
 st.set_page_config(page_title="Influenza Prediction", layout="centered")
 
-if "page" not in st.session_state:
-    st.session_state.page = "Home"
+# ---------- Session state ----------
+# page, form1, form2 and last_pred_label live in a bounded store (see
+# session_store.py) rather than st.session_state; the reaper expires idle
+# sessions' state. Streamlit closes sessions whose tab has gone away after
+# server.disconnectedSessionTTL (see .streamlit/config.toml).
+@st.cache_resource
+def get_session_store():
+    store = open_store()
+    SessionReaper.from_env(store).start()
+    return store
+
+session_store = get_session_store()
+SESSION_ID = get_script_run_ctx().session_id
+
+def load_state():
+    return session_store.get(SESSION_ID) or {"page": "Home"}
+
+def save_state(**changes):
+    state = load_state()
+    state.update(changes)
+    session_store.put(SESSION_ID, state)
+
+state = load_state()
+
+# ---------- Profiling ----------
+# INFLUENZA_PROFILE samples reruns; ?profile=1 profiles every rerun of this
+# tab. Profiles are tagged with the page (see profiling.py); form submits
+# write theirs in rerun() before st.rerun() starts the next run.
+PROFILER.begin(state["page"], force=PROFILER.allow_query and st.query_params.get("profile") == "1")
 
 # --- NAVIGASI LOGIC ---
 def go_to(page):
-    st.session_state.page = page
+    save_state(page=page)
 
 def go_home():
-    st.session_state["form1"] = {}
-    st.session_state["form2"] = {}
-    st.session_state.page = "Home"
+    save_state(form1={}, form2={}, page="Home")
+
+def rerun():
+    PROFILER.end()  # st.rerun() never returns to the end() at the bottom
+    st.rerun()
 
 # ---------- CSS MANAGEMENT ----------
-ROSE_COLOR = "#E06377" 
-BORDER_COLOR = "#E06377"
-BTN_BLUE = "linear-gradient(90deg, #4B90FF, #0055FF)"
-BTN_GREEN = "linear-gradient(90deg, #00FF9D, #4CF925)"
+# All styles live in static/influenza.css. With static serving on (see
+# .streamlit/config.toml) the browser fetches and caches that file once, and
+# each rerun only sends the <link> tag plus the page class. The ?v= content
+# hash makes browsers pick up edits to the file immediately.
+STYLESHEET = pathlib.Path(__file__).parent / "static" / "influenza.css"
+
+@st.cache_resource
+def stylesheet_tag():
+    css = STYLESHEET.read_text(encoding="utf-8")
+    if not st.get_option("server.enableStaticServing"):
+        return f"<style>{css}</style>"  # no static route; inline it as before
+    version = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+    return f'<link rel="stylesheet" href="app/static/{STYLESHEET.name}?v={version}">'
 
 def load_css(page_type="form"):
-    base_css = """
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap');
-    
-    :root { --font: "Inter", sans-serif; }
-    html, body, [class*="css"] { font-family: 'Inter', sans-serif; }
-    
-    [data-testid="stHeader"] { visibility: hidden; }
-    footer { visibility: hidden; }
-    #MainMenu { visibility: hidden; }
-    </style>
-    """
-    st.markdown(base_css, unsafe_allow_html=True)
-
-    if page_type == "home":
-        # CSS HOME
-        st.markdown(f"""
-        <style>
-        [data-testid="stAppViewContainer"] {{
-            background: linear-gradient(180deg, #4B90FF 40%, #f0f2f6 40%);
-        }}
-        .home-card {{
-            position: fixed; top: 50%; left: 50%;
-            transform: translate(-50%, -50%);
-            width: 85%; max-width: 400px; height: 50vh;
-            background: white; border-radius: 30px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.15);
-            display: flex; flex-direction: column;
-            align-items: center; justify-content: center;
-            z-index: 1;
-        }}
-        .home-title {{
-            font-size: 26px; font-weight: 800; color: #333; margin-bottom: 60px;
-        }}
-        div.stButton > button {{
-            background: {BTN_GREEN} !important;
-            color: white !important; font-weight: 700; border: none;
-            border-radius: 30px; padding: 15px 40px;
-            box-shadow: 0 10px 20px rgba(0,255,157, 0.4);
-            position: fixed; top: 60%; left: 50%;
-            transform: translate(-50%, -50%);
-            z-index: 10; width: auto;
-        }}
-        div.stButton > button:hover {{ transform: translate(-50%, -50%) scale(1.05); }}
-        </style>
-        """, unsafe_allow_html=True)
+    with metrics.stage("css"):
+        st.markdown(f'{stylesheet_tag()}<div class="page-{page_type}"></div>', unsafe_allow_html=True)
 
-    else:
-        # CSS FORM & RESULT & DETAIL
-        st.markdown(f"""
-        <style>
-        [data-testid="stAppViewContainer"] {{ background-color: #f0f2f6; }}
-        
-        /* Container Card Putih */
-        [data-testid="stAppViewContainer"] > .main > .block-container {{
-            background-color: white;
-            border-radius: 24px;
-            padding: 3rem 2rem !important;
-            margin-top: 30px; margin-bottom: 30px;
-            max-width: 550px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.08);
-        }}
-
-        /* Rose Theme Inputs */
-        .stTextInput label, .stNumberInput label, .stDateInput label, .stSelectbox label, .stRadio label p {{
-            color: {ROSE_COLOR} !important;
-            font-weight: 600 !important;
-            font-size: 14px !important;
-        }}
-        div[data-baseweb="input"] > div, div[data-baseweb="select"] > div {{
-            border-radius: 20px !important;
-            border: 1.5px solid {BORDER_COLOR} !important;
-            background-color: white !important;
-            color: #333 !important;
-        }}
-        input {{ color: #333 !important; }}
-        
-        /* Tombol Standard (Biru) */
-        div.stButton > button {{
-            background: {BTN_BLUE} !important;
-            color: white !important; font-weight: 700; border: none;
-            border-radius: 30px; padding: 12px 0;
-            width: 100%;
-            box-shadow: 0 5px 15px rgba(75, 144, 255, 0.3);
-        }}
-        div.stButton > button:hover {{ transform: scale(1.02); }}
-        
-        .page-indicator {{ color: {ROSE_COLOR}; font-size: 12px; font-weight: 500; margin-top: 15px; }}
-        .form-title {{ text-align: center; font-weight: 800; font-size: 22px; color: #333; }}
-        .form-subtitle {{ text-align: center; font-size: 12px; color: #888; margin-bottom: 25px; }}
-        </style>
-        """, unsafe_allow_html=True)
+
+# FormPage1 input order (differs from the model order in FORM1_FIELDS).
+FORM1_INPUTS = ("heightcm", "weightkg", "as_edenroll_temp", "pulse", "o2s", "rr", "sbp")
 
 
 # ==========================================
 # PAGE: HOME
 # ==========================================
-if st.session_state.page == "Home":
+if state["page"] == "Home":
     load_css("home")
     st.markdown('<div class="home-card"><div class="home-title">Influenza Prediction</div></div>', unsafe_allow_html=True)
     st.button("START", on_click=lambda: go_to("FormPage1"))
@@ -184,19 +111,17 @@ if st.session_state.page == "Home":
 # ==========================================
 # PAGE: FORM 1
 # ==========================================
-elif st.session_state.page == "FormPage1":
+elif state["page"] == "FormPage1":
     load_css("form") 
     st.markdown('<div class="form-title">Please Fill In the Form</div>', unsafe_allow_html=True)
     st.markdown('<div class="form-subtitle">Please Fill In the Form according to your actual condition</div>', unsafe_allow_html=True)
     
     with st.form("form1_ui"):
-        height = st.text_input("Height", "")
-        weight = st.text_input("Weight", "")
-        temp = st.text_input("Temperature", "")
-        pulse = st.text_input("Pulse", "")
-        o2s = st.text_input("Oxygen Saturation", "")
-        rr = st.text_input("Respiratory Rate", "")
-        sbp = st.text_input("Systolic Blood Pressure", "")
+        raw1 = {}
+        for name in FORM1_INPUTS:
+            field = SCHEMA.by_name[name]
+            hint = field.unit if field.required else f"{field.unit}, optional"
+            raw1[name] = st.text_input(field.label, "", placeholder=hint)
         
         st.markdown("<br>", unsafe_allow_html=True)
         c1, c2 = st.columns([1, 2])
@@ -206,23 +131,19 @@ elif st.session_state.page == "FormPage1":
              submitted = st.form_submit_button("Next")
 
     if submitted:
-        st.session_state["form1"] = {
-            "heightcm": float(height) if height else 0,
-            "weightkg": float(weight) if weight else 0,
-            "as_edenroll_temp": float(temp) if temp else 0,
-            "pulse": float(pulse) if pulse else 0,
-            "rr": float(rr) if rr else 0,
-            "sbp": float(sbp) if sbp else 0,
-            "o2s": float(o2s) if o2s else 0,
-        }
-        st.session_state.page = "FormPage2"
-        st.rerun()
+        with metrics.stage("form_parse"):
+            form1, errors = SCHEMA.validate(raw1, FORM1_INPUTS)
+        for error in errors:
+            st.error(error.message)
+        if not errors:
+            save_state(form1=form1, page="FormPage2")
+            rerun()
 
 
 # ==========================================
 # PAGE: FORM 2
 # ==========================================
-elif st.session_state.page == "FormPage2":
+elif state["page"] == "FormPage2":
     load_css("form")
     st.markdown('<div class="form-title">Please Fill In the Form</div>', unsafe_allow_html=True)
     st.markdown('<div class="form-subtitle">Please Fill In the Form according to your actual condition</div>', unsafe_allow_html=True)
@@ -230,11 +151,11 @@ elif st.session_state.page == "FormPage2":
     with st.form("form2_ui"):
         date_val = st.date_input("Date", date.today())
         season = st.selectbox("Season (e.g. 1=Spring)", ["1", "2", "3", "4"]) 
-        st.markdown("<div style='margin-top:15px;'></div>", unsafe_allow_html=True)
+        st.markdown('<div class="form-gap"></div>', unsafe_allow_html=True)
         flu_vaccine = st.radio("Did you ever get flu vaccine?", ("No", "Yes"))
         travelled = st.radio("Did you go travelling in past 30 days?", ("No", "Yes"))
         expose_human = st.radio("Were you exposed to other sick people?", ("No", "Yes"))
-        st.markdown("<div style='margin-top:15px;'></div>", unsafe_allow_html=True)
+        st.markdown('<div class="form-gap"></div>', unsafe_allow_html=True)
         cough = st.radio("Did you have cough?", ("No", "Yes"))
         sore_throat = st.radio("Did you have sore throat?", ("No", "Yes"))
         cough_sputum = st.radio("Cough with sputum?", ("No", "Yes"))
@@ -242,7 +163,9 @@ elif st.session_state.page == "FormPage2":
         sinuspain = st.radio("Do you feel sinus pain?", ("No", "Yes"))
         medhistav = st.radio("Medical History Available?", ("No", "Yes"))
         pastmed = st.radio("Past chronic lung disease?", ("No", "Yes"))
-        symptom_days = st.number_input("How long have the symptoms been present? (days)", min_value=0, value=0)
+        symptom_days = st.number_input("How long have the symptoms been present? (days)",
+                                       min_value=SCHEMA.by_name["cursympt_days"].low,
+                                       max_value=SCHEMA.by_name["cursympt_days"].high, value=0)
         
         st.markdown("<br>", unsafe_allow_html=True)
         c1, c2 = st.columns([1, 2])
@@ -252,73 +175,64 @@ elif st.session_state.page == "FormPage2":
              submitted2 = st.form_submit_button("Next")
 
     if submitted2:
-        start = date(date_val.year, 1, 1)
-        week_of_season = ((date_val - start).days // 7) + 1
-        st.session_state["form2"] = {
-            "season": int(season) if season else 1,
-            "WOS": int(week_of_season),
-            "cursympt_days": int(symptom_days),
-            "fluvaccine": 1 if flu_vaccine == "Yes" else 0,
-            "exposehuman": 1 if expose_human == "Yes" else 0,
-            "travel": 1 if travelled == "Yes" else 0,
-            "cursympt_cough": 1 if cough == "Yes" else 0,
-            "cursympt_coughsputum": 1 if cough_sputum == "Yes" else 0,
-            "cursympt_sorethroat": 1 if sore_throat == "Yes" else 0,
-            "cursympt_rhinorrhea": 1 if rhinorrhea == "Yes" else 0,
-            "cursympt_sinuspain": 1 if sinuspain == "Yes" else 0,
-            "medhistav": 1 if medhistav == "Yes" else 0,
-            "pastmedchronlundis": 1 if pastmed == "Yes" else 0,
-        }
-        st.session_state.page = "Result"
-        st.rerun()
+        with metrics.stage("form_parse"):
+            form2 = {
+                "season": int(season) if season else 1,
+                "WOS": int(week_of_season(date_val)),
+                "cursympt_days": int(symptom_days),
+                "fluvaccine": 1 if flu_vaccine == "Yes" else 0,
+                "exposehuman": 1 if expose_human == "Yes" else 0,
+                "travel": 1 if travelled == "Yes" else 0,
+                "cursympt_cough": 1 if cough == "Yes" else 0,
+                "cursympt_coughsputum": 1 if cough_sputum == "Yes" else 0,
+                "cursympt_sorethroat": 1 if sore_throat == "Yes" else 0,
+                "cursympt_rhinorrhea": 1 if rhinorrhea == "Yes" else 0,
+                "cursympt_sinuspain": 1 if sinuspain == "Yes" else 0,
+                "medhistav": 1 if medhistav == "Yes" else 0,
+                "pastmedchronlundis": 1 if pastmed == "Yes" else 0,
+            }
+            form2, errors = SCHEMA.validate(form2, FORM2_FIELDS)
+        for error in errors:
+            st.error(error.message)
+        if not errors:
+            save_state(form2=form2, page="Result")
+            rerun()
 
 
 # ==========================================
 # PAGE: RESULT
 # ==========================================
-elif st.session_state.page == "Result":
+elif state["page"] == "Result":
     load_css("form")
-    st.markdown('<h3 style="text-align:center;font-weight:700; color:#333;">Prediction Result</h3>', unsafe_allow_html=True)
+    st.markdown('<h3 class="page-heading">Prediction Result</h3>', unsafe_allow_html=True)
 
-    form1 = st.session_state.get("form1", {})
-    form2 = st.session_state.get("form2", {})
+    form1 = state.get("form1", {})
+    form2 = state.get("form2", {})
 
     if model is None:
         st.error("Model not found.")
         st.button("Home", on_click=go_home)
     else:
-        payload = {}
-        payload.update(form1)
-        payload.update(form2)
+        with metrics.stage("form_parse"):
+            payload = build_payload(form1, form2)
         try:
-            X = pd.DataFrame([payload])
-            pred = model.predict(X)
-            pred_label = int(pred[0])
-            st.session_state["last_pred_label"] = pred_label
+            pred_label = service.predict(payload).label
+            save_state(last_pred_label=pred_label)
             infected = pred_label == 1
             
             if infected:
-                st.markdown("""
-                <div style="width:180px; height:180px; border-radius:50%; border:8px solid #FF4B4B; 
-                color:#FF4B4B; display:flex; align-items:center; justify-content:center; 
-                margin:20px auto; font-size:24px; font-weight:bold;">Infected</div>
-                """, unsafe_allow_html=True)
+                st.markdown('<div class="result-badge result-infected">Infected</div>', unsafe_allow_html=True)
             else:
-                st.markdown("""
-                <div style="width:180px; height:180px; border-radius:50%; border:8px solid #00FF9D; 
-                color:#00C853; display:flex; align-items:center; justify-content:center; 
-                margin:20px auto; font-size:24px; font-weight:bold;">Not Infected</div>
-                """, unsafe_allow_html=True)
+                st.markdown('<div class="result-badge result-clear">Not Infected</div>', unsafe_allow_html=True)
 
             col1, col2 = st.columns(2)
             with col1:
-                st.markdown(f"""<style>div.stButton button {{ background: {BTN_GREEN} !important; }}</style>""", unsafe_allow_html=True)
                 st.button("Detail", key="btn_detail", on_click=lambda: go_to("DetailPage"))
             with col2:
-                st.markdown(f"""<style>div.stButton button {{ background: {BTN_BLUE} !important; }}</style>""", unsafe_allow_html=True)
                 st.button("Retry", key="btn_retry", on_click=go_home)
 
         except Exception as e:
+            metrics.MODEL_ERRORS.inc("ui")
             st.error(f"Prediction Error: {e}")
             st.button("Home", on_click=go_home)
 
@@ -326,55 +240,10 @@ elif st.session_state.page == "Result":
 # ==========================================
 # PAGE: DETAIL
 # ==========================================
-elif st.session_state.page == "DetailPage":
+elif state["page"] == "DetailPage":
     load_css("form") # Base container style
 
-    # --- CSS KHUSUS DETAIL PAGE ---
-    st.markdown("""
-    <style>
-    /* Styling Disclaimer Box */
-    .disclaimer-box {
-        background-color: #FFF8E1;
-        border: 1px solid #FFE0B2;
-        color: #E65100;
-        padding: 15px;
-        border-radius: 12px;
-        font-size: 13px;
-        margin-bottom: 25px;
-        line-height: 1.5;
-    }
-    
-    /* Styling Recommendation Card */
-    .rec-card {
-        background-color: #FFFFFF;
-        border: 1px solid #F0F0F0;
-        border-left-width: 6px; /* Border warna di kiri */
-        border-radius: 12px;
-        padding: 16px;
-        margin-bottom: 15px;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.03);
-        transition: transform 0.2s;
-    }
-    .rec-card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 5px 12px rgba(0,0,0,0.08);
-    }
-    
-    /* Variant Colors */
-    .rec-danger { border-left-color: #FF4B4B; }
-    .rec-warning { border-left-color: #FFB020; }
-    .rec-info { border-left-color: #4B90FF; }
-    
-    /* Typography dalam Card */
-    .rec-header { display: flex; align-items: center; gap: 10px; margin-bottom: 8px; }
-    .rec-icon { font-size: 18px; }
-    .rec-title { font-weight: 700; font-size: 15px; color: #333; margin: 0; }
-    .rec-body { font-size: 13px; color: #555; line-height: 1.5; margin-bottom: 8px; }
-    .rec-source { font-size: 11px; color: #999; font-style: italic; text-align: right; margin-top: 5px; }
-    </style>
-    """, unsafe_allow_html=True)
-
-    st.markdown('<h3 style="text-align:center; font-weight:700; color:#333; margin-bottom:20px;">Medical Advice</h3>', unsafe_allow_html=True)
+    st.markdown('<h3 class="page-heading advice">Medical Advice</h3>', unsafe_allow_html=True)
     
     # Disclaimer Box
     st.markdown("""
@@ -385,15 +254,14 @@ elif st.session_state.page == "DetailPage":
     </div>
     """, unsafe_allow_html=True)
     
-    form1 = st.session_state.get("form1", {})
-    form2 = st.session_state.get("form2", {})
-    pred_label = st.session_state.get("last_pred_label", 0)
+    form1 = state.get("form1", {})
+    form2 = state.get("form2", {})
+    pred_label = state.get("last_pred_label", 0)
     
-    all_data = {}
-    all_data.update(form1)
-    all_data.update(form2)
+    all_data = build_payload(form1, form2)
     
-    recs = get_recommendations(all_data, pred_label)
+    cached = service.lookup(all_data) if service else None
+    recs = cached.recommendations if cached is not None else get_recommendations(all_data, pred_label)
     
     # Render Cards
     if not recs:
@@ -413,13 +281,28 @@ elif st.session_state.page == "DetailPage":
             <div class="rec-source">Source: {src}</div>
         </div>
         """, unsafe_allow_html=True)
-        
+
+    # Which answers pushed the model towards (or away from) "Infected"
+    explanation = service.explain(all_data) if service else None
+    if explanation is not None:
+        top = top_contributions(explanation, k=5)
+        scale = max((abs(c) for _, _, c in top), default=1.0) or 1.0
+        rows = "".join(
+            f'<div class="contrib-row contrib-{"up" if c > 0 else "down"}">'
+            f'<span class="contrib-name">{SCHEMA.by_name[f].label if f in SCHEMA.by_name else f}</span>'
+            f'<span class="contrib-bar" style="width:{abs(c) / scale * 40:.0f}%"></span>'
+            f'<span class="contrib-value">{c:+.2f}</span></div>'
+            for f, _, c in top)
+        st.markdown(f'<div class="contrib-card"><div class="rec-title">What influenced this prediction</div>'
+                    f'{rows}<div class="rec-source">Log-odds contribution; + towards Infected</div></div>',
+                    unsafe_allow_html=True)
+
     # Navigation Buttons
     st.markdown("<br>", unsafe_allow_html=True)
     col1, col2 = st.columns(2)
     with col1:
-        st.markdown(f"""<style>div.stButton button {{ background: {BTN_BLUE} !important; }}</style>""", unsafe_allow_html=True)
         st.button("Back", key="btn_back", on_click=lambda: go_to("Result"))
     with col2:
-        st.markdown(f"""<style>div.stButton button {{ background: {BTN_BLUE} !important; }}</style>""", unsafe_allow_html=True)
-        st.button("Home", key="btn_home", on_click=go_home)
\ No newline at end of file
+        st.button("Home", key="btn_home", on_click=go_home)
+
+PROFILER.end()
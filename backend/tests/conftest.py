@@ -0,0 +1,5 @@
+"""Backend modules import each other by plain name (``from schema import SCHEMA``)."""
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
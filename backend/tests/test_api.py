@@ -0,0 +1,106 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+import request_log
+from api import make_server
+from service import PredictionService
+from test_schema import VALID
+
+
+@pytest.fixture(scope="module")
+def server():
+    request_log.set_default_log(False)
+    service = PredictionService.from_registry(backend="compiled")
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def post(server, path, body=None, raw=None, headers=None):
+    raw = raw if raw is not None else json.dumps(body).encode()
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    conn.request("POST", path, body=raw, headers=headers or {"Content-Length": str(len(raw))})
+    response = conn.getresponse()
+    data = json.loads(response.read())
+    conn.close()
+    return response.status, data
+
+
+def test_predict(server):
+    status, data = post(server, "/predict", VALID)
+    assert status == 200
+    assert data["prediction_label"] in (0, 1)
+    assert 0 <= data["probability"] <= 1
+
+
+def test_predict_from_forms(server):
+    form1 = dict(list(VALID.items())[:10])
+    form2 = dict(list(VALID.items())[10:])
+    assert post(server, "/predict", {"form1": form1, "form2": form2}) == post(server, "/predict", VALID)
+
+
+@pytest.mark.parametrize("body", [
+    {"form1": {}, "form2": 5},
+    {"form1": [1], "form2": {}},
+    {"form1": "x"},
+])
+def test_forms_must_be_objects(server, body):
+    status, data = post(server, "/predict", body)
+    assert status == 400
+    assert data["invalid"]
+
+
+@pytest.mark.parametrize("body", [[1, 2], "text", None])
+def test_payload_must_be_an_object(server, body):
+    assert post(server, "/predict", body)[0] == 400
+
+
+def test_missing_and_invalid_fields(server):
+    body = dict(VALID, pulse="fast")
+    del body["rr"]
+    status, data = post(server, "/predict", body)
+    assert status == 400
+    assert data["missing"] == ["rr"]
+    assert data["invalid"] == ["pulse"]
+
+
+@pytest.mark.parametrize("label", [1.0, 0.0, True, False, "1", 2, -1])
+def test_recommendations_reject_labels(server, label):
+    status, data = post(server, "/recommendations", dict(VALID, prediction_label=label))
+    assert status == 400
+    assert data["invalid"] == ["prediction_label"]
+
+
+@pytest.mark.parametrize("label", [0, 1])
+def test_recommendations_accept_labels(server, label):
+    status, data = post(server, "/recommendations", dict(VALID, prediction_label=label))
+    assert status == 200
+    assert data["prediction_label"] == label
+
+
+def test_invalid_json(server):
+    assert post(server, "/predict", raw=b"{not json")[0] == 400
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "1.5"])
+def test_bad_content_length(server, length):
+    status, data = post(server, "/predict", raw=b"{}", headers={"Content-Length": length})
+    assert status == 400
+    assert "Content-Length" in data["error"]
+
+
+def test_body_limits(server):
+    raw = b" " * (64 * 1024 + 1)
+    assert post(server, "/predict", raw=raw)[0] == 413
+    assert post(server, "/contributions", raw=b"[" + raw + b"]")[0] != 413
+
+
+def test_unknown_route(server):
+    assert post(server, "/nope", {})[0] == 404
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def echo_rows(model, payloads):
+    return [(int(p["x"] > 0), float(p["x"])) for p in payloads]
+
+
+def slow_rows(model, payloads):
+    time.sleep(0.02)
+    return echo_rows(model, payloads)
+
+
+def test_rows_come_back_to_their_callers():
+    batcher = MicroBatcher(None, max_batch_size=8, max_wait_ms=5, predict_fn=echo_rows)
+    try:
+        futures = [batcher.submit({"x": i - 10}) for i in range(20)]
+        assert [f.result(5) for f in futures] == [(int(i > 10), float(i - 10)) for i in range(20)]
+        assert batcher.stats.snapshot()["requests"] == 20
+    finally:
+        batcher.close()
+
+
+def test_bad_payload_only_fails_itself():
+    batcher = MicroBatcher(None, max_wait_ms=20, predict_fn=echo_rows)
+    try:
+        good, bad = batcher.submit({"x": 1}), batcher.submit({})
+        assert good.result(5) == (1, 1.0)
+        with pytest.raises(KeyError):
+            bad.result(5)
+    finally:
+        batcher.close()
+
+
+def test_close_scores_what_is_queued():
+    batcher = MicroBatcher(None, max_batch_size=4, max_wait_ms=1, predict_fn=slow_rows)
+    futures = [batcher.submit({"x": i}) for i in range(12)]
+    batcher.close()
+    assert [f.result(0) for f in futures] == [(int(i > 0), float(i)) for i in range(12)]
+
+
+def test_submit_after_close_raises():
+    batcher = MicroBatcher(None, predict_fn=echo_rows)
+    batcher.close()
+    batcher.close()  # idempotent
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.submit({"x": 1})
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_close_racing_submits_never_leaves_a_future_pending(workers):
+    for attempt in range(20):
+        batcher = MicroBatcher(None, max_wait_ms=1, predict_fn=echo_rows, workers=workers)
+        futures, go = [], threading.Event()
+
+        def submit_many():
+            go.wait()
+            for i in range(200):
+                try:
+                    futures.append(batcher.submit({"x": i}))
+                except RuntimeError:
+                    return
+
+        threads = [threading.Thread(target=submit_many) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        go.set()
+        time.sleep(attempt * 0.0002)
+        batcher.close()
+        for thread in threads:
+            thread.join()
+        for future in futures:
+            future.exception(timeout=5)  # resolved one way or the other, never hangs
+
+
+def test_leftover_futures_fail_when_the_scheduler_stops():
+    batcher = MicroBatcher(None, predict_fn=echo_rows)
+    batcher.close()
+    # Simulate an item that slipped in behind the stop marker.
+    from concurrent.futures import Future
+    future = Future()
+    batcher._queue.put(({"x": 1}, future, time.perf_counter()))
+    batcher._run()  # sees _STOP first, drains
+    with pytest.raises(RuntimeError, match="closed before"):
+        future.result(0)
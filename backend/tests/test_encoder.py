@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from encoder import FeatureEncoder, PayloadError
+from prediction import FEATURES
+
+PAYLOAD = {name: float(i) for i, name in enumerate(FEATURES)}
+
+
+def test_encoder_orders_columns_and_maps_none_to_nan():
+    encoder = FeatureEncoder(FEATURES)
+    row = encoder.encode(dict(PAYLOAD, heightcm=None, pulse=90))
+    assert row.shape == (1, len(FEATURES)) and row.dtype == np.float32
+    assert np.isnan(row[0, FEATURES.index("heightcm")])
+    assert row[0, FEATURES.index("pulse")] == 90
+    assert encoder.decode(encoder.encode(PAYLOAD)) == PAYLOAD
+
+
+def test_encode_batch_reuses_out():
+    encoder = FeatureEncoder(FEATURES)
+    out = encoder.empty(2)
+    X = encoder.encode_batch(iter([PAYLOAD, PAYLOAD]), out)
+    assert X is out
+    assert (X[0] == np.arange(len(FEATURES))).all()
+    with pytest.raises(ValueError):
+        encoder.encode_batch([PAYLOAD], out)
+
+
+def test_encoder_errors():
+    encoder = FeatureEncoder(FEATURES)
+    with pytest.raises(PayloadError) as info:
+        encoder.encode({k: v for k, v in PAYLOAD.items() if k != "rr"} | {"bogus": 1})
+    assert info.value.missing == ["rr"] and info.value.unexpected == ["bogus"]
+    with pytest.raises(PayloadError) as info:
+        encoder.encode(dict(PAYLOAD, sbp="high"))
+    assert info.value.invalid == ["sbp"]
+    assert info.value.to_dict()["invalid"] == ["sbp"]
+    with pytest.raises(ValueError):
+        FeatureEncoder(["a", "a"])
+
+
+def test_from_model_prefers_the_model_names():
+    class Model:
+        feature_names = ["b", "a"]
+
+    assert FeatureEncoder.from_model(Model(), default=FEATURES).feature_names == ("b", "a")
+    assert FeatureEncoder.from_model(object(), default=FEATURES).feature_names == tuple(FEATURES)
+    with pytest.raises(ValueError):
+        FeatureEncoder.from_model(object())
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+import metrics
+import request_log
+from model_manager import ModelManager
+from prediction import Prediction, parse_payload
+from readiness import Startup
+from registry import ModelRegistry
+from service import PredictionService
+from test_schema import VALID
+
+PAYLOAD = parse_payload(VALID)
+
+
+@pytest.fixture(scope="module")
+def loaded():
+    request_log.set_default_log(False)
+    return ModelRegistry().load("v1", backend="compiled")
+
+
+@pytest.fixture
+def build(loaded):
+    model, manifest = loaded
+    services = []
+
+    def build(version, **manifest_overrides):
+        service = PredictionService.for_model(model, dict(manifest, version=version, **manifest_overrides))
+        services.append(service)
+        return service
+
+    yield build
+    for service in services:
+        service.close()
+
+
+def manager_for(service, load):
+    return ModelManager(service, load, interval=0, drain_seconds=0, max_p99_ms=1e6, smoke_rows=8)
+
+
+def test_building_a_service_does_not_take_over_metrics(build):
+    startup = Startup(lambda: build("v-live"), rows=0, manage=None)
+    startup.service()
+    build("v-candidate")
+    rendered = metrics.REGISTRY.render()
+    assert 'model_version="v-live"' in rendered
+    assert "v-candidate" not in rendered
+
+
+def test_score_matches_predict(build):
+    service = build("v1")
+    assert service.score(PAYLOAD) == service.predict(PAYLOAD)
+
+
+def test_reload_swaps_and_retires_the_old_service(build):
+    old = build("v-old")
+    manager = manager_for(old, lambda version: build(version))
+    assert manager.reload("v-new")
+    assert manager.service.version == "v-new"
+    assert manager.swaps == 1 and manager.last_error is None
+    assert manager.last_smoke_test["parity_max_abs_diff"] <= manager.tolerance
+    assert 'model_version="v-new"' in metrics.REGISTRY.render()
+    deadline = time.monotonic() + 5
+    while not old.batcher._closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        old.batcher.submit(PAYLOAD)
+
+
+def test_failed_load_keeps_the_current_service(build):
+    current = build("v-current")
+
+    def load(version):
+        raise FileNotFoundError(version)
+
+    manager = manager_for(current, load)
+    assert not manager.reload("v-missing")
+    assert manager.service is current
+    assert manager.rejected == 1
+    assert manager.last_error["version"] == "v-missing"
+    assert "load failed" in manager.last_error["error"]
+
+
+def test_smoke_test_rolls_back_a_candidate_that_disagrees(build):
+    current = build("v-current")
+    candidate = build("v-bad")
+    candidate.score = lambda payload: Prediction(0, 0.5, [])
+    manager = manager_for(current, lambda version: candidate)
+    metrics.REGISTRY.set_collector("service", current.metrics_families)
+    assert not manager.reload("v-bad")
+    assert manager.service is current
+    assert "differs from the model" in manager.last_error["error"]
+    assert 'model_version="v-current"' in metrics.REGISTRY.render()
+    with pytest.raises(RuntimeError):
+        candidate.batcher.submit(PAYLOAD)
+
+
+def test_smoke_test_rejects_a_different_feature_order(build):
+    current = build("v-current")
+    names = list(reversed(current.model.feature_names))
+    manager = manager_for(current, lambda version: build(version, feature_names=names))
+    assert not manager.reload("v-reordered")
+    assert manager.service is current
+    assert "do not match the schema" in manager.last_error["error"]
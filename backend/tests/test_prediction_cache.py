@@ -0,0 +1,81 @@
+import math
+
+from prediction import FEATURES
+from prediction_cache import PredictionCache, canonical_payload, payload_key
+
+PAYLOAD = {name: float(i) for i, name in enumerate(FEATURES)}
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_equal_values_share_a_key():
+    variants = [dict(PAYLOAD, pulse=90), dict(PAYLOAD, pulse=90.0), dict(PAYLOAD, pulse="90")]
+    assert len({payload_key(p, "m1") for p in variants}) == 1
+    assert payload_key(dict(PAYLOAD, rr=None), "m1") == payload_key(dict(PAYLOAD, rr=math.nan), "m1")
+    assert canonical_payload(dict(PAYLOAD, sbp=-0.0))[FEATURES.index("sbp")] == 0.0
+    assert math.copysign(1, canonical_payload(dict(PAYLOAD, sbp=-0.0))[FEATURES.index("sbp")]) == 1
+
+
+def test_model_hash_is_part_of_the_key():
+    assert payload_key(PAYLOAD, "m1") != payload_key(PAYLOAD, "m2")
+
+
+def test_get_or_compute_computes_once_per_payload_and_model():
+    cache = PredictionCache(maxsize=8)
+    calls = []
+
+    def compute(payload):
+        calls.append(payload)
+        return len(calls)
+
+    assert cache.get_or_compute(PAYLOAD, "m1", compute) == 1
+    assert cache.get_or_compute(dict(PAYLOAD), "m1", compute) == 1
+    assert cache.get_or_compute(PAYLOAD, "m2", compute) == 2
+    assert cache.lookup(PAYLOAD, "m2") == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 2)
+
+
+def test_lru_eviction():
+    cache = PredictionCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # b is now the oldest
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    clock = Clock()
+    cache = PredictionCache(maxsize=2, ttl=10, clock=clock)
+    cache.put("a", 1)
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1 and len(cache) == 0
+
+
+def test_disabled_cache_always_computes():
+    cache = PredictionCache(maxsize=0)
+    assert not cache.enabled
+    calls = []
+    for _ in range(2):
+        cache.get_or_compute(PAYLOAD, "m1", calls.append)
+    assert len(calls) == 2
+    assert cache.lookup(PAYLOAD, "m1") is None
+    assert len(cache) == 0
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("INFLUENZA_PREDICTION_CACHE_SIZE", "3")
+    monkeypatch.setenv("INFLUENZA_PREDICTION_CACHE_TTL", "5")
+    cache = PredictionCache.from_env(ttl=7)
+    assert (cache.maxsize, cache.ttl) == (3, 7)
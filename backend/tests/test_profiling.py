@@ -0,0 +1,36 @@
+from profiling import Profiler
+
+
+def test_rerun_profile_is_written_by_end(tmp_path):
+    profiler = Profiler(rate=1, directory=tmp_path)
+    profiler.begin("FormPage1")
+    assert profiler.active()
+    path = profiler.end()
+    assert not profiler.active()
+    assert path.exists() and path.with_suffix(".collapsed").exists()
+    assert profiler.end() is None
+
+
+def test_unfinished_rerun_is_discarded_by_the_next_begin(tmp_path):
+    profiler = Profiler(rate=1, directory=tmp_path)
+    profiler.begin("Home")
+    profiler.begin("Result")
+    assert "Result" in profiler.end().name
+    assert profiler.written == 1
+
+
+def test_unsampled_rerun_is_not_active(tmp_path):
+    profiler = Profiler(rate=0, directory=tmp_path)
+    assert profiler.begin("Home") is None
+    assert not profiler.active()
+    assert profiler.end() is None
+    assert profiler.begin("Home", force=True) is not None
+    assert profiler.end() is not None
+
+
+def test_profile_block_is_active_and_written(tmp_path):
+    profiler = Profiler(rate=1, directory=tmp_path)
+    with profiler.profile("api_predict"):
+        assert profiler.active()
+    assert not profiler.active()
+    assert profiler.written == 1
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from recommendations import RULE_ENGINE
+
+
+def original_recommendations(data, prediction_label):
+    """The hand-written rules from the first version of the app, verbatim."""
+    recs_keys = set()
+    recommendations = []
+
+    # --- KATEGORI 1: RED FLAGS ---
+    if float(data.get("o2s", 100)) < 95:
+        recs_keys.add("O2S_LOW")
+        recommendations.append(("Immediate Medical Attention", "Saturasi oksigen < 95%. Tanda hipoksemia serius.", "WHO", "danger"))
+    if float(data.get("rr", 20)) > 24:
+        recs_keys.add("RR_HIGH")
+        recommendations.append(("Immediate Medical Attention", "Laju napas > 24x/menit. Distres pernapasan.", "Merck Manual", "danger"))
+    if float(data.get("as_edenroll_temp", 36)) > 40:
+        recs_keys.add("TEMP_EXTREME")
+        recommendations.append(("Immediate Medical Attention", "Suhu > 40°C. Hiperpireksia.", "CDC", "danger"))
+    if float(data.get("sbp", 120)) < 90:
+        recs_keys.add("SBP_LOW")
+        recommendations.append(("Immediate Medical Attention", "Tekanan darah sistolik < 90. Tanda syok.", "WHO", "danger"))
+
+    if any(r[3] == 'danger' for r in recommendations):
+        return recommendations
+
+    # --- KATEGORI 2: RISIKO TINGGI ---
+    temp = float(data.get("as_edenroll_temp", 36))
+    if temp > 38.0:
+        msg = "Demam > 38°C menandakan infeksi. Konsultasi dokter disarankan."
+        recommendations.append(("Consult a Doctor", msg, "Panduan Medis Umum", "warning"))
+    if data.get("pastmedchronlundis", 0) == 1:
+        recommendations.append(("High Risk Factor", "Riwayat penyakit paru kronis meningkatkan risiko komplikasi.", "CDC", "warning"))
+
+    # --- KATEGORI 3 & 4: EDUKASI ---
+    if prediction_label == 1 and not recommendations:
+        recommendations.append(("Self-Care", "Prediksi positif gejala ringan. Istirahat & hidrasi.", "CDC", "info"))
+    elif prediction_label == 0 and not recommendations:
+        recommendations.append(("General Advice", "Prediksi negatif. Kemungkinan common cold. Istirahat.", "CDC", "info"))
+
+    if data.get("fluvaccine", 1) == 0:
+        recommendations.append(("Prevention", "Pertimbangkan vaksin flu tahunan.", "WHO", "info"))
+
+    return recommendations
+
+
+# Values on both sides of, and exactly at, every threshold.
+CHOICES = {
+    "o2s": (90, 94.9, 95, 99),
+    "rr": (12, 24, 24.1, 30),
+    "as_edenroll_temp": (36.5, 38.0, 38.1, 40.0, 40.5),
+    "sbp": (80, 89.9, 90, 130),
+    "pastmedchronlundis": (0, 1),
+    "fluvaccine": (0, 1),
+}
+
+
+def random_records(n, seed=0, drop_rate=0.0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for _ in range(n):
+        record = {field: values[rng.integers(len(values))] for field, values in CHOICES.items()}
+        records.append({k: v for k, v in record.items() if rng.random() >= drop_rate})
+    return records, rng.integers(0, 2, n).tolist()
+
+
+@pytest.mark.parametrize("drop_rate", [0.0, 0.3])
+def test_recommend_matches_original_order(drop_rate):
+    records, labels = random_records(2_000, seed=1, drop_rate=drop_rate)
+    for record, label in zip(records, labels):
+        assert list(RULE_ENGINE.recommend(record, label)) == original_recommendations(record, label), record
+
+
+def test_recommend_batch_matches_original():
+    records, labels = random_records(2_000, seed=2)
+    columns = {field: np.array([r[field] for r in records], dtype=np.float32) for field in CHOICES}
+    batch = RULE_ENGINE.recommend_batch(columns, np.array(labels))
+    assert batch == [original_recommendations(r, label) for r, label in zip(records, labels)]
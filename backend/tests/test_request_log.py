@@ -0,0 +1,60 @@
+import gzip
+import json
+import time
+
+from prediction import Prediction
+from readiness import synthetic_payloads
+from request_log import RequestLog
+from schema import SCHEMA
+
+RESULT = Prediction(1, 0.75, ())
+
+
+def read_all(directory):
+    lines = []
+    for path in sorted(directory.glob("requests-*.jsonl.gz")):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            lines += f.read().splitlines()
+    return lines + (directory / "requests.jsonl").read_text().splitlines()
+
+
+def test_records_are_written_in_schema_order(tmp_path):
+    log = RequestLog(tmp_path / "requests.jsonl", flush_interval=0.01)
+    payloads = synthetic_payloads(5)
+    for payload in payloads:
+        log.record(payload, "v1", RESULT, 0.004)
+    log.close()
+    records = [json.loads(line) for line in read_all(tmp_path)]
+    assert [r["payload"] for r in records] == payloads
+    assert all(tuple(r["payload"]) == SCHEMA.names for r in records)
+    assert records[0]["model_version"] == "v1" and records[0]["latency_ms"] == 4.0
+    assert records[0]["label"] == 1 and records[0]["probability"] == 0.75
+
+
+def test_rotation_gzips_and_prunes(tmp_path):
+    log = RequestLog(tmp_path / "requests.jsonl", max_bytes=4_000, keep=2, flush_interval=0.01, max_batch=5)
+    payloads = synthetic_payloads(300)
+    for i, payload in enumerate(payloads):
+        log.record(payload, "v1", RESULT, 0.001)
+        if i % 5 == 4:
+            while log.stats()["queued"]:
+                time.sleep(0.001)
+    log.close()
+    stats = log.stats()
+    assert stats["written"] == 300 and stats["dropped"] == 0
+    assert stats["rotations"] > 2
+    segments = sorted(tmp_path.glob("requests-*.jsonl.gz"))
+    assert len(segments) == 2
+    assert not list(tmp_path.glob("requests-*.jsonl"))  # every segment compressed
+    # The newest segments plus the live file end with the last records.
+    tail = [json.loads(line)["payload"] for line in read_all(tmp_path)]
+    assert tail == payloads[-len(tail):]
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    log = RequestLog(tmp_path / "requests.jsonl", max_queue=2)
+    log._start = lambda: None  # no writer: the queue only fills
+    log._thread = object()
+    for payload in synthetic_payloads(10):
+        log.record(payload, "v1", RESULT, 0.001)
+    assert log.dropped == 8 and log.stats()["queued"] == 2
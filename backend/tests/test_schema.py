@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from encoder import PayloadError
+from prediction import FEATURES, parse_payload
+from readiness import synthetic_payloads
+from schema import SCHEMA, parse_number
+
+VALID = {
+    "heightcm": 170, "weightkg": 60, "as_edenroll_temp": "38,5", "pulse": 90, "rr": 20, "sbp": 120,
+    "o2s": 98, "season": 1, "WOS": 3, "cursympt_days": 2, "fluvaccine": 0, "exposehuman": 1,
+    "travel": 0, "cursympt_cough": 1, "cursympt_coughsputum": 0, "cursympt_sorethroat": 1,
+    "cursympt_rhinorrhea": 0, "cursympt_sinuspain": 0, "medhistav": 1, "pastmedchronlundis": 0,
+}
+
+
+def codes(record, **options):
+    return {(e.field, e.code) for e in SCHEMA.validate(record, **options)[1]}
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None), ("", None), ("  ", None), ("37,5", 37.5), ("37.5", 37.5), (3, 3.0), (True, 1.0),
+])
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "abc", [1]])
+def test_parse_number_rejects(value):
+    with pytest.raises(ValueError):
+        parse_number(value)
+
+
+def test_valid_record_parses_in_model_order():
+    payload, errors = SCHEMA.validate(VALID)
+    assert errors == []
+    assert tuple(payload) == SCHEMA.names == FEATURES
+    assert payload["as_edenroll_temp"] == 38.5
+    assert isinstance(payload["season"], int)
+
+
+def test_optional_fields_may_be_blank():
+    payload, errors = SCHEMA.validate(dict(VALID, heightcm="", weightkg=None))
+    assert errors == [] and payload["heightcm"] is None and payload["weightkg"] is None
+
+
+def test_error_codes():
+    record = dict(VALID, pulse="", o2s="fast", season=1.5, WOS=60, extra=1)
+    assert codes(record) == {("pulse", "required"), ("o2s", "not_a_number"), ("season", "not_integer"),
+                             ("WOS", "out_of_range"), ("extra", "unexpected")}
+    assert codes(record, allow_unexpected=True) == codes(record) - {("extra", "unexpected")}
+
+
+def test_names_limit_the_check():
+    assert codes({"pulse": 400}, names=("pulse",)) == {("pulse", "out_of_range")}
+
+
+def test_parse_payload_raises_structured_errors():
+    with pytest.raises(PayloadError) as info:
+        parse_payload({"form1": dict(VALID, pulse=""), "form2": {}})
+    error = info.value.to_dict()
+    assert "pulse" in error["missing"]
+    assert {"field": "pulse", "code": "required", "message": "Pulse is required."} in error["errors"]
+
+
+def test_parse_payload_rejects_non_objects():
+    with pytest.raises(PayloadError):
+        parse_payload([VALID])
+
+
+def test_validate_matrix_agrees_with_validate():
+    payloads = synthetic_payloads(200, seed=3)
+    X = np.array([[np.nan if p[f] is None else p[f] for f in SCHEMA.names] for p in payloads])
+    X[0, 3], X[1, 7], X[2, 4] = 999, 2.5, np.nan  # pulse range, season integer, rr required
+    result = SCHEMA.validate_matrix(X)
+    assert np.flatnonzero(result.invalid_rows).tolist() == [0, 1, 2]
+    for i in range(3):
+        record = {f: (None if np.isnan(v) else v) for f, v in zip(SCHEMA.names, X[i])}
+        assert {(e.field, e.code) for e in result.row_errors(i)} == codes(record)
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from score_cohort import score_file
+from test_schema import VALID
+
+
+def write_cohort(path, notes):
+    pd.DataFrame([dict(VALID, note=note) for note in notes]).to_csv(path, index=False)
+
+
+def test_parquet_casts_later_chunks_to_the_first_schema(tmp_path):
+    write_cohort(tmp_path / "in.csv", ["a", "b", 3, 4])
+    rows, _ = score_file(tmp_path / "in.csv", tmp_path / "out.parquet", chunk_size=2, workers=0,
+                         backend="compiled")
+    table = pq.read_table(tmp_path / "out.parquet")
+    assert rows == table.num_rows == 4
+    assert table.column("note").to_pylist() == ["a", "b", "3", "4"]
+
+
+def test_parquet_names_the_column_that_does_not_convert(tmp_path):
+    write_cohort(tmp_path / "in.csv", [1, 2, "x", "y"])
+    with pytest.raises(ValueError, match="'note'"):
+        score_file(tmp_path / "in.csv", tmp_path / "out.parquet", chunk_size=2, workers=0,
+                   backend="compiled")
+
+
+def test_csv_output_matches_parquet(tmp_path):
+    write_cohort(tmp_path / "in.csv", [1, 2, 3])
+    score_file(tmp_path / "in.csv", tmp_path / "out.csv", chunk_size=2, workers=0, backend="compiled")
+    score_file(tmp_path / "in.csv", tmp_path / "out.parquet", chunk_size=2, workers=0,
+               backend="compiled")
+    csv = pd.read_csv(tmp_path / "out.csv")
+    parquet = pq.read_table(tmp_path / "out.parquet").to_pandas()
+    assert csv["prediction_label"].tolist() == parquet["prediction_label"].tolist()
+    assert csv["probability"].tolist() == pytest.approx(parquet["probability"].tolist())
@@ -0,0 +1,171 @@
+import time
+
+import pytest
+
+from session_store import (MemorySessionStore, RedisSessionStore, SessionReaper, SQLiteSessionStore,
+                           encode_state, open_store)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """The redis-py methods the store uses, with key TTLs on ``clock``."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] <= self.clock():
+            del self.data[key]
+            entry = None
+        return entry
+
+    def get(self, key):
+        entry = self._live(key)
+        return entry[0].encode() if entry else None
+
+    def set(self, key, value, ex):
+        self.data[key] = (value, self.clock() + ex)
+
+    def expire(self, key, seconds):
+        if self._live(key):
+            self.data[key] = (self.data[key][0], self.clock() + seconds)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def exists(self, key):
+        return int(self._live(key) is not None)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    clock = Clock()
+
+    def make(**options):
+        options.setdefault("clock", clock)
+        if request.param == "memory":
+            store = MemorySessionStore(**options)
+        else:
+            store = SQLiteSessionStore(tmp_path / "sessions.db", **options)
+        store.test_clock = options["clock"]
+        return store
+
+    return make
+
+
+STATE = {"page": "FormPage2", "form1": {"heightcm": "170", "pulse": "90"}}
+
+
+def test_round_trip_and_delete(make_store):
+    store = make_store()
+    store.put("a", STATE)
+    assert store.get("a") == STATE
+    assert store.get("missing") is None
+    store.delete("a")
+    assert store.get("a") is None
+
+
+def test_session_count_bound_drops_least_recently_used(make_store):
+    store = make_store(max_sessions=2)
+    for session_id in "abc":
+        store.test_clock.now += 1
+        store.put(session_id, STATE)
+    assert store.get("a") is None
+    assert store.stats()["sessions"] == 2
+    assert store.stats()["evictions"] == 1
+
+    store.test_clock.now += 1
+    store.get("b")  # b is now newer than c
+    store.test_clock.now += 1
+    store.put("d", STATE)
+    assert store.get("c") is None
+    assert store.get("b") == STATE
+
+
+def test_byte_bound_and_accounting(make_store):
+    size = len(encode_state(STATE))
+    store = make_store(max_bytes=3 * size)
+    for i in range(5):
+        store.test_clock.now += 1
+        store.put(f"s{i}", STATE)
+    stats = store.stats()
+    assert stats["sessions"] == 3
+    assert stats["bytes"] == 3 * size
+    assert stats["largest_bytes"] == size
+    assert stats["evictions"] == 2
+
+    store.put("s4", {"page": "Home"})  # replacing a session replaces its bytes
+    assert store.stats()["bytes"] == 2 * size + len(encode_state({"page": "Home"}))
+    store.delete("s3")
+    assert store.stats()["bytes"] == size + len(encode_state({"page": "Home"}))
+
+
+def test_one_oversized_session_is_kept(make_store):
+    store = make_store(max_bytes=10)
+    store.put("big", STATE)
+    assert store.get("big") == STATE
+
+
+def test_idle_sessions_expire_on_get_and_reap(make_store):
+    store = make_store(idle_timeout=60)
+    store.put("old", STATE)
+    store.put("older", STATE)
+    store.test_clock.now += 30
+    store.put("new", STATE)
+    store.test_clock.now += 31
+    assert store.get("old") is None
+    assert store.reap() == 1  # "older"; "old" already expired on get
+    assert store.get("new") == STATE
+    assert store.stats()["expirations"] == 2
+    assert store.stats()["sessions"] == 1
+
+
+def test_redis_store_uses_key_ttls():
+    clock = Clock()
+    store = RedisSessionStore(FakeRedis(clock), idle_timeout=60, clock=clock)
+    store.put("a", STATE)
+    store.put("b", STATE)
+    clock.now += 50
+    assert store.get("a") == STATE  # refreshes a's TTL
+    clock.now += 20
+    assert store.get("b") is None
+    assert store.reap() == 1
+    assert store.stats() == {"backend": "redis", "sessions": 1, "expirations": 1}
+    store.delete("a")
+    assert store.get("a") is None
+    assert store.stats()["sessions"] == 0
+
+
+def test_reaper_expires_in_the_background(make_store):
+    store = make_store(idle_timeout=0.01, clock=time.time)
+    store.put("a", STATE)
+    time.sleep(0.02)
+    reaper = SessionReaper(store, interval=0.01).start()
+    try:
+        deadline = time.monotonic() + 5
+        while store.stats()["sessions"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        reaper.stop(timeout=5)
+    assert store.stats()["sessions"] == 0
+    assert store.stats()["expirations"] == 1
+    assert reaper.reap_once() == 0
+
+
+def test_open_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("INFLUENZA_SESSION_MAX", "7")
+    assert isinstance(open_store(), MemorySessionStore)
+    assert open_store().max_sessions == 7
+    store = open_store(f"sqlite:///{tmp_path / 's.db'}", idle_timeout=5)
+    assert isinstance(store, SQLiteSessionStore) and store.idle_timeout == 5
+    with pytest.raises(ValueError):
+        open_store("memcached://localhost")
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from encoder import FeatureEncoder
+from prediction import predict_payload
+from readiness import synthetic_payloads
+from registry import ModelRegistry
+from split_memo import MISSING, SplitMemo, SplitQuantizer
+
+
+@pytest.fixture
+def quantizer():
+    return SplitQuantizer(["a", "b"], [[1.0, 2.0, 2.0], [0.1]])
+
+
+def test_key_counts_thresholds_at_or_below_the_value(quantizer):
+    assert quantizer.n_intervals == [3, 2]
+    assert quantizer.key({"a": 0.5, "b": 0.0}) == (0, 0)
+    assert quantizer.key({"a": 1.0, "b": 0.1}) == (1, 1)  # x < t is false at t
+    assert quantizer.key({"a": 1.5, "b": None}) == (1, MISSING)
+    assert quantizer.key({"a": 9, "b": float("nan")}) == (2, MISSING)
+
+
+def test_key_rounds_to_float32_like_the_model(quantizer):
+    just_below = np.nextafter(np.float32(0.1), np.float32(0))
+    assert quantizer.key({"a": 0, "b": 0.1000000001}) == (0, 1)  # float32(0.1000000001) == t
+    assert quantizer.key({"a": 0, "b": float(just_below)}) == (0, 0)
+
+
+def test_bins_agree_with_key(quantizer):
+    payloads = [{"a": a, "b": b} for a in (0.5, 1.0, 2.0, 3.0, None) for b in (0.0, 0.1, None)]
+    X = FeatureEncoder(["a", "b"]).encode_batch(payloads)
+    assert [tuple(row) for row in quantizer.bins(X).tolist()] == [quantizer.key(p) for p in payloads]
+
+
+def test_memo_shares_entries_within_an_interval(quantizer):
+    calls = []
+    memo = SplitMemo(quantizer, maxsize=8)
+    predict = memo.wrap(lambda payload: calls.append(payload) or (0, 0.25))
+    assert predict({"a": 1.2, "b": 0.0}) == predict({"a": 1.9, "b": 0.05}) == (0, 0.25)
+    predict({"a": 2.5, "b": 0.0})
+    assert len(calls) == 2
+    assert memo.stats()["hits"] == 1
+
+
+def test_disabled_memo_is_the_plain_function(quantizer):
+    def predict_one(payload):
+        return 1, 1.0
+
+    assert SplitMemo(quantizer, maxsize=0).wrap(predict_one) is predict_one
+
+
+def test_memo_is_exact_for_the_served_model():
+    model, _ = ModelRegistry().load("v1", backend="compiled")
+    memo = SplitMemo(SplitQuantizer.from_forest(model), maxsize=4096)
+    predict = memo.wrap(lambda payload: predict_payload(model, payload))
+    payloads = synthetic_payloads(300, seed=5)
+    for payload in payloads + payloads:
+        assert predict(payload) == predict_payload(model, payload)
+    assert memo.stats()["hits"] >= len(payloads)
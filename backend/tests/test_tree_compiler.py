@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from inference_pool import SharedForest
+from registry import ModelRegistry
+from tree_compiler import CompiledForest, check_parity, compile_json, sample_inputs
+
+VERSIONS = ("v1", "v0-legacy")
+
+
+@pytest.fixture(scope="module", params=VERSIONS)
+def model_pair(request):
+    pytest.importorskip("xgboost")
+    registry = ModelRegistry()
+    model, manifest = registry.load(request.param, backend="xgboost")
+    return model, compile_json(registry.artifact_path(request.param)), manifest
+
+
+def test_compiled_matches_xgboost(model_pair):
+    model, forest, manifest = model_pair
+    assert forest.n_features == manifest["n_features"]
+    X = sample_inputs(forest, 5_000)
+    assert X.shape[1] == manifest["n_features"]
+    assert check_parity(model, forest, X) <= 1e-6
+
+
+def test_n_features_counts_unsplit_features():
+    forest = compile_json(ModelRegistry().artifact_path("v0-legacy"))
+    assert forest.n_features == 79
+    assert int(forest.feature.max()) + 1 < forest.n_features
+
+
+def test_wrong_width_is_rejected():
+    forest = compile_json(ModelRegistry().artifact_path("v1"))
+    with pytest.raises(ValueError, match="expected: 20, got 19"):
+        forest.predict_proba(np.zeros((2, 19), dtype=np.float32))
+
+
+def test_save_load_keeps_the_forest(tmp_path):
+    forest = compile_json(ModelRegistry().artifact_path("v0-legacy"))
+    forest.save(tmp_path / "forest.npz")
+    loaded = CompiledForest.load(tmp_path / "forest.npz")
+    assert loaded.n_features == forest.n_features
+    X = sample_inputs(forest, 500)
+    np.testing.assert_array_equal(loaded.predict_proba(X), forest.predict_proba(X))
+
+
+def test_shared_forest_views_are_read_only_and_equal():
+    forest = compile_json(ModelRegistry().artifact_path("v1"))
+    shared = SharedForest(forest)
+    try:
+        view = CompiledForest.from_buffer(shared.shm.buf, shared.layout)  # what attach_forest builds
+        assert view.n_features == forest.n_features
+        for name in CompiledForest.ARRAYS:
+            array = getattr(view, name)
+            assert not array.flags.owndata and not array.flags.writeable
+        X = sample_inputs(forest, 500)
+        np.testing.assert_array_equal(view.predict_proba(X), forest.predict_proba(X))
+        del view, array
+    finally:
+        shared.close()
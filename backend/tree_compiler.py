@@ -0,0 +1,290 @@
+"""Pure-NumPy compiled evaluator for the XGBoost tree ensemble.
+
+Serving only needs to walk the trees, not the whole ``xgboost`` runtime.
+``compile_model`` dumps the booster once (or reads XGBoost's JSON model file
+directly, without importing xgboost) into flat array-of-nodes tables, and
+``CompiledForest`` evaluates a batch against all trees at once, one tree
+level per step, then applies the logistic link. Probabilities match
+XGBoost's to within 1e-6. The evaluator is faster than ``predict_proba``
+for the small batches the UI and API send; large bulk batches are still
+better served by XGBoost's multi-threaded predictor.
+
+``prediction.load_model`` loads ``.npz`` artifacts written by this module.
+``shared_layout``/``copy_into``/``from_buffer`` lay the node tables out in
+one buffer, so worker processes can share a single read-only copy (see
+``inference_pool.SharedForest``).
+
+Build and check a compiled artifact from the command line::
+
+    python backend/tree_compiler.py models/v1/model.json -o compiled.npz --check
+"""
+import argparse
+import json
+import pathlib
+
+import numpy as np
+
+LOGISTIC_OBJECTIVES = ("binary:logistic", "reg:logistic")
+
+
+class CompiledForest:
+    """Flat node tables for a binary logistic tree ensemble.
+
+    Nodes of all trees are laid out back to back; ``roots[t]`` is the global
+    index of tree ``t``'s root. For every node:
+
+    ``feature``       split feature index (0 for leaves)
+    ``threshold``     go left when ``x < threshold`` (float32, as XGBoost)
+    ``left/right``    global child indices; leaves point at themselves so
+                      extra levels are no-ops
+    ``default_left``  direction taken when the feature is missing (NaN)
+    ``value``         leaf value (0 for internal nodes)
+
+    ``n_features`` is the model's input width (XGBoost's ``num_feature``);
+    features that are never split on still count.
+    """
+
+    ARRAYS = ("feature", "threshold", "left", "right", "default_left", "value", "roots")
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots,
+                 base_margin, max_depth, feature_names=None, objective="binary:logistic", children=None,
+                 n_features=None):
+        if objective not in LOGISTIC_OBJECTIVES:
+            raise NotImplementedError(f"Unsupported objective {objective!r}")
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float32)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.base_margin = float(base_margin)
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        if n_features is None:
+            # Artifacts written before n_features was stored; a lower bound
+            # when the highest features are never split on.
+            n_features = len(self.feature_names) if self.feature_names else int(self.feature.max()) + 1
+        self.n_features = int(n_features)
+        self.objective = objective
+        self.classes_ = np.array([0, 1])
+        if children is None:
+            children = np.column_stack((self.right, self.left)).ravel()
+        self._children = np.ascontiguousarray(children, dtype=np.int32)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    # ---------- Evaluation ----------
+    def predict_margin(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows, n_features = X.shape
+        if n_features != self.n_features:
+            raise ValueError(f"Feature shape mismatch, expected: {self.n_features}, got {n_features}")
+        flat_x = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        node = np.repeat(self.roots[None, :], n_rows, axis=0)
+        for _ in range(self.max_depth):
+            x = flat_x.take(row_offset + self.feature.take(node))
+            go_left = x < self.threshold.take(node)
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.default_left.take(node), go_left)
+            # children[2n] is the right child, children[2n + 1] the left one.
+            node = self._children.take(2 * node + go_left)
+        return self.value.take(node).sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, X):
+        p = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack((1.0 - p, p))
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+    # ---------- Persistence ----------
+    def _meta(self):
+        return {
+            "base_margin": self.base_margin,
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "feature_names": self.feature_names,
+            "objective": self.objective,
+        }
+
+    def save(self, path):
+        np.savez(path, meta=np.array(json.dumps(self._meta())), **{k: getattr(self, k) for k in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(**{k: data[k] for k in cls.ARRAYS}, **meta)
+
+    # ---------- Shared buffers ----------
+    def shared_layout(self, align=64):
+        """Picklable ``{"meta", "arrays", "nbytes"}`` describing one flat buffer.
+
+        ``arrays`` lists ``(name, dtype, shape, offset)`` for every node table,
+        the derived child table included, each aligned to ``align`` bytes.
+        """
+        arrays, offset = [], 0
+        for name in self.ARRAYS + ("children",):
+            array = self._children if name == "children" else getattr(self, name)
+            arrays.append((name, array.dtype.str, array.shape, offset))
+            offset += -(-array.nbytes // align) * align
+        return {"meta": self._meta(), "arrays": arrays, "nbytes": offset}
+
+    def copy_into(self, buf, layout):
+        """Write the node tables into ``buf`` as described by ``layout``."""
+        for name, dtype, shape, offset in layout["arrays"]:
+            source = self._children if name == "children" else getattr(self, name)
+            np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)[...] = source
+
+    @classmethod
+    def from_buffer(cls, buf, layout):
+        """A forest whose node tables are read-only views into ``buf`` (no copies).
+
+        ``buf`` must stay open for as long as the forest is in use.
+        """
+        tables = {}
+        for name, dtype, shape, offset in layout["arrays"]:
+            view = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+            view.flags.writeable = False
+            tables[name] = view
+        return cls(**tables, **layout["meta"])
+
+
+# ---------- Compiler ----------
+def _parse_base_score(raw):
+    # "5.1879084E-1" in older releases, "[5.1879084E-1]" since XGBoost 2.
+    return float(str(raw).strip("[]").split(",")[0])
+
+
+def _tree_depth(left, right):
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [c for n in frontier for c in (left[n], right[n]) if c != -1]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+def compile_json(model_json):
+    """Compile XGBoost's JSON model (dict, JSON text or file path)."""
+    if isinstance(model_json, (str, pathlib.Path)) and not str(model_json).lstrip().startswith("{"):
+        model_json = pathlib.Path(model_json).read_text()
+    if isinstance(model_json, (str, bytes)):
+        model_json = json.loads(model_json)
+
+    learner = model_json["learner"]
+    objective = learner["objective"]["name"]
+    params = learner["learner_model_param"]
+    if int(params.get("num_class", 0)) > 1 or int(params.get("num_target", 1)) > 1:
+        raise NotImplementedError("Only single-output models are supported")
+    booster = learner["gradient_booster"]
+    if booster["name"] != "gbtree":
+        raise NotImplementedError(f"Unsupported booster {booster['name']!r}")
+
+    base_score = _parse_base_score(params["base_score"])
+    base_margin = np.log(base_score / (1.0 - base_score))
+
+    columns = {k: [] for k in ("feature", "threshold", "left", "right", "default_left", "value")}
+    roots, offset, max_depth = [], 0, 0
+    for tree in booster["model"]["trees"]:
+        if any(tree["split_type"]):
+            raise NotImplementedError("Categorical splits are not supported")
+        left = np.asarray(tree["left_children"], dtype=np.int64)
+        right = np.asarray(tree["right_children"], dtype=np.int64)
+        cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+        is_leaf = left == -1
+        own = np.arange(len(left)) + offset
+
+        roots.append(offset)
+        columns["feature"].append(np.where(is_leaf, 0, tree["split_indices"]))
+        columns["threshold"].append(np.where(is_leaf, 0, cond))
+        columns["left"].append(np.where(is_leaf, own, left + offset))
+        columns["right"].append(np.where(is_leaf, own, right + offset))
+        columns["default_left"].append(np.asarray(tree["default_left"], dtype=bool) & ~is_leaf)
+        columns["value"].append(np.where(is_leaf, cond, 0))
+        max_depth = max(max_depth, _tree_depth(tree["left_children"], tree["right_children"]))
+        offset += len(left)
+
+    return CompiledForest(
+        **{k: np.concatenate(v) for k, v in columns.items()},
+        roots=np.asarray(roots),
+        base_margin=base_margin,
+        max_depth=max_depth,
+        n_features=int(params["num_feature"]),
+        feature_names=learner.get("feature_names") or None,
+        objective=objective,
+    )
+
+
+def compile_model(model):
+    """Compile a fitted ``XGBClassifier`` or ``xgboost.Booster``."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    if getattr(model, "best_iteration", None) is not None and hasattr(model, "get_booster"):
+        booster = booster[: model.best_iteration + 1]
+    return compile_json(bytes(booster.save_raw("json")))
+
+
+def sample_inputs(forest, n_rows, seed=0, missing_rate=0.05):
+    """Random rows that exercise every split, including exact thresholds."""
+    rng = np.random.default_rng(seed)
+    n_features = forest.n_features
+    internal = forest.left != np.arange(forest.n_nodes)
+    X = np.zeros((n_rows, n_features), dtype=np.float32)
+    for j in range(n_features):
+        cuts = forest.threshold[internal & (forest.feature == j)]
+        if len(cuts) == 0:
+            continue
+        uniform = rng.uniform(cuts.min() - 1, cuts.max() + 1, n_rows)
+        X[:, j] = np.where(rng.random(n_rows) < 0.3, rng.choice(cuts, n_rows), uniform)
+    X[rng.random(X.shape) < missing_rate] = np.nan
+    return X
+
+
+def check_parity(model, forest, X, atol=1e-6):
+    """Max absolute difference between XGBoost's and the forest's probabilities."""
+    if X.shape[1] != forest.n_features:
+        raise ValueError(f"X has {X.shape[1]} columns, the forest takes {forest.n_features}")
+    expected = model.predict_proba(X)[:, 1]
+    diff = float(np.max(np.abs(expected - forest.predict_proba(X)[:, 1])))
+    if diff > atol:
+        raise AssertionError(f"Compiled forest differs from XGBoost by {diff:.3g} (> {atol:g})")
+    return diff
+
+
+def main(argv=None):
+    import prediction
+
+    parser = argparse.ArgumentParser(description="Compile an XGBoost model into NumPy node tables.")
+    parser.add_argument("model", help="model file, relative to the backend directory")
+    parser.add_argument("-o", "--output", required=True,
+                        help="compiled .npz to write, relative to the backend directory")
+    parser.add_argument("--check", action="store_true",
+                        help="compare probabilities with XGBoost on random inputs")
+    args = parser.parse_args(argv)
+
+    # Reference predictions always come from XGBoost itself.
+    model = prediction.load_model(args.model, backend="xgboost")
+    if model is None:
+        parser.error(f"{args.model} not found")
+    forest = compile_model(model)
+    forest.save(prediction.BASE_DIR / args.output)
+    print(f"{forest.n_trees} trees, {forest.n_nodes} nodes, depth {forest.max_depth} -> {args.output}")
+
+    if args.check:
+        X = sample_inputs(forest, 10_000)
+        print(f"max |p_xgboost - p_compiled| = {check_parity(model, forest, X):.3g}")
+
+
+if __name__ == "__main__":
+    main()